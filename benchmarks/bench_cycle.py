@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+"""Time one full `background_update_task` cycle at scale, fully offline.
+
+Builds N synthetic tracked players spread over every region in
+`REGION_CLUSTERS`, starts the Riot stand-in (benchmarks/riot_server.py) in a
+separate process with the same world - minus the games a share of players have
+played since the last cycle - and runs one real cycle of the `Background` cog
+against it, with `FakeDatabaseService` for Firestore (or, with `--storage
+sqlite`, a real in-memory `SQLiteDatabaseService`) and a fake Discord channel
+sink (benchmarks/fakes.py). The per-update pacing sleep is disabled so the
+number measured is the cycle's own cost.
+
+Reports cycle wall time, Riot calls per player, Firestore ops per player, peak
+RSS and posts per second, writes them as JSON, and compares them against a
+baseline file (exit status 1 on a regression beyond --threshold):
+
+    python3 benchmarks/bench_cycle.py --players 10000 --save-baseline
+    python3 benchmarks/bench_cycle.py --players 10000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import time
+from datetime import UTC, datetime
+from pathlib import Path
+
+import aiohttp
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fakes import (  # noqa: E402
+    CountingStorage,
+    FakeBot,
+    FakeDatabaseService,
+    FakeDiscord,
+)
+from benchmarks.riot_server import Faults, StandinWorld, start_standin  # noqa: E402
+from cogs.background import Background  # noqa: E402
+from utils.riot_transport import LiveTransport  # noqa: E402
+from utils.update_engine import PlayerUpdateEngine  # noqa: E402
+
+RESULTS = Path(__file__).parent / "results"
+DEFAULT_OUTPUT = RESULTS / "cycle_latest.json"
+DEFAULT_BASELINE = RESULTS / "cycle_baseline.json"
+
+# metric -> True if a bigger number is better
+COMPARED_METRICS = {
+    "cycle_wall_s": False,
+    "riot_calls_per_player": False,
+    "db_ops_per_player": False,
+    "peak_rss_mb": False,
+    "posts_per_second": True,
+}
+
+
+def _serve_standin(players, seed, share, faults, ready) -> None:
+    """Stand-in process: build the advanced world, serve it, report the URL."""
+
+    async def _serve():
+        world = StandinWorld.synthetic(players, seed)
+        world.advance(share, seed)
+        _runner, base_url = await start_standin(world, faults)
+        ready.put(base_url)
+        await asyncio.Event().wait()
+
+    asyncio.run(_serve())
+
+
+async def _run_cycle(args, base_url: str) -> dict:
+    world = StandinWorld.synthetic(args.players, args.seed)
+    db_service = FakeDatabaseService.from_world(
+        world,
+        args.guild_size,
+        latency_ms=args.db_latency_ms,
+    )
+    del world
+    if args.storage == "sqlite":
+        from utils.sqlite_service import SQLiteDatabaseService
+
+        sqlite = SQLiteDatabaseService()
+        await sqlite.upsert_tracked_users(list(db_service.users.values()))
+        for guild_id, channel_id in db_service.guild_config.items():
+            await sqlite.set_guild_config(guild_id, channel_id)
+        db_service = CountingStorage(sqlite)
+    discord = FakeDiscord(latency_ms=args.discord_latency_ms)
+    transport = LiveTransport(aiohttp.ClientSession(), base_url)
+    # Background.__init__ would start the cog's task loops; set up its state here.
+    cog = object.__new__(Background)
+    cog.bot = FakeBot(transport, db_service, discord)
+    cog.cycle_id = 0
+    cog.cycle_job = cog.cycle_started = cog.last_cycle = None
+    # Measure the cycle, not the rate-limit pacing between posted updates.
+    cog.bot.update_engine = PlayerUpdateEngine(cog.bot, "benchmark", pacing_seconds=0)
+    try:
+        started = time.perf_counter()
+        await Background.background_update_task.coro(cog)
+        wall = time.perf_counter() - started
+        async with transport.session.get(f"{base_url}/_standin/stats") as response:
+            riot = await response.json()
+    finally:
+        await transport.close()
+    riot_calls = sum(riot["statuses"].values())
+    db_ops = db_service.reads + db_service.writes
+    return {
+        "cycle_wall_s": round(wall, 3),
+        "players": args.players,
+        "riot_calls": riot_calls,
+        "riot_calls_per_player": round(riot_calls / args.players, 3),
+        "riot_calls_by_endpoint": riot["calls"],
+        "riot_statuses": riot["statuses"],
+        "db_reads": db_service.reads,
+        "db_writes": db_service.writes,
+        "db_ops_per_player": round(db_ops / args.players, 3),
+        "db_calls_by_method": dict(db_service.ops),
+        "posts": discord.posts,
+        "posts_per_second": round(discord.posts / wall, 2) if wall else 0.0,
+        "discord_send_s": round(discord.send_seconds, 3),
+        # ru_maxrss is KiB on Linux
+        "peak_rss_mb": round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+            1,
+        ),
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """Return one message per metric that regressed beyond `threshold`."""
+    if current["config"] != baseline.get("config"):
+        return []
+    regressions = []
+    for metric, higher_is_better in COMPARED_METRICS.items():
+        new = current["metrics"].get(metric)
+        old = baseline.get("metrics", {}).get(metric)
+        if not new or not old:
+            continue
+        change = (new - old) / old
+        if (-change if higher_is_better else change) > threshold:
+            regressions.append(f"{metric}: {old} -> {new} ({change:+.1%})")
+    return regressions
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description="benchmark one background update cycle")
+    p.add_argument("--players", type=int, default=10_000)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument(
+        "--changed-share",
+        type=float,
+        default=0.3,
+        help="share of players with a new game",
+    )
+    p.add_argument("--guild-size", type=int, default=25)
+    p.add_argument("--riot-latency-ms", type=float, default=0.0)
+    p.add_argument("--rate-limit-rate", type=float, default=0.0)
+    p.add_argument("--server-error-rate", type=float, default=0.0)
+    p.add_argument("--storage", choices=("fake", "sqlite"), default="fake")
+    p.add_argument(
+        "--db-latency-ms",
+        type=float,
+        default=0.0,
+        help="per-call latency of the fake storage",
+    )
+    p.add_argument("--discord-latency-ms", type=float, default=0.0)
+    p.add_argument("--output", default=str(DEFAULT_OUTPUT))
+    p.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    p.add_argument(
+        "--save-baseline",
+        action="store_true",
+        help="also write the result as the new baseline",
+    )
+    p.add_argument(
+        "--threshold",
+        type=float,
+        default=0.10,
+        help="allowed regression, as a fraction",
+    )
+    args = p.parse_args(argv)
+
+    faults = Faults(
+        latency_ms=args.riot_latency_ms,
+        rate_limit_rate=args.rate_limit_rate,
+        server_error_rate=args.server_error_rate,
+        seed=args.seed,
+    )
+    ready = multiprocessing.Queue()
+    server = multiprocessing.Process(
+        target=_serve_standin,
+        args=(args.players, args.seed, args.changed_share, faults, ready),
+        daemon=True,
+    )
+    server.start()
+    try:
+        base_url = ready.get(timeout=120)
+        metrics = asyncio.run(_run_cycle(args, base_url))
+    finally:
+        server.terminate()
+        server.join()
+
+    config = {
+        key: getattr(args, key)
+        for key in (
+            "players",
+            "seed",
+            "changed_share",
+            "guild_size",
+            "riot_latency_ms",
+            "rate_limit_rate",
+            "server_error_rate",
+            "storage",
+            "db_latency_ms",
+            "discord_latency_ms",
+        )
+    }
+    result = {
+        "benchmark": "cycle",
+        "recorded_at": datetime.now(UTC).isoformat(timespec="seconds"),
+        "config": config,
+        "metrics": metrics,
+    }
+    output = Path(args.output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(result, indent=2) + "\n", encoding="utf-8")
+    print(json.dumps(metrics, indent=2))
+
+    baseline_path = Path(args.baseline)
+    status = 0
+    if baseline_path.exists() and not args.save_baseline:
+        baseline = json.loads(baseline_path.read_text(encoding="utf-8"))
+        if baseline.get("config") != config:
+            print(f"baseline {baseline_path} used a different config; not compared")
+        regressions = compare(result, baseline, args.threshold)
+        for line in regressions:
+            print(f"REGRESSION {line}")
+        status = 1 if regressions else 0
+    if args.save_baseline:
+        baseline_path.parent.mkdir(parents=True, exist_ok=True)
+        baseline_path.write_text(json.dumps(result, indent=2) + "\n", encoding="utf-8")
+        print(f"baseline saved to {baseline_path}")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""Compare the JSON codec backends on the bot's three hot paths.
+
+  * `riot_loads`   - decode each recorded match DTO in `benchmarks/fixtures/`
+                     (what `call_riot_api` does for every 200 response)
+  * `sink_dumps`   - encode one full sink batch (`BATCH_MAX` events) for `_post`
+  * `buffer_loads` - decode the same batch back line by line, as `flush` does
+
+Every backend in `utils.json_codec.CODECS` is measured; install the `fast-json`
+extra to include orjson. Run from the project root:
+
+    python3 benchmarks/bench_json_codec.py [--number 50]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import timeit
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.json_codec import BACKEND, CODECS  # noqa: E402
+from utils.sink_client import BATCH_MAX, SinkClient  # noqa: E402
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def _sink_batch() -> list[dict]:
+    client = SinkClient("http://sink.invalid", "t", "livelol")
+    return [
+        client.build_event(
+            "ServiceUnavailableError",
+            f"☁️ **Service Issue:** Shard is unresponsive. (euw1 player {i})",
+            handled=False,
+            fingerprint="riot_api:call_riot_api:ServiceUnavailableError",
+        )
+        for i in range(BATCH_MAX)
+    ]
+
+
+def _time(fn, number: int) -> float:
+    """Best-of-5 microseconds per call."""
+    return round(min(timeit.repeat(fn, number=number, repeat=5)) / number * 1e6, 1)
+
+
+def run(number: int) -> dict:
+    matches = [path.read_bytes() for path in sorted(FIXTURES.glob("match_*.json"))]
+    batch = _sink_batch()
+    results = {}
+    for name, (loads, dumps) in CODECS.items():
+        lines = [dumps(event) for event in batch]
+        results[name] = {
+            "riot_loads": _time(lambda loads=loads: [loads(m) for m in matches], number)
+            / len(matches),
+            "sink_dumps": _time(lambda dumps=dumps: dumps(batch), number),
+            "buffer_loads": _time(
+                lambda loads=loads, lines=lines: [loads(ln) for ln in lines],
+                number,
+            ),
+        }
+    return results
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description="benchmark JSON codec backends")
+    p.add_argument("--number", type=int, default=50, help="calls per timing run")
+    p.add_argument("--json", action="store_true", help="print raw JSON results")
+    args = p.parse_args(argv)
+    results = run(args.number)
+    if args.json:
+        print(json.dumps({"active": BACKEND, "results": results}, indent=2))
+        return 0
+    print(f"active backend: {BACKEND}  (microseconds per call, lower is better)")
+    print(f"{'backend':<8} {'riot_loads':>12} {'sink_dumps':>12} {'buffer_loads':>13}")
+    for name, row in results.items():
+        print(
+            f"{name:<8} {row['riot_loads']:>12.1f} {row['sink_dumps']:>12.1f}"
+            f" {row['buffer_loads']:>13.1f}",
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
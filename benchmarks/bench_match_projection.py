@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Compare full vs projected decoding of match-v5 DTOs.
+
+Decodes each recorded DTO in `benchmarks/fixtures/` both ways and reports the
+per-match decode time, the peak allocation while decoding and the bytes still
+retained by the result (what a `MatchDetailsView` keeps alive until it times
+out). Both modes decode through the active `utils.json_codec` backend. Run from
+the project root:
+
+    python3 benchmarks/bench_match_projection.py [--number 200]
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import timeit
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import json_codec  # noqa: E402
+from utils.match_projection import decode_match  # noqa: E402
+
+FIXTURES = Path(__file__).parent / "fixtures"
+
+
+def _measure(decode, raw: bytes, number: int) -> dict:
+    seconds = min(timeit.repeat(lambda: decode(raw), number=number, repeat=5))
+    tracemalloc.start()
+    result = decode(raw)
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return {
+        "us_per_match": round(seconds / number * 1e6, 1),
+        "peak_bytes": peak,
+        "retained_bytes": retained,
+    }
+
+
+def run(number: int) -> list[dict]:
+    rows = []
+    for path in sorted(FIXTURES.glob("match_*.json")):
+        raw = path.read_bytes()
+        rows.append(
+            {
+                "fixture": path.name,
+                "size_bytes": len(raw),
+                "full": _measure(json_codec.loads, raw, number),
+                "projected": _measure(decode_match, raw, number),
+            },
+        )
+    return rows
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description="benchmark match DTO projection")
+    p.add_argument("--number", type=int, default=200, help="decodes per timing run")
+    p.add_argument("--json", action="store_true", help="print raw JSON results")
+    args = p.parse_args(argv)
+    rows = run(args.number)
+    if args.json:
+        print(json.dumps(rows, indent=2))
+        return 0
+    print(f"codec backend: {json_codec.BACKEND}")
+    for row in rows:
+        print(f"{row['fixture']} ({row['size_bytes']} bytes)")
+        for mode in ("full", "projected"):
+            m = row[mode]
+            print(
+                f"  {mode:<10} {m['us_per_match']:>8} us"
+                f"  peak {m['peak_bytes']:>8} B  retained {m['retained_bytes']:>8} B",
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
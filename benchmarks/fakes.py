@@ -0,0 +1,167 @@
+"""In-memory stand-ins for Firestore and Discord used by the cycle benchmark.
+
+`FakeDatabaseService` implements the `DatabaseService` methods the update cycle
+calls, over plain dicts, and counts every call and every document it reads or
+writes - the two numbers Firestore bills on. `CountingStorage` keeps the same
+counts for a real `StorageBackend` such as `SQLiteDatabaseService`. `FakeBot`
+carries just what the `Background` cog and its `PlayerUpdateEngine` touch:
+`session`, `db_service` and `get_channel`.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import copy
+import time
+from collections import Counter
+
+from benchmarks.riot_server import StandinWorld
+from utils.keyed_lock import KeyedLock
+
+
+class FakeDatabaseService:
+    """Dict-backed `DatabaseService` that counts calls and document I/O.
+
+    `latency_ms` blocks the calling thread on every call, like the synchronous
+    Firestore client does on the event loop.
+    """
+
+    def __init__(self, latency_ms: float = 0.0) -> None:
+        self.latency_ms = latency_ms
+        self.users: dict[str, dict] = {}
+        self.guild_config: dict[str, int] = {}
+        self.ops: Counter = Counter()
+        self.reads = 0
+        self.writes = 0
+        self.player_locks = KeyedLock()
+
+    @classmethod
+    def from_world(
+        cls,
+        world: StandinWorld,
+        guild_size: int,
+        latency_ms: float = 0.0,
+    ) -> FakeDatabaseService:
+        """Track every world player, `guild_size` players per guild."""
+        service = cls(latency_ms)
+        for i, player in enumerate(world.players.values()):
+            guild_id = str(1_000_000 + i // guild_size)
+            service.guild_config[guild_id] = int(guild_id) + 1
+            service.users[player.puuid] = {
+                "puuid": player.puuid,
+                "riot_id": f"{player.game_name}#{player.tag_line}",
+                "region": player.region,
+                "tier": player.tier,
+                "rank": player.rank,
+                "LP": player.lp,
+                "guild_ids": [guild_id],
+                "server_info": {guild_id: {"added_by": 1}},
+                "last_match_id": player.match_id,
+                "streak": 0,
+            }
+        return service
+
+    def _op(self, name: str, reads: int = 0, writes: int = 0) -> None:
+        self.ops[name] += 1
+        self.reads += reads
+        self.writes += writes
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000)
+
+    async def get_all_tracked_users(self):
+        self._op("get_all_tracked_users", reads=len(self.users))
+        return [copy.deepcopy(user) for user in self.users.values()]
+
+    async def get_guild_tracked_users(self, guild_id):
+        guild_id = str(guild_id)
+        users = [
+            copy.deepcopy(user)
+            for user in self.users.values()
+            if guild_id in user["guild_ids"]
+        ]
+        self._op("get_guild_tracked_users", reads=len(users))
+        return users
+
+    async def get_guild_config(self, guild_id):
+        self._op("get_guild_config", reads=1)
+        return self.guild_config.get(str(guild_id))
+
+    async def apply_ranked_update(self, puuid, build):
+        update = build(copy.deepcopy(self.users[puuid]))
+        self._op("apply_ranked_update", reads=1, writes=update is not None)
+        if update is not None:
+            self.users[puuid].update(update)
+        return update
+
+
+class CountingStorage:
+    """Wrap a `StorageBackend`, counting calls and documents like the fake does."""
+
+    def __init__(self, backend) -> None:
+        self.backend = backend
+        self.player_locks = backend.player_locks
+        self.ops: Counter = Counter()
+        self.reads = 0
+        self.writes = 0
+
+    def __getattr__(self, name: str):
+        """Return the backend method `name`, wrapped to count the call."""
+        method = getattr(self.backend, name)
+
+        async def counted(*args, **kwargs):
+            result = await method(*args, **kwargs)
+            self.ops[name] += 1
+            if name.startswith("get_"):
+                self.reads += len(result) if isinstance(result, list) else 1
+            else:
+                self.writes += 1
+            return result
+
+        return counted
+
+
+class FakeMessage:
+    def __init__(self, embed, view) -> None:
+        self.embed = embed
+        self.view = view
+
+
+class FakeChannel:
+    """A text channel whose `send` takes `latency_ms` and records the post."""
+
+    def __init__(self, channel_id: int, sink: FakeDiscord) -> None:
+        self.id = channel_id
+        self._sink = sink
+
+    async def send(self, *_args, embed=None, view=None, **_kwargs):
+        started = time.perf_counter()
+        if self._sink.latency_ms:
+            await asyncio.sleep(self._sink.latency_ms / 1000)
+        self._sink.posts += 1
+        self._sink.send_seconds += time.perf_counter() - started
+        return FakeMessage(embed, view)
+
+
+class FakeDiscord:
+    """Shared post counter and channel cache behind every `FakeChannel`."""
+
+    def __init__(self, latency_ms: float = 0.0) -> None:
+        self.latency_ms = latency_ms
+        self.posts = 0
+        self.send_seconds = 0.0
+        self._channels: dict[int, FakeChannel] = {}
+
+    def get_channel(self, channel_id: int) -> FakeChannel:
+        if channel_id not in self._channels:
+            self._channels[channel_id] = FakeChannel(channel_id, self)
+        return self._channels[channel_id]
+
+
+class FakeBot:
+    def __init__(self, session, db_service, discord: FakeDiscord) -> None:
+        self.session = session
+        self.db_service = db_service
+        self.discord = discord
+
+    def get_channel(self, channel_id: int) -> FakeChannel:
+        return self.discord.get_channel(channel_id)
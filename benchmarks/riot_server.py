@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""Local stand-in for the Riot API endpoints the bot calls.
+
+Serves league-v4, match-v5, account-v1 and summoner-v4 from an in-memory world
+of players, with configurable latency and 429 / 5xx injection, so the request
+path (`call_riot_api` and its retry handling) can be exercised and timed offline.
+
+Requests arrive rebased by `utils.riot_transport` - `https://na1.api.riotgames.com/
+lol/...` becomes `<base>/na1/lol/...` - so point the bot at it with:
+
+    python3 benchmarks/riot_server.py --port 8089 --latency-ms 40 &
+    RIOT_API_BASE=http://127.0.0.1:8089 python3 main.py
+
+The world is loaded from `benchmarks/fixtures/riot_world.json` by default; match
+bodies are built from a recorded match DTO with the player swapped in.
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import copy
+import json
+import os
+import random
+import sys
+import time
+from collections import Counter, deque
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from aiohttp import web
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils import json_codec  # noqa: E402
+from utils.constants import RANK_ORDER, REGION_CLUSTERS, TIER_ORDER  # noqa: E402
+
+FIXTURES = Path(__file__).parent / "fixtures"
+DEFAULT_WORLD = FIXTURES / "riot_world.json"
+MATCH_TEMPLATE = FIXTURES / "match_NA1_5123456789.json"
+MATCH_ID_BASE = 5_000_000_000
+# What Riot advertises for a development key; echoed back on every response.
+APP_RATE_LIMIT = ((20, 1), (100, 120))
+SERVER_ERRORS = (500, 502, 503, 504)
+
+
+@dataclass
+class StandinPlayer:
+    puuid: str
+    game_name: str
+    tag_line: str
+    region: str
+    tier: str = "GOLD"
+    rank: str = "IV"
+    lp: int = 50
+    games: int = 1
+    last_win: bool = True
+    match_base: int = 0
+
+    @property
+    def match_id(self) -> str:
+        return f"{self.region.upper()}_{self.match_base + self.games}"
+
+
+@dataclass
+class Faults:
+    """What the stand-in does to each request before answering it."""
+
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    rate_limit_rate: float = 0.0  # share of requests answered with a Riot 429
+    server_error_rate: float = 0.0  # share answered with a 500/502/503/504
+    retry_after: int = 1
+    seed: int = 0
+
+
+@dataclass
+class StandinWorld:
+    """The players the stand-in knows about, plus per-endpoint call counts."""
+
+    match_template: dict
+    players: dict[str, StandinPlayer] = field(default_factory=dict)
+    calls: Counter = field(default_factory=Counter)
+    statuses: Counter = field(default_factory=Counter)
+    _by_riot_id: dict[tuple[str, str], str] = field(default_factory=dict)
+    _match_owner: dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def from_file(cls, path=DEFAULT_WORLD, template=MATCH_TEMPLATE) -> StandinWorld:
+        world = cls(match_template=json.loads(Path(template).read_bytes()))
+        for entry in json.loads(Path(path).read_bytes()):
+            world.add(StandinPlayer(**entry))
+        return world
+
+    @classmethod
+    def synthetic(cls, players: int, seed: int = 0) -> StandinWorld:
+        """Build `players` random ranked players spread evenly over every region.
+
+        Deterministic for a given (players, seed), so a benchmark process and a
+        stand-in process can build identical worlds independently.
+        """
+        rng = random.Random(seed)
+        world = cls(match_template=json.loads(MATCH_TEMPLATE.read_bytes()))
+        regions = sorted(REGION_CLUSTERS)
+        tiers = [tier for tier in TIER_ORDER if tier != "UNRANKED"]
+        divisions = [rank for rank in RANK_ORDER if rank]
+        for i in range(players):
+            tier = rng.choice(tiers)
+            apex = TIER_ORDER[tier] >= TIER_ORDER["MASTER"]
+            world.add(
+                StandinPlayer(
+                    puuid=f"synthetic-puuid-{i:06d}",
+                    game_name=f"Synthetic {i}",
+                    tag_line=f"S{i % 1000}",
+                    region=regions[i % len(regions)],
+                    tier=tier,
+                    rank="I" if apex else rng.choice(divisions),
+                    lp=rng.randrange(0, 1200 if apex else 100),
+                ),
+            )
+        return world
+
+    def advance(self, share: float, seed: int = 0) -> list[str]:
+        """Have a random `share` of players finish one game; return their puuids."""
+        rng = random.Random(seed)
+        played = []
+        for puuid in self.players:
+            if rng.random() < share:
+                self.play(puuid, win=rng.random() < 0.5, lp_delta=rng.randint(15, 25))
+                played.append(puuid)
+        return played
+
+    def add(self, player: StandinPlayer) -> None:
+        if not player.match_base:
+            player.match_base = MATCH_ID_BASE + len(self.players) * 100_000
+        self.players[player.puuid] = player
+        key = (player.game_name.lower(), player.tag_line.lower())
+        self._by_riot_id[key] = player.puuid
+        self._match_owner[player.match_id] = player.puuid
+
+    def play(self, puuid: str, win: bool, lp_delta: int) -> None:
+        """Record one finished game for a player: new match id and new LP."""
+        player = self.players[puuid]
+        player.games += 1
+        player.last_win = win
+        player.lp = max(0, player.lp + (lp_delta if win else -lp_delta))
+        self._match_owner[player.match_id] = puuid
+
+    def by_riot_id(self, game_name: str, tag_line: str) -> StandinPlayer | None:
+        puuid = self._by_riot_id.get((game_name.lower(), tag_line.lower()))
+        return self.players.get(puuid)
+
+    def match_dto(self, match_id: str) -> dict | None:
+        player = self.players.get(self._match_owner.get(match_id))
+        if player is None:
+            return None
+        # Share the other nine participants with the template; only the tracked
+        # player's entry and the containers on the path to it are copied.
+        template = self.match_template
+        target = copy.copy(template["info"]["participants"][0])
+        target.update(
+            puuid=player.puuid,
+            riotIdGameName=player.game_name,
+            riotIdTagline=player.tag_line,
+            win=player.last_win,
+        )
+        metadata = dict(template["metadata"], matchId=match_id)
+        metadata["participants"] = [player.puuid, *metadata["participants"][1:]]
+        info = dict(template["info"])
+        info["participants"] = [target, *info["participants"][1:]]
+        return {"metadata": metadata, "info": info}
+
+
+class _RateWindow:
+    """Sliding-window request counts for the X-App-Rate-Limit-Count header."""
+
+    def __init__(self) -> None:
+        self._windows = [(seconds, deque()) for _, seconds in APP_RATE_LIMIT]
+
+    def hit(self) -> str:
+        now = time.monotonic()
+        counts = []
+        for seconds, stamps in self._windows:
+            stamps.append(now)
+            while now - stamps[0] > seconds:
+                stamps.popleft()
+            counts.append(f"{len(stamps)}:{seconds}")
+        return ",".join(counts)
+
+
+def _json(payload, status: int = 200) -> web.Response:
+    return web.Response(
+        body=json_codec.dumps(payload),
+        status=status,
+        content_type="application/json",
+    )
+
+
+def _not_found() -> web.Response:
+    return _json({"status": {"message": "Data not found", "status_code": 404}}, 404)
+
+
+def make_app(world: StandinWorld, faults: Faults | None = None) -> web.Application:
+    faults = faults or Faults()
+    rng = random.Random(faults.seed)
+    window = _RateWindow()
+
+    @web.middleware
+    async def inject(request, handler):
+        if request.path.startswith("/_standin/"):
+            return await handler(request)
+        delay = faults.latency_ms + rng.uniform(0, faults.jitter_ms)
+        if delay:
+            await asyncio.sleep(delay / 1000)
+        roll = rng.random()
+        if roll < faults.rate_limit_rate:
+            response = _json({"status": {"status_code": 429}}, 429)
+            response.headers["Retry-After"] = str(faults.retry_after)
+            response.headers["X-Rate-Limit-Type"] = "application"
+        elif roll < faults.rate_limit_rate + faults.server_error_rate:
+            response = _json({}, rng.choice(SERVER_ERRORS))
+        else:
+            response = await handler(request)
+        response.headers["X-App-Rate-Limit"] = ",".join(
+            f"{limit}:{seconds}" for limit, seconds in APP_RATE_LIMIT
+        )
+        response.headers["X-App-Rate-Limit-Count"] = window.hit()
+        world.statuses[response.status] += 1
+        return response
+
+    async def league_entries(request):
+        world.calls["league"] += 1
+        player = world.players.get(request.match_info["puuid"])
+        if player is None:
+            return _not_found()
+        if player.tier == "UNRANKED":
+            return _json([])
+        return _json(
+            [
+                {
+                    "queueType": "RANKED_SOLO_5x5",
+                    "puuid": player.puuid,
+                    "tier": player.tier,
+                    "rank": player.rank,
+                    "leaguePoints": player.lp,
+                    "wins": player.games,
+                    "losses": 0,
+                },
+            ],
+        )
+
+    async def match_ids(request):
+        world.calls["match_ids"] += 1
+        player = world.players.get(request.match_info["puuid"])
+        return _json([player.match_id] if player else [])
+
+    async def match(request):
+        world.calls["match"] += 1
+        dto = world.match_dto(request.match_info["match_id"])
+        return _json(dto) if dto is not None else _not_found()
+
+    async def account(request):
+        world.calls["account"] += 1
+        player = world.by_riot_id(
+            request.match_info["game_name"],
+            request.match_info["tag_line"],
+        )
+        if player is None:
+            return _not_found()
+        return _json(
+            {
+                "puuid": player.puuid,
+                "gameName": player.game_name,
+                "tagLine": player.tag_line,
+            },
+        )
+
+    async def summoner(request):
+        world.calls["summoner"] += 1
+        player = world.players.get(request.match_info["puuid"])
+        if player is None or player.region != request.match_info["routing"]:
+            return _not_found()
+        return _json(
+            {
+                "puuid": player.puuid,
+                "profileIconId": 29,
+                "revisionDate": 1760900000000,
+                "summonerLevel": 420,
+            },
+        )
+
+    async def stats(_request):
+        return _json(
+            {
+                "calls": dict(world.calls),
+                "statuses": {str(code): n for code, n in world.statuses.items()},
+            },
+        )
+
+    app = web.Application(middlewares=[inject])
+    app.add_routes(
+        [
+            # Not a Riot endpoint: lets an out-of-process benchmark read counts.
+            web.get("/_standin/stats", stats),
+            web.get(
+                "/{routing}/lol/league/v4/entries/by-puuid/{puuid}",
+                league_entries,
+            ),
+            web.get(
+                "/{routing}/lol/match/v5/matches/by-puuid/{puuid}/ids",
+                match_ids,
+            ),
+            web.get("/{routing}/lol/match/v5/matches/{match_id}", match),
+            web.get(
+                "/{routing}/riot/account/v1/accounts/by-riot-id/{game_name}/{tag_line}",
+                account,
+            ),
+            web.get(
+                "/{routing}/lol/summoner/v4/summoners/by-puuid/{puuid}",
+                summoner,
+            ),
+        ],
+    )
+    return app
+
+
+async def start_standin(
+    world: StandinWorld,
+    faults: Faults | None = None,
+    host: str = "127.0.0.1",
+    port: int = 0,
+) -> tuple[web.AppRunner, str]:
+    """Start the stand-in on the running loop; return (runner, base_url).
+
+    Port 0 binds a free port. Call `await runner.cleanup()` to stop it.
+    """
+    runner = web.AppRunner(make_app(world, faults), access_log=None)
+    await runner.setup()
+    site = web.TCPSite(runner, host, port)
+    await site.start()
+    bound_host, bound_port = runner.addresses[0][:2]
+    return runner, f"http://{bound_host}:{bound_port}"
+
+
+def main(argv=None) -> int:
+    p = argparse.ArgumentParser(description="serve a local Riot API stand-in")
+    p.add_argument("--host", default="127.0.0.1")
+    p.add_argument("--port", type=int, default=8089)
+    p.add_argument("--world", default=str(DEFAULT_WORLD), help="players JSON file")
+    p.add_argument("--latency-ms", type=float, default=0.0)
+    p.add_argument("--jitter-ms", type=float, default=0.0)
+    p.add_argument("--rate-limit-rate", type=float, default=0.0)
+    p.add_argument("--server-error-rate", type=float, default=0.0)
+    p.add_argument("--seed", type=int, default=0)
+    args = p.parse_args(argv)
+    faults = Faults(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        rate_limit_rate=args.rate_limit_rate,
+        server_error_rate=args.server_error_rate,
+        seed=args.seed,
+    )
+    world = StandinWorld.from_file(args.world)
+    web.run_app(
+        make_app(world, faults),
+        host=args.host,
+        port=args.port,
+        access_log=None,
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
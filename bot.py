@@ -1,26 +1,22 @@
-import asyncio
 import os
 import sys
+import time
 
-import aiohttp
 import discord
+import sentry_sdk
 from discord.ext import commands
 from dotenv import load_dotenv
 
-from database import database_startup
-from utils.constants import REGION_CLUSTERS
-from utils.db_service import DatabaseService
-from utils.helpers import (
-    extract_match_info,
-    next_streak,
-    parse_rank_info,
-    rank_difference,
-)
+from database import storage_startup
+from utils.constants import MANUAL_UPDATE_FRESHNESS_SECONDS, PROGRESS_EDIT_SECONDS
 from utils.logger_config import logger
-from utils.riot_api import get_ranked_info, get_recent_match_info
+from utils.loop_watchdog import LoopWatchdog
+from utils.metrics import DISCORD_SEND_SECONDS
+from utils.riot_transport import build_riot_transport
 from utils.sentry_config import setup_sentry
 from utils.sink_config import setup_sink
-from utils.ui_components import MatchDetailsView, MyHelp
+from utils.ui_components import MyHelp
+from utils.update_engine import INTERACTIVE, PlayerUpdateEngine
 
 # API Keys
 
@@ -35,8 +31,8 @@ setup_sink()
 
 # Database Startup
 
-db = database_startup()
-if not db:
+db_service = storage_startup()
+if db_service is None:
     logger.error("❌ ERROR: Database did not properly initialize")
     sys.exit(1)
 
@@ -63,13 +59,17 @@ class MyBot(commands.Bot):
             activity=activity,
         )
         self.session = None  # placeholder
-        self.db_service = DatabaseService(db=db)
-        self.db = db
+        self.db_service = db_service
+        # Shared by !update and the background loop (see utils/update_engine.py).
+        self.update_engine = PlayerUpdateEngine(self, RIOT_API_KEY)
+        # Started in setup_hook, once the event loop is running.
+        self.loop_watchdog = LoopWatchdog()
 
     async def setup_hook(self):
         """Bot bootup sequence."""
-        self.session = aiohttp.ClientSession()
+        self.session = build_riot_transport()
         logger.info("✅ Persistent HTTP Session created.")
+        self.loop_watchdog.start()
         for filename in os.listdir("./cogs"):
             if filename.endswith(".py"):
                 try:
@@ -79,8 +79,21 @@ class MyBot(commands.Bot):
                 except Exception as e:
                     logger.error(f"❌ Failed to load cog {filename}: {e}")
 
+    async def invoke(self, ctx):
+        """Run a command inside its own trace (see utils/sentry_config.py)."""
+        if ctx.command is None:
+            return await super().invoke(ctx)
+        with sentry_sdk.start_transaction(
+            op="command", name=f"{BOT_PREFIX}{ctx.command.qualified_name}"
+        ) as transaction:
+            await super().invoke(ctx)
+            if ctx.command_failed:
+                transaction.set_status("internal_error")
+
     async def close(self):
         """Bot bootdown sequence."""
+        self.update_engine.close()
+        self.loop_watchdog.stop()
         if self.session:
             await self.session.close()
             logger.info("🛑 HTTP Session closed.")
@@ -111,67 +124,59 @@ async def update(ctx):
     Usage: !update
     Triggers ranked updates for all users in the server where this command is called
     """
-    tracked_users = await bot.db_service.get_guild_tracked_users(ctx.guild.id)
-    if not tracked_users:
-        return await ctx.send("No users tracked in this server. Use !track.")
-    await ctx.send(
-        "Manual ranked update process has begun. "
-        "This can take some time. "
-        "A confirmation message will be sent when the process is completed.",
-    )
-    for user in tracked_users:
-        puuid = user.get("puuid")
-        region = user.get("region")
-        riot_id = user.get("riot_id")
-        cluster = REGION_CLUSTERS.get(region)
-        data = await get_ranked_info(bot.session, puuid, region, RIOT_API_KEY)
-        ranked_data = parse_rank_info(user, data)
-        if not rank_difference(ranked_data):
-            continue
-        match_info = await get_recent_match_info(
-            bot.session,
-            puuid,
-            cluster,
-            RIOT_API_KEY,
-        )
-        processed_match_info = extract_match_info(match_info, puuid)
-        if processed_match_info is None:
-            logger.warning(f"⚠️ Skipping {riot_id}: no match info")
-            continue
-        # Only a genuinely new game advances the win/loss streak. A repeat match
-        # id (e.g. an LP change with no new game, like a dodge) leaves the streak
-        # untouched so it isn't double-counted.
-        match_id = processed_match_info.get("match_id")
-        if match_id and match_id != user.get("last_match_id"):
-            streak = next_streak(user.get("streak"), processed_match_info.get("win"))
-        else:
-            streak = user.get("streak") or 0
-        data["streak"] = streak
-        # Never overwrite a good last_match_id with None (see background.py): a
-        # match DTO missing metadata.matchId yields match_id=None, and clobbering
-        # it would make the next real game look "new" and double-count the streak.
-        if match_id:
-            data["last_match_id"] = match_id
-        await bot.db_service.update_ranked_data(puuid, data)
-        view = MatchDetailsView(
-            processed_match_info,
-            ranked_data,
-            riot_id,
-            puuid,
-            region,
-            streak,
+    engine = bot.update_engine
+    key = f"guild:{ctx.guild.id}"
+    # A second !update while one is running follows it rather than queueing
+    # every player again; only the original caller posts the results.
+    job = engine.jobs.get(key)
+    posting = job is None
+    if posting:
+        tracked_users = await bot.db_service.get_guild_tracked_users(ctx.guild.id)
+        if not tracked_users:
+            return await ctx.send("No users tracked in this server. Use !track.")
+        job = engine.submit(
+            tracked_users,
+            key=key,
+            priority=INTERACTIVE,
+            fresh_within=MANUAL_UPDATE_FRESHNESS_SECONDS,
         )
-        initial_embed = view.create_minimized_embed()
-        message = await ctx.send(embed=initial_embed, view=view)
-        view.message = message
-        # This sleep ensures we stay behind API Rate limit curve.
-        await asyncio.sleep(1.5)
-    return await ctx.send("Ranked information has been updated.")
+    progress = await ctx.send(_update_progress(job))
+    last_edit = time.monotonic()
+    async for results in job.follow():
+        if posting:
+            for result in results:
+                view = result.create_view()
+                initial_embed = view.create_minimized_embed()
+                with (
+                    DISCORD_SEND_SECONDS.time("post"),
+                    sentry_sdk.start_span(op="discord.send", name="ctx.send"),
+                ):
+                    message = await ctx.send(embed=initial_embed, view=view)
+                view.message = message
+        if time.monotonic() - last_edit >= PROGRESS_EDIT_SECONDS:
+            with (
+                DISCORD_SEND_SECONDS.time("progress"),
+                sentry_sdk.start_span(op="discord.send", name="message.edit"),
+            ):
+                await progress.edit(content=_update_progress(job))
+            last_edit = time.monotonic()
+    return await progress.edit(content=_update_progress(job))
 
 
 # Helper Functions
 
 
+def _update_progress(job):
+    """Return the text of `!update`'s progress message for `job`."""
+    changes = len(job.results)
+    counts = f"{job.processed}/{job.total} players checked, {changes} rank changes"
+    if job.skipped:
+        counts += f" ({job.skipped} refreshed moments ago)"
+    if job.finished:
+        return f"✅ Ranked information has been updated: {counts}."
+    return f"🔄 Ranked update in progress: {counts}..."
+
+
 def bot_startup():
     try:
         bot.run(DISCORD_KEY)
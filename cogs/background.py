@@ -1,25 +1,19 @@
-import asyncio
+import time
+from datetime import UTC, datetime
 
+import sentry_sdk
 from discord.ext import commands, tasks
-from firebase_admin import firestore
 
-from bot import RIOT_API_KEY
-from database import (
-    BOT_HEALTH_COLLECTION,
-    HEARTBEAT_DOC,
+from utils.constants import BACKGROUND_CYCLE_SECONDS, UPDATE_FRESHNESS_SECONDS
+from utils.logger_config import log_stats, logger
+from utils.metrics import (
+    CYCLE_PLAYERS,
+    CYCLE_SECONDS,
+    DISCORD_SEND_SECONDS,
+    RIOT_REQUEST_SECONDS,
+    STORAGE_OP_SECONDS,
 )
-from utils.constants import REGION_CLUSTERS
-from utils.exceptions import LiveLOLError
-from utils.helpers import (
-    check_new_riot_id,
-    extract_match_info,
-    next_streak,
-    parse_rank_info,
-    rank_difference,
-)
-from utils.logger_config import logger
-from utils.riot_api import get_ranked_info, get_recent_match_info
-from utils.ui_components import MatchDetailsView
+from utils.sink_config import sink_stats
 
 
 class Background(commands.Cog):
@@ -27,6 +21,17 @@ class Background(commands.Cog):
 
     def __init__(self, bot: commands.Bot) -> None:
         self.bot = bot
+        # Numbers background cycles so their log lines can be grouped.
+        self.cycle_id = 0
+        # The current (or last) cycle's job and when it started, for /healthz,
+        # and the telemetry of the last finished cycle, for the heartbeat too.
+        self.cycle_job = None
+        self.cycle_started = None
+        self.last_cycle = None
+        # time.monotonic() of the last heartbeat written; until the first one,
+        # liveness counts from when the cog was loaded.
+        self.last_beat = None
+        self.loaded_at = time.monotonic()
         if not self.background_update_task.is_running():
             self.background_update_task.start()
             logger.info("✅ Background update task started.")
@@ -41,21 +46,38 @@ class Background(commands.Cog):
 
     @tasks.loop(seconds=60)
     async def heartbeat_task(self) -> None:
-        """Write a liveness heartbeat to Firestore.
+        """Write a liveness heartbeat through the storage backend.
 
         Proves the bot's event loop is alive. `scripts/health.sh` reads this doc
         and derives liveness from how fresh `last_beat` is. Guarded so a heartbeat
-        failure (e.g. a transient Firestore error) never disrupts the bot.
+        failure (e.g. a transient database error) never disrupts the bot.
+        Carries the last cycle's telemetry (see `_cycle_telemetry`) and how long
+        the running one has taken, the update backlog, event-loop lag percentiles
+        and stall sites, and the error sink's and the async log queue's counters
+        when they are enabled.
         """
         try:
-            self.bot.db.collection(BOT_HEALTH_COLLECTION).document(HEARTBEAT_DOC).set(
-                {
-                    "last_beat": firestore.SERVER_TIMESTAMP,
-                    "connected": self.bot.is_ready() and not self.bot.is_closed(),
-                    "latency_ms": round(self.bot.latency * 1000),
-                    "bot_user": str(self.bot.user),
-                },
-            )
+            heartbeat = {
+                "connected": self.bot.is_ready() and not self.bot.is_closed(),
+                "latency_ms": round(self.bot.latency * 1000),
+                "bot_user": str(self.bot.user),
+                "loop_lag": self.bot.loop_watchdog.stats(),
+                "backlog": self.bot.update_engine.queued,
+            }
+            if self.last_cycle is not None or self.cycle_started is not None:
+                heartbeat["cycle"] = {
+                    **(self.last_cycle or {}),
+                    "interval_seconds": BACKGROUND_CYCLE_SECONDS,
+                    "running_seconds": self._running_seconds(),
+                }
+            sink = sink_stats()
+            if sink is not None:
+                heartbeat["sink"] = sink
+            log_queue = log_stats()
+            if log_queue is not None:
+                heartbeat["log_queue"] = log_queue
+            await self.bot.db_service.write_heartbeat(heartbeat)
+            self.last_beat = time.monotonic()
         except Exception as e:
             logger.warning(f"⚠️ Heartbeat write failed: {e}")
 
@@ -63,95 +85,150 @@ class Background(commands.Cog):
     async def before_heartbeat_task(self) -> None:
         await self.bot.wait_until_ready()
 
-    @tasks.loop(minutes=10)
+    @tasks.loop(seconds=BACKGROUND_CYCLE_SECONDS)
     async def background_update_task(self) -> None:
         """Bot background update task."""
-        try:
-            logger.info("♻️ Starting background update loop")
-            tracked_users = await self.bot.db_service.get_all_tracked_users()
-            for user in tracked_users:
-                puuid = user.get("puuid")
-                region = user.get("region")
-                cluster = REGION_CLUSTERS.get(region)
-                riot_id = user.get("riot_id")
-                guild_ids = user.get("guild_ids")
-                # Guard each user so one player's Riot/DB error (rate-limited shard,
-                # missing match, renamed account) never aborts the whole cycle.
-                try:
-                    data = await get_ranked_info(
-                        self.bot.session,
-                        puuid,
-                        region,
-                        RIOT_API_KEY,
-                    )
-                    ranked_data = parse_rank_info(user, data)
-                    if not rank_difference(ranked_data):
-                        continue
-                    match_info = await get_recent_match_info(
-                        self.bot.session,
-                        puuid,
-                        cluster,
-                        RIOT_API_KEY,
-                    )
-                    processed_match_info = extract_match_info(match_info, puuid)
-                    if processed_match_info is None:
-                        logger.warning(
-                            f"⚠️ Skipping {riot_id} this cycle: no match info"
-                        )
-                        continue
-                    # Only a genuinely new game advances the win/loss streak. A
-                    # repeat match id (e.g. an LP change with no new game, like a
-                    # dodge) leaves the streak untouched so it isn't double-counted.
-                    match_id = processed_match_info.get("match_id")
-                    if match_id and match_id != user.get("last_match_id"):
-                        streak = next_streak(
-                            user.get("streak"), processed_match_info.get("win")
-                        )
-                    else:
-                        streak = user.get("streak") or 0
-                    data["streak"] = streak
-                    # Never overwrite a good last_match_id with None: a match DTO
-                    # missing metadata.matchId yields match_id=None, and clobbering
-                    # it would make the next real game look "new" and double-count
-                    # the streak. Only advance the pointer on a real match id.
-                    if match_id:
-                        data["last_match_id"] = match_id
-                    await self.bot.db_service.update_ranked_data(puuid, data)
-                    new_riot_id = check_new_riot_id(
-                        processed_match_info,
-                        puuid,
-                        riot_id,
-                    )
-                    if new_riot_id:
-                        await self.bot.db_service.update_riot_id(puuid, new_riot_id)
-                        logger.info(
-                            f"📝 Name Change Detected: {riot_id} -> {new_riot_id}"
-                        )
-                        riot_id = new_riot_id
-                    for guild in guild_ids:
-                        channel_id = await self.bot.db_service.get_guild_config(guild)
-                        if channel_id is None:
-                            continue
-                        channel = self.bot.get_channel(channel_id)
-                        view = MatchDetailsView(
-                            processed_match_info,
-                            ranked_data,
-                            riot_id,
-                            puuid,
-                            region,
-                            streak,
-                        )
-                        initial_embed = view.create_minimized_embed()
-                        message = await channel.send(embed=initial_embed, view=view)
-                        view.message = message
-                    # This sleep ensures we stay behind API Rate limit curve.
-                    await asyncio.sleep(1.5)
-                except LiveLOLError as e:
-                    logger.warning(f"⚠️ Skipping {riot_id} this cycle: {e}")
-                except Exception as e:
-                    logger.exception(f"❌ ERROR processing {riot_id}: {e}")
-        except Exception as e:
-            logger.exception(f"❌ ERROR: {e}")
+        self.cycle_id += 1
+        log_fields = {"cycle_id": self.cycle_id}
+        started = time.perf_counter()
+        started_at = datetime.now(UTC)
+        riot_calls = RIOT_REQUEST_SECONDS.totals_by("region")
+        storage_ops = sum(STORAGE_OP_SECONDS.totals_by("method").values())
+        job = None
+        self.cycle_job, self.cycle_started = None, time.monotonic()
+        with sentry_sdk.start_transaction(
+            op="cycle", name="background_update_task"
+        ) as transaction:
+            try:
+                logger.info("♻️ Starting background update loop", extra=log_fields)
+                tracked_users = await self.bot.db_service.get_all_tracked_users()
+                tracked_users = await self._drop_guildless(tracked_users)
+                # Players `!update` just fetched are left for the next cycle.
+                job = self.cycle_job = self.bot.update_engine.submit(
+                    tracked_users,
+                    fresh_within=UPDATE_FRESHNESS_SECONDS,
+                )
+                async for results in job.follow():
+                    for result in results:
+                        try:
+                            await self.post_update(result)
+                        except Exception as e:
+                            logger.exception(
+                                f"❌ ERROR posting {result.riot_id}: {e}",
+                                extra={**log_fields, "puuid": result.puuid},
+                            )
+            except Exception as e:
+                transaction.set_status("internal_error")
+                logger.exception(f"❌ ERROR: {e}", extra=log_fields)
+        elapsed = time.perf_counter() - started
+        self.cycle_started = None
+        self.last_cycle = self._cycle_telemetry(
+            job, started_at, elapsed, riot_calls, storage_ops
+        )
+        CYCLE_SECONDS.observe(elapsed)
+        if job is not None:
+            CYCLE_PLAYERS.inc("processed", amount=job.processed - job.skipped)
+            CYCLE_PLAYERS.inc("skipped", amount=job.skipped)
+        latency_ms = round(elapsed * 1000)
+        logger.info(
+            f"✅ Background update loop finished in {latency_ms}ms",
+            extra={**log_fields, "latency_ms": latency_ms},
+        )
+
+    async def _drop_guildless(self, tracked_users):
+        """Return the players that belong to a guild; delete the rest.
+
+        A guild removal interrupted before its final delete leaves players with
+        no guild behind, and nothing else would ever find them again.
+        """
+        tracked = [user for user in tracked_users if user.get("guild_ids")]
+        if len(tracked) < len(tracked_users):
+            try:
+                deleted = await self.bot.db_service.delete_guildless_users()
+                logger.info(f"🧹 Deleted {deleted} player(s) left with no guild")
+            except Exception as e:
+                logger.warning(f"⚠️ Deleting players with no guild failed: {e}")
+        return tracked
+
+    def _cycle_telemetry(self, job, started_at, elapsed, riot_calls, storage_ops):
+        """Summarise a finished cycle for the heartbeat doc.
+
+        `riot_calls` and `storage_ops` are the metric totals when the cycle began;
+        the differences include any `!update` that ran alongside it.
+        """
+        riot_calls_now = RIOT_REQUEST_SECONDS.totals_by("region")
+        telemetry = {
+            "cycle_id": self.cycle_id,
+            "started_at": started_at.isoformat(timespec="seconds"),
+            "ended_at": datetime.now(UTC).isoformat(timespec="seconds"),
+            "duration_seconds": round(elapsed, 1),
+            "riot_calls": {
+                region: count - riot_calls.get(region, 0)
+                for region, count in riot_calls_now.items()
+                if count > riot_calls.get(region, 0)
+            },
+            "storage_ops": sum(STORAGE_OP_SECONDS.totals_by("method").values())
+            - storage_ops,
+        }
+        if job is not None:
+            telemetry.update(
+                players=job.total,
+                processed=job.processed - job.skipped,
+                changed=len(job.results),
+                skipped=job.skipped,
+                errored=job.failed,
+            )
+        return telemetry
+
+    def _running_seconds(self):
+        if self.cycle_started is None:
+            return None
+        return round(time.monotonic() - self.cycle_started, 1)
+
+    def slowest_cycle_seconds(self):
+        """Return the longer of the last cycle's duration and the running one's."""
+        durations = [self._running_seconds()]
+        if self.last_cycle is not None:
+            durations.append(self.last_cycle["duration_seconds"])
+        return max((d for d in durations if d is not None), default=None)
+
+    def beat_age(self) -> float:
+        """Seconds since the last heartbeat was written (or since loading)."""
+        return time.monotonic() - (self.last_beat or self.loaded_at)
+
+    def cycle_progress(self) -> dict:
+        """Return the background cycle's state: running or not, and how far along."""
+        job = self.cycle_job
+        progress = {
+            "cycle_id": self.cycle_id,
+            "running": self.cycle_started is not None,
+            "last_duration_seconds": (
+                None if self.last_cycle is None else self.last_cycle["duration_seconds"]
+            ),
+        }
+        if self.cycle_started is not None:
+            progress["elapsed_seconds"] = self._running_seconds()
+        if job is not None:
+            progress.update(
+                processed=job.processed, skipped=job.skipped, total=job.total
+            )
+        return progress
+
+    async def post_update(self, result) -> None:
+        """Post a recorded update in the update channel of each of its guilds."""
+        for guild in result.guild_ids:
+            channel_id = await self.bot.db_service.get_guild_config(guild)
+            if channel_id is None:
+                continue
+            channel = self.bot.get_channel(channel_id)
+            view = result.create_view()
+            initial_embed = view.create_minimized_embed()
+            with (
+                DISCORD_SEND_SECONDS.time("post"),
+                sentry_sdk.start_span(op="discord.send", name="channel.send"),
+            ):
+                message = await channel.send(embed=initial_embed, view=view)
+            view.message = message
 
     @background_update_task.before_loop
     async def before_background_task(self) -> None:
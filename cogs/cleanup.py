@@ -0,0 +1,105 @@
+import asyncio
+import os
+
+import discord
+from discord.ext import commands, tasks
+
+from utils.logger_config import logger
+
+# Reconciliation deletes for good, so it refuses to remove more than this share
+# of the stored guilds at once - the sign of a bot started with another token
+# against this database, or with a partial guild list - unless
+# CLEANUP_ALLOW_BULK=1 is set.
+MAX_STALE_SHARE = 0.5
+
+
+class Cleanup(commands.Cog):
+    """Removes the data of guilds the bot is no longer in, in the background."""
+
+    def __init__(self, bot: commands.Bot) -> None:
+        self.bot = bot
+        # Guild ids (str) still to clean up, in arrival order.
+        self.pending: dict[str, None] = {}
+        if not self.cleanup_task.is_running():
+            self.cleanup_task.start()
+            logger.info("✅ Guild cleanup task started.")
+
+    def cog_unload(self) -> None:
+        """Clean up tasks if cog is unloaded."""
+        self.cleanup_task.cancel()
+
+    @commands.Cog.listener()
+    async def on_guild_remove(self, guild: discord.Guild) -> None:
+        """Triggered when the bot is kicked from a server."""
+        logger.info(f"Bot removed from guild: {guild.name} ({guild.id})")
+        await self.bot.db_service.remove_guild_config(guild.id)
+        self.pending[str(guild.id)] = None
+
+    @commands.Cog.listener()
+    async def on_guild_join(self, guild: discord.Guild) -> None:
+        # Re-invited before the cleanup got to it: keep what is left.
+        self.pending.pop(str(guild.id), None)
+
+    @tasks.loop(seconds=30)
+    async def cleanup_task(self) -> None:
+        """Work through pending guild removals, one committed chunk at a time."""
+        for guild_id in list(self.pending):
+            await self.remove_guild(guild_id)
+
+    @cleanup_task.before_loop
+    async def before_cleanup_task(self) -> None:
+        await self.bot.wait_until_ready()
+        await self.reconcile()
+
+    async def reconcile(self) -> None:
+        """Queue every stored guild the bot left while it was offline.
+
+        Skipped with a WARNING when most of the stored guilds look departed
+        (see MAX_STALE_SHARE).
+        """
+        try:
+            known = await self.bot.db_service.get_known_guild_ids()
+        except Exception as e:
+            logger.warning(f"⚠️ Guild reconciliation failed: {e}")
+            return
+        current = {str(guild.id) for guild in self.bot.guilds}
+        stale = sorted(known - current)
+        if len(stale) > MAX_STALE_SHARE * len(known) and not os.getenv(
+            "CLEANUP_ALLOW_BULK"
+        ):
+            logger.warning(
+                f"⚠️ Skipping guild reconciliation: {len(stale)} of {len(known)}"
+                f" stored guild(s) are not among the bot's {len(current)} guild(s)."
+                " Wrong token or database, or an incomplete guild list? Set"
+                " CLEANUP_ALLOW_BULK=1 to remove them."
+            )
+            return
+        if stale:
+            logger.info(f"🧹 Found {len(stale)} departed guild(s) to clean up")
+        for guild_id in stale:
+            self.pending[guild_id] = None
+
+    async def remove_guild(self, guild_id: str) -> None:
+        """Remove a departed guild's config and players, checkpointing per chunk.
+
+        Progress lives in storage (the guild's membership index shrinks with
+        every committed chunk), so a failure or restart resumes where it left
+        off; the guild stays pending and is retried on the next tick.
+        """
+        try:
+            await self.bot.db_service.remove_guild_config(guild_id)
+            while remaining := await self.bot.db_service.untrack_guild_chunk(guild_id):
+                if guild_id not in self.pending:
+                    return
+                logger.info(f"🧹 Guild {guild_id}: {remaining} player(s) left")
+                # Yield between chunks so commands and heartbeats keep flowing.
+                await asyncio.sleep(0)
+        except Exception as e:
+            logger.warning(f"⚠️ Cleanup of guild {guild_id} failed, will retry: {e}")
+            return
+        self.pending.pop(guild_id, None)
+        logger.info(f"🧹 Finished cleaning up guild {guild_id}")
+
+
+async def setup(bot: commands.Bot) -> None:
+    await bot.add_cog(Cleanup(bot))
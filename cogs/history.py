@@ -0,0 +1,60 @@
+import discord
+from discord.ext import commands
+
+from utils.helpers import describe_score, parse_riot_id
+from utils.lp_history import summarize
+
+# Most recent rank changes listed under the summary.
+RECENT_CHANGES = 10
+
+
+class History(commands.Cog):
+    """Handles LP history lookups."""
+
+    def __init__(self, bot: commands.Bot) -> None:
+        self.bot = bot
+
+    @commands.cooldown(1, 5, commands.BucketType.user)
+    @commands.bot_has_permissions(send_messages=True, embed_links=True)
+    @commands.command()
+    async def history(self, ctx: commands.Context, *, riot_id: str) -> None:
+        """Shows how a tracked player's rank has moved over time.
+
+        Usage: !history <riotid>
+        Summarizes the recorded rank changes of a player tracked in this server.
+        """
+        parsed_riot_id = parse_riot_id(riot_id)
+        if not parsed_riot_id:
+            return await ctx.send(
+                "Invalid input, please ensure syntax is: !history username#tagline.",
+            )
+        riot_id = f"{parsed_riot_id[0]}#{parsed_riot_id[1]}"
+        board = await self.bot.db_service.get_guild_leaderboard(ctx.guild.id)
+        puuid = next(
+            (
+                puuid
+                for puuid, entry in board.entries.items()
+                if (entry.get("riot_id") or "").lower() == riot_id.lower()
+            ),
+            None,
+        )
+        if puuid is None:
+            return await ctx.send(f"{riot_id} is not being tracked in this server.")
+        records = await self.bot.db_service.get_lp_history(puuid)
+        if not records:
+            return await ctx.send(f"No rank history recorded for {riot_id} yet.")
+        recent = [
+            f"<t:{timestamp}:R> - {describe_score(score)}"
+            for timestamp, score, _match in reversed(records[-RECENT_CHANGES:])
+        ]
+        embed = discord.Embed(
+            title=f"📈 Rank History for {board.entries[puuid]['riot_id']}",
+            description="\n".join(summarize(records)),
+            color=discord.Color.blue(),
+        )
+        embed.add_field(name="Recent changes", value="\n".join(recent), inline=False)
+        await ctx.send(embed=embed)
+
+
+async def setup(bot: commands.Bot) -> None:
+    await bot.add_cog(History(bot))
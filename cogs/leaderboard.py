@@ -1,7 +1,9 @@
-import discord
 from discord.ext import commands
 
-from utils.constants import RANK_ORDER, TIER_ORDER
+from utils.constants import GLOBAL_LEADERBOARD_SIZE, REGION_CLUSTERS
+from utils.helpers import parse_region
+from utils.leaderboard import GuildLeaderboard
+from utils.ui_components import LeaderboardView
 
 
 class Leaderboard(commands.Cog):
@@ -13,54 +15,45 @@ class Leaderboard(commands.Cog):
     @commands.cooldown(1, 5, commands.BucketType.user)
     @commands.bot_has_permissions(send_messages=True, embed_links=True)
     @commands.command()
-    async def leaderboard(self, ctx: commands.Context) -> None:
+    async def leaderboard(self, ctx: commands.Context, scope: str = "") -> None:
         """Prints the servers leaderboard.
 
-        Usage: !leaderboard
-        Prints out the tracked users in order of rank from highest to lowest
+        Usage: !leaderboard [global | region]
+        Prints out the tracked users in order of rank from highest to lowest,
+        one page at a time. `!leaderboard global` ranks the top players tracked
+        in every server, and `!leaderboard <region>` (e.g. na1) the top players
+        of one region.
         """
-        tracked_users = await self.bot.db_service.get_guild_tracked_users(ctx.guild.id)
-        if not tracked_users:
-            return await ctx.send("No users tracked in this server. Use !track.")
-        leaderboard_data = []
-        for data in tracked_users:
-            leaderboard_data.append(
-                {
-                    "name": data.get("riot_id"),
-                    "tier": data.get("tier", "UNRANKED"),
-                    "rank": data.get("rank", ""),
-                    "lp": data.get("LP", 0),
-                    "region": data.get("region"),
-                },
-            )
-        leaderboard_data.sort(
-            key=lambda x: (
-                TIER_ORDER.get(x["tier"].upper(), -1),
-                RANK_ORDER.get(x["rank"], 0),
-                x["lp"],
-            ),
-            reverse=True,
-        )
-        embed = discord.Embed(
-            title=f"🏆 Leaderboard for {ctx.guild.name}",
-            color=discord.Color.gold(),
-        )
-        description = ""
-        for i, player in enumerate(leaderboard_data, 1):
-            if i == 1:
-                rank_prefix = "🥇"
-            elif i == 2:
-                rank_prefix = "🥈"
-            elif i == 3:
-                rank_prefix = "🥉"
+        if not scope:
+            # The board is kept sorted by the storage backend as ranks change.
+            board = await self.bot.db_service.get_guild_leaderboard(ctx.guild.id)
+            if not board:
+                return await ctx.send("No users tracked in this server. Use !track.")
+            view = LeaderboardView(board, f"🏆 Leaderboard for {ctx.guild.name}")
+        else:
+            region = parse_region(scope)
+            if region == "global":
+                region, title = None, "🌍 Global Leaderboard"
+            elif region in REGION_CLUSTERS:
+                title = f"🏆 {region} Leaderboard"
             else:
-                rank_prefix = f"**{i}.**"
-            description += (
-                f"{rank_prefix} ({player['region']}) **{player['name']}** - "
-                f"{player['tier']} {player['rank']} ({player['lp']} LP)\n"
+                return await ctx.send(
+                    "Invalid input, please ensure syntax is: "
+                    "!leaderboard, !leaderboard global or !leaderboard region.",
+                )
+            top_players = await self.bot.db_service.get_top_players(
+                GLOBAL_LEADERBOARD_SIZE,
+                region,
+            )
+            if not top_players:
+                return await ctx.send("No ranked players tracked yet.")
+            view = LeaderboardView(
+                GuildLeaderboard(top_players),
+                title,
+                jump_to_self=False,
             )
-        embed.description = description
-        await ctx.send(embed=embed)
+        message = await ctx.send(embed=view.create_embed(), view=view)
+        view.message = message
 
 
 async def setup(bot: commands.Bot) -> None:
@@ -0,0 +1,106 @@
+import os
+
+from aiohttp import web
+from discord.ext import commands
+
+from utils import riot_api
+from utils.constants import BACKGROUND_CYCLE_SECONDS
+from utils.health import classify_liveness
+from utils.logger_config import log_stats, logger
+from utils.metrics import REGISTRY
+from utils.sink_config import sink_stats
+
+# Local only by default; METRICS_PORT=0 turns the endpoints off. The Docker image
+# sets METRICS_HOST=0.0.0.0 and the deploy publishes the port on the host's
+# loopback only (README, ci.yml).
+DEFAULT_METRICS_HOST = "127.0.0.1"
+DEFAULT_METRICS_PORT = 9108
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Metrics(commands.Cog):
+    """Serves the bot's local HTTP endpoints: /metrics and /healthz."""
+
+    def __init__(self, bot: commands.Bot) -> None:
+        self.bot = bot
+        self.host = os.getenv("METRICS_HOST", DEFAULT_METRICS_HOST)
+        self.port = int(os.getenv("METRICS_PORT", DEFAULT_METRICS_PORT))
+        self.runner = None
+
+    def build_app(self) -> web.Application:
+        """Return the HTTP app; its routes are the bot's local endpoints."""
+        app = web.Application()
+        app.router.add_get("/metrics", self.serve_metrics)
+        app.router.add_get("/healthz", self.serve_health)
+        return app
+
+    async def cog_load(self) -> None:
+        """Start the HTTP endpoint; a taken port is logged, not fatal."""
+        if not self.port:
+            logger.info("Metrics endpoint disabled (METRICS_PORT=0).")
+            return
+        runner = web.AppRunner(self.build_app(), access_log=None)
+        await runner.setup()
+        try:
+            await web.TCPSite(runner, self.host, self.port).start()
+        except OSError as e:
+            logger.warning(f"⚠️ Metrics endpoint not started: {e}")
+            await runner.cleanup()
+            return
+        self.runner = runner
+        logger.info(f"✅ Metrics endpoint on http://{self.host}:{self.port}/metrics")
+
+    async def cog_unload(self) -> None:
+        """Stop the HTTP endpoint."""
+        if self.runner is not None:
+            await self.runner.cleanup()
+            self.runner = None
+
+    async def serve_metrics(self, _request: web.Request) -> web.Response:
+        return web.Response(
+            body=REGISTRY.render().encode("utf-8"),
+            headers={"Content-Type": PROMETHEUS_CONTENT_TYPE},
+        )
+
+    async def serve_health(self, _request: web.Request) -> web.Response:
+        return web.json_response(self.health())
+
+    def health(self) -> dict:
+        """Return liveness as `scripts/heartbeat_check.py` would, plus live state.
+
+        Liveness uses the same `classify_liveness` on the age of the last
+        heartbeat this process wrote; the rest is what a Firestore read cannot
+        show: cycle progress, loop lag, Riot rate-limit headroom and queue depths.
+        """
+        background = self.bot.get_cog("Background")
+        if background is None:
+            return {"liveness": "unknown", "detail": "background cog not loaded"}
+        age = background.beat_age()
+        connected = self.bot.is_ready() and not self.bot.is_closed()
+        liveness, detail = classify_liveness(
+            age,
+            connected,
+            background.slowest_cycle_seconds(),
+            BACKGROUND_CYCLE_SECONDS,
+        )
+        sink = sink_stats()
+        log_queue = log_stats()
+        return {
+            "liveness": liveness,
+            "detail": detail,
+            "age_seconds": round(age),
+            "source": "healthz",
+            "cycle": background.cycle_progress(),
+            "loop_lag": self.bot.loop_watchdog.stats(),
+            "rate_limits": dict(riot_api.rate_limit_headroom),
+            "queues": {
+                "updates": self.bot.update_engine.queued,
+                "sink": None if sink is None else sink["depth"],
+                "sink_journal": None if sink is None else sink["journal_depth"],
+                "log": None if log_queue is None else log_queue["depth"],
+            },
+        }
+
+
+async def setup(bot: commands.Bot) -> None:
+    await bot.add_cog(Metrics(bot))
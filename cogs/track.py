@@ -41,7 +41,7 @@ class Track(commands.Cog):
         tw2 - Taiwan, Hong Kong, & Macao
         vn2 - Vietnam
         """
-        if self.bot.db is None:
+        if self.bot.db_service is None:
             raise DatabaseError("The database is currently unavailable.")
         parsed_region = parse_region(region)
         if not parsed_region:
@@ -111,7 +111,7 @@ class Track(commands.Cog):
         Given a riotid, the bot will attempt to remove the user from the bot's database,
         "untracking" the user.
         """
-        if self.bot.db is None:
+        if self.bot.db_service is None:
             raise DatabaseError("The database is currently unavailable.")
         parsed = parse_riot_id(riot_id)
         if not parsed:
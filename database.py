@@ -11,6 +11,8 @@ from utils.logger_config import logger
 
 TRACKED_USERS_COLLECTION = "tracked_users"
 GUILD_CONFIG_COLLECTION = "guild_config"
+GUILD_MEMBERS_COLLECTION = "guild_members"
+LP_HISTORY_COLLECTION = "lp_history"
 BOT_HEALTH_COLLECTION = "bot_health"
 HEARTBEAT_DOC = "heartbeat"
 
@@ -37,3 +39,32 @@ def database_startup():
             logger.exception(f"❌ ERROR: initializing Firebase: {e}")
             return None
     return firestore.client()
+
+
+def storage_startup():
+    """Return the storage backend named by `STORAGE_BACKEND`, or None on failure.
+
+    `firestore` (the default) needs Firebase credentials; `sqlite` keeps
+    everything in a local file at `SQLITE_PATH`.
+    """
+    backend = os.getenv("STORAGE_BACKEND", "firestore").strip().lower()
+    if backend == "sqlite":
+        from utils.sqlite_service import SQLiteDatabaseService
+
+        path = os.getenv("SQLITE_PATH", "./data/livelol.db")
+        try:
+            service = SQLiteDatabaseService(path)
+        except Exception as e:
+            logger.exception(f"❌ ERROR: opening SQLite database {path}: {e}")
+            return None
+        logger.info(f"✅ SQLite storage opened at {path}")
+        return service
+    if backend != "firestore":
+        logger.error(f"❌ ERROR: Unknown STORAGE_BACKEND {backend!r}")
+        return None
+    db = database_startup()
+    if db is None:
+        return None
+    from utils.db_service import DatabaseService
+
+    return DatabaseService(db=db)
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+"""Add the rank `score` field to tracked-user docs written before it existed.
+
+Global and regional leaderboards (`!leaderboard global|<region>`) order by
+`score` in Firestore, which skips docs without the field. New and updated
+players get it automatically; run this once after deploying to cover the rest:
+
+    uv run python3 scripts/backfill_scores.py
+
+Needs the same Firebase creds the bot uses. Safe to re-run.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv  # noqa: E402
+
+from database import database_startup  # noqa: E402
+from utils.db_service import DatabaseService  # noqa: E402
+
+
+def main() -> int:
+    load_dotenv()
+    db = database_startup()
+    if db is None:
+        return 1
+    updated = asyncio.run(DatabaseService(db).backfill_scores())
+    print(f"added score to {updated} tracked-user docs")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
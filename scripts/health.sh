@@ -5,14 +5,18 @@
 # The dashboard runs this live to render the project's health; nothing caches it.
 #
 # Config: PROJECT.yaml error_sink (kind: self-hosted - the owned sink) + SINK_TOKEN env.
-# Liveness comes from the bot's Firestore heartbeat (cogs/background.py writes
-# bot_health/heartbeat every 60s; scripts/heartbeat_check.py reads it). If the check
-# can't run (no uv/creds/network) liveness degrades to `unknown` - never a faked green.
+# Liveness comes from the bot's own /healthz endpoint (cogs/metrics.py, port 9108,
+# published to the host's loopback by `docker run -p 127.0.0.1:9108:9108`) when
+# it answers, else from its Firestore heartbeat (cogs/background.py writes
+# bot_health/heartbeat every 60s; scripts/heartbeat_check.py reads it). Both classify
+# the same way (utils/health.py). If neither can run (no uv/creds/network) liveness
+# degrades to `unknown` - never a faked green.
 set -euo pipefail
 
 PROJECT="${PROJECT:-livelol}"
 WINDOW="${WINDOW:-24h}"
 SINK_REF="${SINK_REF:-https://livelolsink.duckdns.org}"   # PROJECT.yaml error_sink.ref; set empty to skip the sink query
+HEALTHZ_URL="${HEALTHZ_URL:-http://127.0.0.1:9108/healthz}"   # set empty to go straight to Firestore
 HERE="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)"
 
 # --- errors block (null-safe; kind: none -> nulls) ----------------------------
@@ -23,10 +27,18 @@ else
   ERRORS="$(python3 "$HERE/errors_block.py" --project "$PROJECT" --window "$WINDOW")"
 fi
 
-# --- liveness: from the bot's Firestore heartbeat -----------------------------
-# Needs the project venv (firebase-admin), so run via `uv run` from the repo root.
+# --- liveness: from the bot's /healthz, else its Firestore heartbeat ----------
+# /healthz answers in milliseconds from the running bot. Only when it is unreachable
+# (bot down, other host) pay for the Firestore read, which needs the project venv
+# (firebase-admin), so run via `uv run` from the repo root.
 # Any failure -> empty output -> liveness falls back to `unknown` below.
-HB_JSON="$( (cd "$HERE/.." && uv run --quiet python3 scripts/heartbeat_check.py) 2>/dev/null || true )"
+HB_JSON=""
+if [[ -n "$HEALTHZ_URL" ]]; then
+  HB_JSON="$(curl -fsS --max-time 2 "$HEALTHZ_URL" 2>/dev/null || true)"
+fi
+if [[ -z "$HB_JSON" ]]; then
+  HB_JSON="$( (cd "$HERE/.." && uv run --quiet python3 scripts/heartbeat_check.py) 2>/dev/null || true )"
+fi
 CHECKED_AT="$(date -u +%Y-%m-%dT%H:%M:%SZ)"
 
 python3 - "$CHECKED_AT" "$ERRORS" "$HB_JSON" <<'PY'
@@ -2,11 +2,16 @@
 """Derive LiveLOL bot liveness from its Firestore heartbeat.
 
 The bot writes a `bot_health/heartbeat` doc every 60s (see `cogs/background.py`
-`heartbeat_task`). This reads that doc and maps its freshness to the
-everythingdev liveness word (MANAGED-PROJECTS.md), then prints a small JSON object:
+`heartbeat_task`). This reads that doc and maps its freshness - and whether the
+last background cycle overran its polling interval - to the everythingdev liveness
+word (MANAGED-PROJECTS.md), then prints a small JSON object:
 
     {"liveness": "green|degraded|down|unknown", "detail": "...", "age_seconds": N}
 
+`health.sh` asks the bot's in-process `/healthz` endpoint first (same
+classification, no Firestore round trip) and only runs this when that endpoint is
+unreachable, e.g. when the bot process is gone.
+
 Degrade, don't fail: any error (missing creds, Firestore unreachable, no doc)
 prints `liveness: unknown` and exits 0, so `health.sh` never breaks. Run from the
 project root via `uv run python3 scripts/heartbeat_check.py` (needs firebase-admin
@@ -24,9 +29,14 @@ from datetime import UTC, datetime
 # resolves whether run from the root or via `uv run python3 scripts/heartbeat_check.py`.
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-# Thresholds (seconds) - tunable via env. Beat interval is 60s in the bot.
-GREEN_MAX = int(os.getenv("HEARTBEAT_GREEN_MAX", "180"))  # <= 3 missed beats
-DOWN_MAX = int(os.getenv("HEARTBEAT_DOWN_MAX", "900"))  # 15 min -> down
+# Thresholds and classification are shared with the bot's /healthz endpoint.
+from utils.health import (  # noqa: E402 - needs the sys.path entry above
+    DOWN_MAX,
+    GREEN_MAX,
+    classify_liveness,
+)
+
+__all__ = ["DOWN_MAX", "GREEN_MAX", "classify_liveness", "main"]
 
 APP_NAME = "heartbeat-check"
 
@@ -38,22 +48,6 @@ def _emit(liveness: str, detail: str, age: float | None = None) -> None:
     print(json.dumps(out))
 
 
-def classify_liveness(age_seconds: float, connected: bool) -> tuple[str, str]:
-    """Map heartbeat freshness + connection state to a liveness word + detail.
-
-    Pure and side-effect-free so it can be unit-tested without Firestore.
-    Assumes a heartbeat doc with a valid `last_beat` exists (missing docs are
-    handled as `down` by the caller).
-    """
-    if age_seconds > DOWN_MAX:
-        return "down", f"last beat {round(age_seconds)}s ago (> {DOWN_MAX}s)"
-    if not connected:
-        return "degraded", "beating but not connected to Discord"
-    if age_seconds > GREEN_MAX:
-        return "degraded", f"stale: last beat {round(age_seconds)}s ago"
-    return "green", f"beating, connected ({round(age_seconds)}s ago)"
-
-
 def _load_client():
     """Init a throwaway firebase-admin app the same way the bot does."""
     import base64
@@ -99,7 +93,15 @@ def main() -> int:
 
         age = (datetime.now(UTC) - last_beat).total_seconds()
         connected = bool(data.get("connected", False))
-        liveness, detail = classify_liveness(age, connected)
+        # A cycle still running past the interval is as late as a finished one.
+        cycle = data.get("cycle") or {}
+        durations = [cycle.get("duration_seconds"), cycle.get("running_seconds")]
+        liveness, detail = classify_liveness(
+            age,
+            connected,
+            max((d for d in durations if d is not None), default=None),
+            cycle.get("interval_seconds"),
+        )
         _emit(liveness, detail, age)
         return 0
     except Exception as exc:  # noqa: BLE001 - fail-safe: never break health.sh
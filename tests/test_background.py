@@ -0,0 +1,95 @@
+"""Tests for the background cycle's telemetry (cogs/background.py)."""
+
+from types import SimpleNamespace
+
+import pytest
+
+from cogs.background import Background
+from utils.constants import BACKGROUND_CYCLE_SECONDS
+from utils.metrics import RIOT_REQUEST_SECONDS
+
+
+class _Job:
+    """A finished update job: 5 players, 1 fresh, 1 failed, 1 changed."""
+
+    total = processed = 5
+    skipped = failed = 1
+    results = []
+
+    async def follow(self):
+        RIOT_REQUEST_SECONDS.observe(
+            0.1, "/lol/league/v4/entries/by-puuid", "na1", "200"
+        )
+        RIOT_REQUEST_SECONDS.observe(
+            0.1, "/lol/league/v4/entries/by-puuid", "na1", "200"
+        )
+        RIOT_REQUEST_SECONDS.observe(0.1, "/lol/match/v5/matches", "americas", "200")
+        yield []
+
+
+class _Storage:
+    def __init__(self):
+        self.users = [{"puuid": f"p{i}", "guild_ids": ["111"]} for i in range(5)]
+        self.guildless_deleted = 0
+
+    async def get_all_tracked_users(self):
+        return list(self.users)
+
+    async def delete_guildless_users(self):
+        self.guildless_deleted += 1
+        return 1
+
+    async def write_heartbeat(self, data):
+        self.heartbeat = data
+
+
+def _submit(users, **_kwargs):
+    _submit.users = users
+    return _Job()
+
+
+def _cog():
+    # __init__ would start the task loops; only the cycle state is needed.
+    cog = object.__new__(Background)
+    cog.bot = SimpleNamespace(
+        db_service=_Storage(),
+        update_engine=SimpleNamespace(submit=_submit, queued=7),
+        loop_watchdog=SimpleNamespace(stats=dict),
+        is_ready=lambda: True,
+        is_closed=lambda: False,
+        latency=0.05,
+        user="LiveLOL#0001",
+    )
+    cog.cycle_id = 0
+    cog.cycle_job = cog.cycle_started = cog.last_cycle = None
+    return cog
+
+
+@pytest.mark.asyncio
+async def test_cycle_telemetry_lands_in_the_heartbeat():
+    cog = _cog()
+    await Background.background_update_task.coro(cog)
+    await Background.heartbeat_task.coro(cog)
+
+    heartbeat = cog.bot.db_service.heartbeat
+    cycle = heartbeat["cycle"]
+    assert heartbeat["backlog"] == 7
+    assert cycle["cycle_id"] == 1
+    assert cycle["started_at"] <= cycle["ended_at"]
+    assert cycle["interval_seconds"] == BACKGROUND_CYCLE_SECONDS
+    assert cycle["running_seconds"] is None
+    assert (cycle["players"], cycle["processed"], cycle["changed"]) == (5, 4, 0)
+    assert (cycle["skipped"], cycle["errored"]) == (1, 1)
+    assert cycle["riot_calls"] == {"na1": 2, "americas": 1}
+    assert cycle["storage_ops"] == 0  # the stand-in storage is not a backend
+
+
+@pytest.mark.asyncio
+async def test_players_with_no_guild_are_deleted_not_polled():
+    # e.g. a removal that died between leaving the guild and deleting the player
+    cog = _cog()
+    cog.bot.db_service.users.append({"puuid": "orphan", "guild_ids": []})
+    await Background.background_update_task.coro(cog)
+
+    assert [user["puuid"] for user in _submit.users] == [f"p{i}" for i in range(5)]
+    assert cog.bot.db_service.guildless_deleted == 1
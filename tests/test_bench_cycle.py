@@ -0,0 +1,39 @@
+"""Tests for the cycle benchmark's baseline comparison (benchmarks/bench_cycle.py)."""
+
+from benchmarks.bench_cycle import compare
+
+CONFIG = {"players": 100, "seed": 0}
+
+
+def _result(**metrics):
+    return {"config": CONFIG, "metrics": metrics}
+
+
+def test_slower_cycle_beyond_threshold_is_a_regression():
+    regressions = compare(
+        _result(cycle_wall_s=12.0),
+        _result(cycle_wall_s=10.0),
+        threshold=0.10,
+    )
+    assert len(regressions) == 1
+    assert regressions[0].startswith("cycle_wall_s")
+
+
+def test_changes_within_threshold_or_improvements_pass():
+    current = _result(cycle_wall_s=10.5, posts_per_second=200.0, peak_rss_mb=80.0)
+    baseline = _result(cycle_wall_s=10.0, posts_per_second=150.0, peak_rss_mb=90.0)
+    assert compare(current, baseline, threshold=0.10) == []
+
+
+def test_lower_throughput_is_a_regression():
+    regressions = compare(
+        _result(posts_per_second=50.0),
+        _result(posts_per_second=100.0),
+        threshold=0.10,
+    )
+    assert [r.split(":")[0] for r in regressions] == ["posts_per_second"]
+
+
+def test_different_config_is_not_compared():
+    baseline = {"config": {"players": 10}, "metrics": {"cycle_wall_s": 1.0}}
+    assert compare(_result(cycle_wall_s=99.0), baseline, threshold=0.10) == []
@@ -0,0 +1,92 @@
+"""Tests for the departed-guild cleanup job (cogs/cleanup.py)."""
+
+from unittest.mock import MagicMock
+
+import pytest
+
+from cogs.cleanup import Cleanup
+from utils.sqlite_service import SQLiteDatabaseService
+
+RANKED = {"tier": "GOLD", "rank": "II", "LP": 40}
+
+
+def _make_cog(db_service, guild_ids=()):
+    bot = MagicMock()
+    bot.db_service = db_service
+    bot.guilds = [MagicMock(id=guild_id) for guild_id in guild_ids]
+    cog = object.__new__(Cleanup)
+    cog.bot = bot
+    cog.pending = {}
+    return cog
+
+
+@pytest.mark.asyncio
+async def test_reconcile_queues_guilds_left_while_offline_and_removes_them():
+    service = SQLiteDatabaseService()
+    for i in range(5):
+        await service.track_user(111, 1, f"P{i}#NA1", f"p{i}", RANKED, "na1")
+    await service.track_user(222, 2, "P0#NA1", "p0", RANKED, "na1")
+    await service.set_guild_config(333, 9)
+    for guild_id in (444, 555):
+        await service.set_guild_config(guild_id, 9)
+    cog = _make_cog(service, guild_ids=[222, 444, 555])
+
+    await cog.reconcile()
+    assert list(cog.pending) == ["111", "333"]
+
+    for guild_id in list(cog.pending):
+        await cog.remove_guild(guild_id)
+
+    assert cog.pending == {}
+    assert await service.get_known_guild_ids() == {"222", "444", "555"}
+    [user] = await service.get_all_tracked_users()
+    assert user["guild_ids"] == ["222"]
+    service.close()
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("guild_ids", [[], [222]])
+async def test_reconcile_refuses_to_remove_most_stored_guilds(monkeypatch, guild_ids):
+    # No guilds at all, or a token/database mismatch: every stored guild looks
+    # departed. Nothing is queued unless bulk removal is opted into.
+    monkeypatch.delenv("CLEANUP_ALLOW_BULK", raising=False)
+    service = SQLiteDatabaseService()
+    for guild_id in (111, 333):
+        await service.set_guild_config(guild_id, 9)
+    cog = _make_cog(service, guild_ids=guild_ids)
+
+    await cog.reconcile()
+    assert cog.pending == {}
+
+    monkeypatch.setenv("CLEANUP_ALLOW_BULK", "1")
+    await cog.reconcile()
+    assert list(cog.pending) == ["111", "333"]
+    service.close()
+
+
+@pytest.mark.asyncio
+async def test_removal_is_chunked_and_resumes_after_a_failure():
+    service = SQLiteDatabaseService()
+    for i in range(5):
+        await service.track_user(111, 1, f"P{i}#NA1", f"p{i}", RANKED, "na1")
+    real_chunk = service.untrack_guild_chunk
+    calls = []
+
+    async def flaky_chunk(guild_id):
+        calls.append(guild_id)
+        if len(calls) == 2:
+            raise RuntimeError("backend hiccup")
+        return await real_chunk(guild_id, limit=2)
+
+    service.untrack_guild_chunk = flaky_chunk
+    cog = _make_cog(service)
+    cog.pending["111"] = None
+
+    await cog.remove_guild("111")
+    assert "111" in cog.pending
+    assert len(await service.get_guild_tracked_users(111)) == 3
+
+    await cog.remove_guild("111")
+    assert cog.pending == {}
+    assert await service.get_all_tracked_users() == []
+    service.close()
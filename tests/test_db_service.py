@@ -1,32 +1,99 @@
-"""Tests for utils/db_service.py untrack paths.
+"""Tests for utils/db_service.py untrack and guild membership paths.
 
 Firestore expands a dotted field path like ``server_info.<gid>`` written via
 ``.set(payload, merge=True)`` into a real NESTED map - ``to_dict()`` returns
 ``{"server_info": {"<gid>": {...}}}``, never a flat ``"server_info.<gid>"``
-key. These tests pin the untrack methods to removing the right nested entry
-rather than a flat key that never exists.
+key. Untracking removes that nested entry with a field-level DELETE_FIELD on
+the quoted path ``server_info.`<gid>` `` (a bare numeric segment is not a valid
+field path), next to an ArrayRemove on ``guild_ids``.
+
+Writes go through a WriteBatch so the tracked-user doc and the guild's
+membership doc change together; the fake batch below applies each write to the
+doc ref it targets, so the assertions read the same as direct writes.
 """
 
 from unittest.mock import MagicMock
 
 import pytest
+from firebase_admin import firestore
+from google.api_core.exceptions import FailedPrecondition
 
+from database import (
+    GUILD_MEMBERS_COLLECTION,
+    LP_HISTORY_COLLECTION,
+    TRACKED_USERS_COLLECTION,
+)
 from utils.db_service import DatabaseService
 from utils.exceptions import DatabaseError, UserNotFoundError
+from utils.helpers import apply_match_result
 
 
-def _make_doc(data):
+def _make_doc(data, exists=True):
     doc = MagicMock()
-    doc.exists = True
+    doc.exists = exists
     doc.to_dict.return_value = data
     return doc
 
 
+class _Batch:
+    """WriteBatch stand-in that forwards each write to its doc ref on commit."""
+
+    def __init__(self):
+        self.writes = []
+
+    def set(self, doc_ref, data, merge=False):
+        self.writes.append((doc_ref.set, (data,), {"merge": True} if merge else {}))
+
+    def update(self, doc_ref, data, option=None):
+        kwargs = {} if option is None else {"option": option}
+        self.writes.append((doc_ref.update, (data,), kwargs))
+
+    def delete(self, doc_ref):
+        self.writes.append((doc_ref.delete, (), {}))
+
+    def commit(self):
+        for write, args, kwargs in self.writes:
+            write(*args, **kwargs)
+
+
+def _make_db(doc_ref, members_ref=None):
+    members_ref = members_ref or MagicMock()
+    collections = {
+        TRACKED_USERS_COLLECTION: MagicMock(),
+        GUILD_MEMBERS_COLLECTION: MagicMock(),
+        LP_HISTORY_COLLECTION: MagicMock(),
+    }
+    collections[TRACKED_USERS_COLLECTION].document.return_value = doc_ref
+    collections[GUILD_MEMBERS_COLLECTION].document.return_value = members_ref
+    db = MagicMock()
+    db.collection.side_effect = collections.__getitem__
+    db.batch.side_effect = _Batch
+    db.transaction.return_value.get_all.return_value = []
+    db.get_all.side_effect = _existing
+    return db, collections, members_ref
+
+
+def _existing(doc_refs):
+    """`db.get_all` stand-in: every doc exists unless its ref has `missing` set."""
+    docs = []
+    for doc_ref in doc_refs:
+        doc = _make_doc({}, exists=getattr(doc_ref, "missing", None) is not True)
+        doc.reference = doc_ref
+        docs.append(doc)
+    return docs
+
+
+def _leave_guild_111(update):
+    return update == {
+        "guild_ids": firestore.ArrayRemove(["111"]),
+        "server_info.`111`": firestore.DELETE_FIELD,
+    }
+
+
 def _make_service(data):
     doc_ref = MagicMock()
     doc_ref.get.return_value = _make_doc(data)
-    db = MagicMock()
-    db.collection.return_value.document.return_value = doc_ref
+    db, _collections, _members_ref = _make_db(doc_ref)
     return DatabaseService(db), doc_ref
 
 
@@ -39,15 +106,36 @@ async def test_untrack_user_removes_only_that_guilds_server_info():
             "222": {"added_by": 2},
         },
     }
-    service, doc_ref = _make_service(data)
+    doc_ref = MagicMock()
+    doc_ref.get.return_value = _make_doc(data)
+    db, _collections, _members_ref = _make_db(doc_ref)
+    service = DatabaseService(db)
 
     await service.untrack_user(guild_id=111, riot_id="Foo#NA1", puuid="p1")
 
-    doc_ref.set.assert_called_once()
-    written = doc_ref.set.call_args.args[0]
-    assert written["guild_ids"] == ["222"]
-    assert written["server_info"] == {"222": {"added_by": 2}}
+    doc_ref.update.assert_called_once()
+    assert _leave_guild_111(doc_ref.update.call_args.args[0])
+    doc_ref.set.assert_not_called()
     doc_ref.delete.assert_not_called()
+    db.transaction.return_value.delete.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_untrack_user_deletes_a_doc_a_concurrent_removal_left_guildless():
+    # Read while in 111 and 222; a cleanup chunk removes 222 before the commit.
+    data = {"guild_ids": ["111", "222"], "server_info": {}}
+    doc_ref = MagicMock()
+    doc_ref.get.return_value = _make_doc(data)
+    db, _collections, _members_ref = _make_db(doc_ref)
+    guildless = _make_doc({"guild_ids": []})
+    guildless.reference = doc_ref
+    transaction = db.transaction.return_value
+    transaction.get_all.return_value = [guildless]
+    service = DatabaseService(db)
+
+    await service.untrack_user(guild_id=111, riot_id="Foo#NA1", puuid="p1")
+
+    transaction.delete.assert_called_once_with(doc_ref)
 
 
 @pytest.mark.asyncio
@@ -56,11 +144,19 @@ async def test_untrack_user_deletes_doc_when_last_guild_removed():
         "guild_ids": ["111"],
         "server_info": {"111": {"added_by": 1}},
     }
-    service, doc_ref = _make_service(data)
+    doc_ref = MagicMock()
+    doc_ref.get.return_value = _make_doc(data)
+    db, _collections, _members_ref = _make_db(doc_ref)
+    guildless = _make_doc({"guild_ids": [], "server_info": {}})
+    guildless.reference = doc_ref
+    transaction = db.transaction.return_value
+    transaction.get_all.return_value = [guildless]
+    service = DatabaseService(db)
 
     await service.untrack_user(guild_id=111, riot_id="Foo#NA1", puuid="p1")
 
-    doc_ref.delete.assert_called_once()
+    assert _leave_guild_111(doc_ref.update.call_args.args[0])
+    transaction.delete.assert_called_once_with(doc_ref)
     doc_ref.set.assert_not_called()
 
 
@@ -82,8 +178,7 @@ async def test_untrack_user_no_such_doc_raises_user_not_found():
     missing_doc = MagicMock()
     missing_doc.exists = False
     doc_ref.get.return_value = missing_doc
-    db = MagicMock()
-    db.collection.return_value.document.return_value = doc_ref
+    db, _collections, _members_ref = _make_db(doc_ref)
     service = DatabaseService(db)
 
     with pytest.raises(UserNotFoundError):
@@ -97,8 +192,7 @@ async def test_untrack_user_no_such_doc_raises_user_not_found():
 async def test_untrack_user_wraps_unexpected_error_as_database_error():
     doc_ref = MagicMock()
     doc_ref.get.side_effect = RuntimeError("firestore unavailable")
-    db = MagicMock()
-    db.collection.return_value.document.return_value = doc_ref
+    db, _collections, _members_ref = _make_db(doc_ref)
     service = DatabaseService(db)
 
     with pytest.raises(DatabaseError):
@@ -106,27 +200,315 @@ async def test_untrack_user_wraps_unexpected_error_as_database_error():
 
 
 @pytest.mark.asyncio
-async def test_untrack_all_users_removes_only_that_guilds_server_info():
-    data = {
-        "guild_ids": ["111", "222"],
-        "server_info": {
-            "111": {"added_by": 1},
-            "222": {"added_by": 2},
+async def test_untrack_all_users_is_one_batch_of_field_level_updates():
+    members_ref = MagicMock()
+    members_ref.get.return_value = _make_doc({"members": {"p1": {}, "p2": {}}})
+    db, collections, _members_ref = _make_db(MagicMock(), members_ref)
+    refs = {"p1": MagicMock(), "p2": MagicMock()}
+    collections[TRACKED_USERS_COLLECTION].document.side_effect = refs.__getitem__
+    guildless = _make_doc({"guild_ids": []})
+    guildless.reference = refs["p2"]
+    transaction = db.transaction.return_value
+    transaction.get_all.return_value = [
+        _make_doc({"guild_ids": ["222"]}),
+        guildless,
+    ]
+    service = DatabaseService(db)
+
+    await service.untrack_all_users(guild_id=111)
+
+    assert db.batch.call_count == 1
+    for doc_ref in refs.values():
+        doc_ref.update.assert_called_once()
+        assert _leave_guild_111(doc_ref.update.call_args.args[0])
+        doc_ref.get.assert_not_called()
+        doc_ref.set.assert_not_called()
+    members_ref.delete.assert_called_once()
+    assert transaction.get_all.call_args.args[0] == [refs["p1"], refs["p2"]]
+    transaction.delete.assert_called_once_with(refs["p2"])
+
+
+@pytest.mark.asyncio
+async def test_untrack_guild_chunk_deletes_history_in_the_same_transaction():
+    puuids = [f"p{i}" for i in range(40)]
+    members_ref = MagicMock()
+    members_ref.get.return_value = _make_doc({"members": dict.fromkeys(puuids, {})})
+    db, collections, _members_ref = _make_db(MagicMock(), members_ref)
+    refs = {puuid: MagicMock() for puuid in puuids}
+    collections[TRACKED_USERS_COLLECTION].document.side_effect = refs.__getitem__
+    guildless = []
+    for puuid in puuids:
+        doc = _make_doc({"guild_ids": []})
+        doc.id, doc.reference = puuid, refs[puuid]
+        guildless.append(doc)
+    chunk = MagicMock()
+    chunk.get.return_value = "p39"
+    transaction = db.transaction.return_value
+    transaction.get_all.return_value = guildless
+    transaction.get.side_effect = [[chunk], []]
+    service = DatabaseService(db)
+
+    await service.untrack_guild_chunk(111)
+
+    # One "in" query per 30 players, read in the transaction - none per player.
+    history = collections[LP_HISTORY_COLLECTION]
+    filters = [c.kwargs["filter"] for c in history.where.call_args_list]
+    assert [f.value for f in filters] == [puuids[:30], puuids[30:]]
+    assert all(f.op_string == "in" for f in filters)
+    history.stream.assert_not_called()
+    deleted = [c.args[0] for c in transaction.delete.call_args_list]
+    assert deleted == [*refs.values(), chunk.reference]
+    assert db.batch.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_guildless_deletes_are_split_at_the_batch_limit(monkeypatch):
+    monkeypatch.setattr("utils.db_service.BATCH_LIMIT", 4)
+    puuids = ["p0", "p1", "p2"]
+    members_ref = MagicMock()
+    members_ref.get.return_value = _make_doc({"members": dict.fromkeys(puuids, {})})
+    db, collections, _members_ref = _make_db(MagicMock(), members_ref)
+    refs = {puuid: MagicMock() for puuid in puuids}
+    collections[TRACKED_USERS_COLLECTION].document.side_effect = refs.__getitem__
+    docs, chunks = {}, {}
+    for puuid in puuids:
+        docs[puuid] = _make_doc({"guild_ids": []})
+        docs[puuid].id, docs[puuid].reference = puuid, refs[puuid]
+        chunks[puuid] = MagicMock()
+        chunks[puuid].get.return_value = puuid
+    transaction = db.transaction.return_value
+    transaction.get_all.side_effect = [list(docs.values()), [docs["p2"]]]
+    transaction.get.side_effect = [list(chunks.values()), [chunks["p2"]]]
+    service = DatabaseService(db)
+
+    await service.untrack_guild_chunk(111)
+
+    # Each player is its doc plus one history chunk: two fit under the limit of
+    # 4, and the third goes in a second transaction.
+    assert transaction.get_all.call_args_list[1].args[0] == [refs["p2"]]
+    deleted = [c.args[0] for c in transaction.delete.call_args_list]
+    assert deleted == [
+        refs["p0"],
+        chunks["p0"].reference,
+        refs["p1"],
+        chunks["p1"].reference,
+        refs["p2"],
+        chunks["p2"].reference,
+    ]
+
+
+@pytest.mark.asyncio
+async def test_a_player_orphaned_by_a_failed_delete_is_found_later():
+    data = {"guild_ids": ["111"], "server_info": {"111": {"added_by": 1}}}
+    doc_ref = MagicMock()
+    doc_ref.get.return_value = _make_doc(data)
+    db, collections, _members_ref = _make_db(doc_ref)
+    transaction = db.transaction.return_value
+    transaction.get_all.side_effect = RuntimeError("deadline exceeded")
+    service = DatabaseService(db)
+
+    with pytest.raises(DatabaseError):
+        await service.untrack_user(guild_id=111, riot_id="Foo#NA1", puuid="p1")
+    # The guild was left, but the player doc was not deleted.
+    assert _leave_guild_111(doc_ref.update.call_args.args[0])
+    transaction.delete.assert_not_called()
+
+    orphan = _make_doc({"guild_ids": []})
+    orphan.id, orphan.reference = "p1", doc_ref
+    tracked = collections[TRACKED_USERS_COLLECTION]
+    tracked.where.return_value.stream.return_value = [orphan]
+    transaction.get_all.side_effect = None
+    transaction.get_all.return_value = [orphan]
+
+    assert await service.delete_guildless_users() == 1
+    assert tracked.where.call_args.kwargs["filter"].value == []
+    transaction.delete.assert_called_once_with(doc_ref)
+
+
+@pytest.mark.asyncio
+async def test_untrack_guild_chunk_checkpoints_in_the_membership_doc():
+    members_ref = MagicMock()
+    members_ref.get.return_value = _make_doc(
+        {"members": {"p1": {}, "p2": {}, "p3": {}}},
+    )
+    db, collections, _members_ref = _make_db(MagicMock(), members_ref)
+    refs = {puuid: MagicMock() for puuid in ("p1", "p2", "p3")}
+    collections[TRACKED_USERS_COLLECTION].document.side_effect = refs.__getitem__
+    service = DatabaseService(db)
+
+    remaining = await service.untrack_guild_chunk(111, limit=2)
+
+    assert remaining == 1
+    assert _leave_guild_111(refs["p1"].update.call_args.args[0])
+    assert _leave_guild_111(refs["p2"].update.call_args.args[0])
+    refs["p3"].update.assert_not_called()
+    members_ref.update.assert_called_once_with(
+        {"members.p1": firestore.DELETE_FIELD, "members.p2": firestore.DELETE_FIELD},
+    )
+    members_ref.delete.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_untrack_guild_chunk_skips_missing_players_but_checkpoints_them():
+    members_ref = MagicMock()
+    members_ref.get.return_value = _make_doc(
+        {"members": {"p1": {}, "gone": {}, "p3": {}}},
+    )
+    db, collections, _members_ref = _make_db(MagicMock(), members_ref)
+    refs = {puuid: MagicMock() for puuid in ("p1", "gone", "p3")}
+    refs["gone"].missing = True
+    collections[TRACKED_USERS_COLLECTION].document.side_effect = refs.__getitem__
+    service = DatabaseService(db)
+
+    remaining = await service.untrack_guild_chunk(111, limit=2)
+
+    assert remaining == 1
+    assert db.get_all.call_count == 1
+    assert _leave_guild_111(refs["p1"].update.call_args.args[0])
+    refs["gone"].update.assert_not_called()
+    members_ref.update.assert_called_once_with(
+        {
+            "members.p1": firestore.DELETE_FIELD,
+            "members.gone": firestore.DELETE_FIELD,
         },
+    )
+
+
+@pytest.mark.asyncio
+async def test_untrack_user_drops_the_guild_membership_entry():
+    data = {"guild_ids": ["111", "222"], "server_info": {}}
+    doc_ref = MagicMock()
+    doc_ref.get.return_value = _make_doc(data)
+    db, _collections, members_ref = _make_db(doc_ref)
+    service = DatabaseService(db)
+
+    await service.untrack_user(guild_id=111, riot_id="Foo#NA1", puuid="p1")
+
+    members_ref.set.assert_called_once()
+    written = members_ref.set.call_args.args[0]
+    assert list(written["members"]) == ["p1"]
+    assert members_ref.set.call_args.kwargs == {"merge": True}
+
+
+@pytest.mark.asyncio
+async def test_get_guild_tracked_users_is_one_membership_read():
+    members_ref = MagicMock()
+    members_ref.get.return_value = _make_doc(
+        {"members": {"p1": {"riot_id": "Foo#NA1", "LP": 40, "added_by": 1}}},
+    )
+    db, collections, _members_ref = _make_db(MagicMock(), members_ref)
+    service = DatabaseService(db)
+
+    users = await service.get_guild_tracked_users(111)
+
+    assert users == [{"puuid": "p1", "riot_id": "Foo#NA1", "LP": 40, "added_by": 1}]
+    collections[TRACKED_USERS_COLLECTION].where.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_guild_tracked_users_backfills_a_missing_membership_doc():
+    members_ref = MagicMock()
+    members_ref.get.return_value = _make_doc(None, exists=False)
+    db, collections, _members_ref = _make_db(MagicMock(), members_ref)
+    tracked = collections[TRACKED_USERS_COLLECTION]
+    tracked.where.return_value.stream.return_value = [
+        _make_doc(
+            {
+                "puuid": "p1",
+                "riot_id": "Foo#NA1",
+                "tier": "GOLD",
+                "guild_ids": ["111"],
+                "server_info": {"111": {"added_by": 7}},
+            },
+        ),
+    ]
+    service = DatabaseService(db)
+
+    users = await service.get_guild_tracked_users(111)
+
+    expected = {"riot_id": "Foo#NA1", "tier": "GOLD", "added_by": 7}
+    assert users == [{"puuid": "p1", **expected}]
+    members_ref.set.assert_called_once_with({"members": {"p1": expected}})
+
+
+@pytest.mark.asyncio
+async def test_ranked_update_mirrors_member_fields_to_each_guild():
+    doc_ref = MagicMock()
+    doc_ref.get.return_value = _make_doc({"guild_ids": ["111", "222"]})
+    db, _collections, members_ref = _make_db(doc_ref)
+    service = DatabaseService(db)
+
+    await service.apply_ranked_update("p1", lambda _current: {"LP": 55, "streak": 2})
+
+    doc_ref.update.assert_called_once()
+    assert doc_ref.update.call_args.args[0] == {"LP": 55, "streak": 2}
+    assert members_ref.set.call_count == 2
+    assert members_ref.set.call_args.args[0] == {
+        "members": {"p1": {"LP": 55, "streak": 2}},
     }
-    doc = _make_doc(data)
+    db.get_all.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_get_top_players_orders_and_limits_in_firestore():
+    db, collections, _members_ref = _make_db(MagicMock())
+    tracked = collections[TRACKED_USERS_COLLECTION]
+    query = tracked.where.return_value.order_by.return_value.limit.return_value
+    query.stream.return_value = [_make_doc({"puuid": "p1", "score": 430_040})]
+    service = DatabaseService(db)
+
+    top = await service.get_top_players(25, region="na1")
+
+    assert top == [{"puuid": "p1", "score": 430_040}]
+    assert tracked.where.call_args.kwargs["filter"].field_path == "region"
+    order_by = tracked.where.return_value.order_by
+    assert order_by.call_args.args == ("score",)
+    order_by.return_value.limit.assert_called_once_with(25)
+
+
+@pytest.mark.asyncio
+async def test_rank_update_appends_a_packed_history_record_in_the_same_batch():
     doc_ref = MagicMock()
-    doc.reference = doc_ref
-    collection = MagicMock()
-    collection.where.return_value.stream.return_value = [doc]
-    db = MagicMock()
-    db.collection.return_value = collection
+    doc_ref.get.return_value = _make_doc({"guild_ids": []})
+    db, collections, _members_ref = _make_db(doc_ref)
     service = DatabaseService(db)
 
-    await service.untrack_all_users(guild_id=111)
+    await service.apply_ranked_update(
+        "p1", lambda _current: {"tier": "GOLD", "rank": "II", "LP": 40}
+    )
 
-    doc_ref.set.assert_called_once()
-    written = doc_ref.set.call_args.args[0]
-    assert written["guild_ids"] == ["222"]
-    assert written["server_info"] == {"222": {"added_by": 2}}
-    doc_ref.delete.assert_not_called()
+    assert db.batch.call_count == 1
+    history_ref = collections[LP_HISTORY_COLLECTION].document.return_value
+    written = history_ref.set.call_args
+    assert written.kwargs == {"merge": True}
+    assert written.args[0]["puuid"] == "p1"
+    [record] = written.args[0]["records"].values
+    assert len(record) == 16
+
+
+@pytest.mark.asyncio
+async def test_apply_ranked_update_retries_when_the_player_changed_under_it():
+    doc_ref = MagicMock()
+    stale = _make_doc({"guild_ids": ["111"], "streak": 1, "last_match_id": "M1"})
+    fresh = _make_doc({"guild_ids": ["111"], "streak": 2, "last_match_id": "M2"})
+    stale.update_time, fresh.update_time = "t1", "t2"
+    doc_ref.get.side_effect = [stale, fresh]
+    # Another process wrote the player between our first read and commit.
+    doc_ref.update.side_effect = [FailedPrecondition("stale"), None]
+    db, _collections, _members_ref = _make_db(doc_ref)
+    service = DatabaseService(db)
+
+    written = await service.apply_ranked_update(
+        "p1",
+        lambda current: apply_match_result(
+            current,
+            {"tier": "GOLD", "rank": "IV", "LP": 10},
+            {"match_id": "M3", "win": True},
+        ),
+    )
+
+    # Rebuilt from the fresh read: the streak extends the other writer's.
+    assert written["streak"] == 3
+    assert doc_ref.get.call_count == 2
+    db.write_option.assert_called_with(last_update_time="t2")
+    assert doc_ref.update.call_args.kwargs["option"] is db.write_option.return_value
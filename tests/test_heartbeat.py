@@ -31,3 +31,18 @@ def test_green_max_boundary_is_still_green():
     # The staleness check is strictly greater-than, so exactly GREEN_MAX is green.
     liveness, _ = classify_liveness(age_seconds=GREEN_MAX, connected=True)
     assert liveness == "green"
+
+
+def test_cycle_longer_than_the_polling_interval_is_degraded():
+    liveness, detail = classify_liveness(
+        age_seconds=30, connected=True, cycle_seconds=700, interval_seconds=600
+    )
+    assert liveness == "degraded"
+    assert "falling behind" in detail
+
+
+def test_cycle_within_the_polling_interval_stays_green():
+    liveness, _ = classify_liveness(
+        age_seconds=30, connected=True, cycle_seconds=599, interval_seconds=600
+    )
+    assert liveness == "green"
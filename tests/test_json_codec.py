@@ -0,0 +1,36 @@
+"""Tests for the JSON codec layer (utils/json_codec.py).
+
+Every available backend must round-trip sink events and produce identical bytes,
+so the buffer file and the wire format don't depend on which one is installed.
+"""
+
+import pytest
+
+from utils.json_codec import CODECS, dumps, loads
+from utils.sink_client import SinkClient
+
+EVENT = SinkClient("http://x", "t", "livelol").build_event(
+    "ValueError",
+    "Riot said ☁️ non-ascii",
+    handled=False,
+    fingerprint="m:f:ValueError",
+)
+
+
+@pytest.mark.parametrize("name", sorted(CODECS))
+def test_backend_round_trips_bytes(name):
+    backend_loads, backend_dumps = CODECS[name]
+    encoded = backend_dumps([EVENT])
+    assert isinstance(encoded, bytes)
+    assert backend_loads(encoded) == [EVENT]
+
+
+def test_backends_encode_identically():
+    encoded = {name: codec[1](EVENT) for name, codec in CODECS.items()}
+    assert len(set(encoded.values())) == 1
+
+
+def test_active_codec_rejects_invalid_json_with_value_error():
+    with pytest.raises(ValueError):
+        loads(b"{not json")
+    assert loads(dumps({"a": 1})) == {"a": 1}
@@ -0,0 +1,36 @@
+"""Tests for the per-key asyncio locks (utils/keyed_lock.py)."""
+
+import asyncio
+
+import pytest
+
+from utils.keyed_lock import KeyedLock
+
+
+@pytest.mark.asyncio
+async def test_same_key_serializes_and_other_keys_run_alongside():
+    locks = KeyedLock()
+    events = []
+
+    async def work(key, name):
+        async with locks.hold(key):
+            events.append(f"{name} start")
+            await asyncio.sleep(0.01)
+            events.append(f"{name} end")
+
+    await asyncio.gather(work("p1", "a"), work("p1", "b"), work("p2", "c"))
+
+    assert events.index("a end") < events.index("b start")
+    assert events.index("c start") < events.index("a end")
+    assert len(locks) == 0
+
+
+@pytest.mark.asyncio
+async def test_lock_is_released_when_the_block_raises():
+    locks = KeyedLock()
+    with pytest.raises(RuntimeError):
+        async with locks.hold("p1"):
+            assert locks.locked("p1")
+            raise RuntimeError("boom")
+    assert not locks.locked("p1")
+    assert len(locks) == 0
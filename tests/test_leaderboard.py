@@ -0,0 +1,128 @@
+"""Tests for the materialized guild leaderboard (utils/leaderboard.py)."""
+
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+
+from utils.helpers import rank_score
+from utils.leaderboard import GuildLeaderboard
+from utils.sqlite_service import SQLiteDatabaseService
+from utils.ui_components import LeaderboardView
+
+
+def _user(puuid, tier, rank, lp, name=None):
+    return {
+        "puuid": puuid,
+        "riot_id": name or f"{puuid}#NA1",
+        "region": "na1",
+        "tier": tier,
+        "rank": rank,
+        "LP": lp,
+    }
+
+
+def test_rank_score_orders_like_tier_division_lp():
+    ladder = [
+        ("UNRANKED", "", 0),
+        ("IRON", "IV", 0),
+        ("IRON", "IV", 99),
+        ("IRON", "III", 0),
+        ("BRONZE", "IV", 0),
+        ("MASTER", "I", 900),
+        ("CHALLENGER", "I", 0),
+        ("CHALLENGER", "I", 2500),
+    ]
+    scores = [rank_score(*rung) for rung in ladder]
+    assert scores == sorted(scores)
+    assert len(set(scores)) == len(scores)
+    assert rank_score(None, None, None) == 0
+
+
+def test_board_stays_sorted_through_incremental_updates():
+    board = GuildLeaderboard(
+        [
+            _user("a", "GOLD", "II", 40),
+            _user("b", "SILVER", "I", 90),
+            _user("c", "PLATINUM", "IV", 0),
+        ],
+    )
+    assert [puuid for puuid, _ in board.ranked()] == ["c", "a", "b"]
+
+    version = board.version
+    board.upsert("b", {"tier": "DIAMOND", "rank": "IV", "LP": 10})
+    assert [puuid for puuid, _ in board.ranked()] == ["b", "c", "a"]
+    assert board.position("a") == 2
+    assert board.version == version + 1
+
+    board.upsert("b", {"streak": 3})  # not a board field: no change
+    assert board.version == version + 1
+
+    board.remove("c")
+    assert [puuid for puuid, _ in board.ranked()] == ["b", "a"]
+    assert board.lines()[0].startswith("🥇 (na1) **b#NA1** - DIAMOND IV (10 LP)")
+
+
+@pytest.mark.asyncio
+async def test_storage_writes_patch_the_loaded_board():
+    service = SQLiteDatabaseService()
+    await service.track_user(111, 1, "A#NA1", "a", _user("a", "GOLD", "II", 40), "na1")
+    board = await service.get_guild_leaderboard(111)
+    assert len(board) == 1
+
+    await service.track_user(111, 1, "B#NA1", "b", _user("b", "IRON", "I", 5), "na1")
+    await service.apply_ranked_update(
+        "b", lambda _current: {"tier": "GOLD", "rank": "I", "LP": 0}
+    )
+    assert [puuid for puuid, _ in board.ranked()] == ["b", "a"]
+    assert board.entries["b"]["score"] == rank_score("GOLD", "I", 0)
+
+    await service.untrack_user(111, "A#NA1", "a")
+    assert "a" not in board
+    assert await service.get_guild_leaderboard(111) is board
+    service.close()
+
+
+def test_pages_split_by_size_and_locate_players():
+    board = GuildLeaderboard(
+        [_user(f"p{i:02}", "GOLD", "IV", i, name=f"P{i:02}#NA1") for i in range(45)],
+    )
+    pages = board.pages()
+    assert [page.count("\n") + 1 for page in pages] == [20, 20, 5]
+    assert board.pages() is pages  # served from cache
+    assert board.page_of("p44") == 0
+    assert board.page_of("p00") == 2
+
+    board.upsert("p00", {"LP": 99})
+    assert board.pages() is not pages
+    assert board.page_of("p00") == 0
+
+
+def test_pages_respect_the_embed_character_limit():
+    long_name = "x" * 300
+    board = GuildLeaderboard(
+        [_user(f"p{i}", "GOLD", "IV", i, name=f"{long_name}{i}") for i in range(20)],
+    )
+    assert len(board.pages()) > 1
+    assert all(len(page) <= 4096 for page in board.pages())
+
+
+@pytest.mark.asyncio
+async def test_leaderboard_view_flips_and_jumps_to_own_players():
+    board = GuildLeaderboard(
+        [
+            {**_user(f"p{i:02}", "GOLD", "IV", i), "added_by": 7 if i == 0 else 1}
+            for i in range(45)
+        ],
+    )
+    view = LeaderboardView(board, "🏆 Leaderboard for Guild")
+    assert view.create_embed().footer.text == "Page 1/3"
+    assert view.previous_page.disabled
+
+    interaction = MagicMock()
+    interaction.response.edit_message = AsyncMock()
+    interaction.user.id = 7
+    await view.jump_to_self.callback(interaction)
+    assert view.page == 2
+    assert view.next_page.disabled
+    embed = interaction.response.edit_message.await_args.kwargs["embed"]
+    assert "p00#NA1" in embed.description
@@ -0,0 +1,74 @@
+"""Tests for the root logging setup (utils/logger_config.py)."""
+
+import json
+import logging
+import queue
+
+import pytest
+
+from utils import logger_config
+from utils.logger_config import setup_logging
+from utils.metrics import LOG_RECORDS_DROPPED
+from utils.sink_client import SinkClient
+from utils.sink_config import SinkLoggingHandler
+
+
+@pytest.fixture
+def root():
+    """Yield the root logger and put its original handlers back afterwards."""
+    log = logging.getLogger()
+    handlers, level = log.handlers[:], log.level
+    yield log
+    logger_config._stop_listener()
+    log.handlers[:] = handlers
+    log.setLevel(level)
+
+
+def _boom():
+    raise ValueError("boom")
+
+
+def test_json_lines_carry_structured_fields(root, capsys):
+    setup_logging(async_output=False, json_output=True)
+    root.info("cycle done", extra={"cycle_id": 7, "latency_ms": 12})
+    entry = json.loads(capsys.readouterr().out)
+    assert entry["message"] == "cycle done"
+    assert entry["level"] == "INFO"
+    assert (entry["cycle_id"], entry["latency_ms"]) == (7, 12)
+    assert "puuid" not in entry
+
+
+def test_async_output_is_written_by_the_listener_with_its_traceback(root, capsys):
+    setup_logging(async_output=True, json_output=True)
+    try:
+        _boom()
+    except ValueError:
+        root.error("failed %s", "p1", exc_info=True, extra={"puuid": "p1"})
+    logger_config._stop_listener()  # flushes the queue
+    entry = json.loads(capsys.readouterr().out)
+    assert entry["message"] == "failed p1"
+    assert entry["puuid"] == "p1"
+    assert entry["exc"].endswith("ValueError: boom")
+
+
+def test_sink_handler_beside_the_queue_still_sees_exc_info(root, tmp_path):
+    setup_logging(async_output=True, json_output=False)
+    events = queue.SimpleQueue()
+    client = SinkClient("http://x", "t", "livelol", journal_dir=str(tmp_path / "j"))
+    root.addHandler(SinkLoggingHandler(events, client))
+    try:
+        _boom()
+    except ValueError:
+        root.error("caught it", exc_info=True)
+    event = events.get_nowait()
+    assert event["type"] == "ValueError"
+    assert event["handled"] is False
+
+
+def test_records_dropped_by_a_full_queue_are_reported():
+    handler = logger_config._QueueHandler(queue.Queue(1))
+    before = LOG_RECORDS_DROPPED.value()
+    for message in ("kept", "dropped", "dropped too"):
+        handler.emit(logging.makeLogRecord({"msg": message}))
+    assert logger_config.log_stats(handler) == {"dropped": 2, "depth": 1}
+    assert LOG_RECORDS_DROPPED.value() == before + 2
@@ -0,0 +1,54 @@
+"""Tests for the event-loop watchdog (utils/loop_watchdog.py)."""
+
+import asyncio
+import logging
+import time
+
+import pytest
+
+from utils.loop_watchdog import LoopWatchdog
+
+
+def _blocking_call():
+    time.sleep(0.3)  # e.g. a synchronous Firestore round trip
+
+
+@pytest.mark.asyncio
+async def test_stall_is_attributed_to_the_blocking_code(caplog):
+    watchdog = LoopWatchdog(interval=0.01, threshold=0.1)
+    watchdog.start()
+    try:
+        await asyncio.sleep(0.05)
+        with caplog.at_level(logging.WARNING):
+            _blocking_call()
+            await asyncio.sleep(0.05)
+    finally:
+        watchdog.stop()
+
+    [(site, (stalls, worst))] = watchdog.offenders.items()
+    assert site.startswith("tests/test_loop_watchdog.py:")
+    assert site.endswith("_blocking_call")
+    assert stalls == 1
+    assert worst >= 0.2
+    [record] = [r for r in caplog.records if "Event loop blocked" in r.getMessage()]
+    assert "_blocking_call" in record.getMessage()
+    assert "test_stall_is_attributed_to_the_blocking_code" in record.getMessage()
+
+    stats = watchdog.stats()
+    assert set(stats) == {"p50_ms", "p95_ms", "p99_ms", "max_ms", "stalls", "worst"}
+    assert stats["stalls"] == 1
+    assert stats["max_ms"] >= 200
+    assert stats["worst"][0]["site"] == site
+
+
+@pytest.mark.asyncio
+async def test_idle_loop_records_lag_without_stalls():
+    watchdog = LoopWatchdog(interval=0.01, threshold=0.1)
+    watchdog.start()
+    try:
+        await asyncio.sleep(0.1)
+    finally:
+        watchdog.stop()
+    assert len(watchdog.samples) >= 3
+    assert watchdog.offenders == {}
+    assert watchdog.stats()["stalls"] == 0
@@ -0,0 +1,53 @@
+"""Tests for packed LP history records (utils/lp_history.py) and their storage."""
+
+import pytest
+
+from utils.helpers import rank_score
+from utils.lp_history import RECORD, match_number, pack_record, unpack_records
+from utils.sqlite_service import SQLiteDatabaseService
+
+
+def test_records_are_16_bytes_and_sort_by_time():
+    late = pack_record(-5, "EUW1_7312345678", timestamp=2_000_000_000)
+    early = pack_record(430_040, "NA1_5123456789", timestamp=1_700_000_000)
+    assert RECORD.size == len(late) == 16
+    assert unpack_records([late, early]) == [
+        (1_700_000_000, 430_040, 5_123_456_789),
+        (2_000_000_000, -5, 7_312_345_678),
+    ]
+
+
+def test_match_number_tolerates_missing_or_odd_ids():
+    assert match_number(None) == 0
+    assert match_number("NA1_abc") == 0
+    assert match_number("KR_42") == 42
+
+
+@pytest.mark.asyncio
+async def test_rank_changes_append_to_history_and_untrack_clears_it():
+    service = SQLiteDatabaseService()
+    ranked = {"tier": "GOLD", "rank": "II", "LP": 40}
+    await service.track_user(111, 1, "Foo#NA1", "p1", ranked, "na1")
+    await service.track_user(222, 2, "Foo#NA1", "p1", ranked, "na1")
+    await service.apply_ranked_update(
+        "p1",
+        lambda _current: {
+            "tier": "GOLD",
+            "rank": "I",
+            "LP": 5,
+            "last_match_id": "NA1_77",
+        },
+    )
+    await service.apply_ranked_update("p1", lambda _current: {"streak": 2})
+
+    history = await service.get_lp_history("p1")
+    assert [score for _ts, score, _match in history] == [
+        rank_score("GOLD", "II", 40),
+        rank_score("GOLD", "I", 5),
+    ]
+    assert history[-1][2] == 77
+
+    await service.untrack_all_users(111)
+    await service.untrack_all_users(222)
+    assert await service.get_lp_history("p1") == []
+    service.close()
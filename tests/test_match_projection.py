@@ -0,0 +1,62 @@
+"""Tests for projected match-v5 decoding (utils/match_projection.py).
+
+The projection must be lossless for everything the match pipeline reads, so
+these compare it against a full `json.loads` of the recorded benchmark DTOs.
+"""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from utils.helpers import check_new_riot_id, extract_match_info
+from utils.match_projection import MATCH_FIELDS, decode_match
+
+FIXTURES = sorted(
+    (Path(__file__).parent.parent / "benchmarks" / "fixtures").glob("match_*.json"),
+)
+
+
+@pytest.mark.parametrize("path", FIXTURES, ids=lambda p: p.name)
+def test_projection_matches_full_decode_for_pipeline_fields(path):
+    raw = path.read_bytes()
+    full = json.loads(raw)
+    projected = decode_match(raw)
+    puuid = full["metadata"]["participants"][3]
+
+    full_info = extract_match_info(full, puuid)
+    projected_info = extract_match_info(projected, puuid)
+    for key in ("target_champion", "target_kda", "win", "match_id"):
+        assert projected_info[key] == full_info[key]
+    assert projected_info["participants"] == [
+        {k: v for k, v in p.items() if k in MATCH_FIELDS}
+        for p in full_info["participants"]
+    ]
+    assert check_new_riot_id(projected_info, puuid, "Someone#else") == (
+        check_new_riot_id(full_info, puuid, "Someone#else")
+    )
+
+
+def test_projection_drops_unused_subtrees():
+    raw = FIXTURES[0].read_bytes()
+    projected = decode_match(raw)
+    assert set(projected) == {"metadata", "info"}
+    assert set(projected["info"]) == {"participants"}
+    assert "challenges" not in projected["info"]["participants"][0]
+    assert "perks" not in projected["info"]["participants"][0]
+
+
+def test_nested_challenges_falls_back_to_full_scan():
+    # A nested map inside `challenges` defeats the flat-map byte scan; the
+    # decoder must fall back instead of returning a mangled participant.
+    dto = {
+        "metadata": {"matchId": "NA1_1"},
+        "info": {
+            "participants": [
+                {"puuid": "p1", "challenges": {"a": {"b": 1}, "c": 2}, "kills": 4},
+            ],
+        },
+    }
+    projected = decode_match(json.dumps(dto, separators=(",", ":")).encode())
+    assert projected["info"]["participants"] == [{"puuid": "p1", "kills": 4}]
+    assert projected["metadata"] == {"matchId": "NA1_1"}
@@ -0,0 +1,133 @@
+"""Tests for the metrics registry (utils/metrics.py) and endpoint (cogs/metrics.py)."""
+
+import time
+from types import SimpleNamespace
+
+import pytest
+from aiohttp.test_utils import TestClient, TestServer
+
+from cogs.background import Background
+from cogs.metrics import Metrics
+from utils import riot_api
+from utils.health import DOWN_MAX, GREEN_MAX
+from utils.loop_watchdog import LoopWatchdog
+from utils.metrics import RIOT_RATE_LIMIT_REMAINING, STORAGE_OP_SECONDS, Registry
+from utils.riot_api import _endpoint_label
+from utils.sqlite_service import SQLiteDatabaseService
+
+
+def test_render_uses_the_prometheus_text_format():
+    registry = Registry()
+    calls = registry.counter("calls_total", "Calls.", ("method",))
+    latency = registry.histogram("latency_seconds", "Latency.", buckets=(0.1, 1))
+    calls.inc("get")
+    calls.inc("get", amount=2)
+    for value in (0.05, 0.5, 0.7, 3):
+        latency.observe(value)
+
+    lines = registry.render().splitlines()
+    assert 'calls_total{method="get"} 3' in lines
+    assert "# TYPE latency_seconds histogram" in lines
+    # Buckets are cumulative and end with +Inf, which equals the count.
+    assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+    assert 'latency_seconds_bucket{le="1"} 3' in lines
+    assert 'latency_seconds_bucket{le="+Inf"} 4' in lines
+    assert "latency_seconds_sum 4.25" in lines
+    assert "latency_seconds_count 4" in lines
+
+
+def test_duplicate_metric_names_are_rejected():
+    registry = Registry()
+    registry.counter("calls_total", "Calls.")
+    with pytest.raises(ValueError):
+        registry.gauge("calls_total", "Calls.")
+
+
+def test_riot_endpoint_labels_drop_ids_and_queries():
+    host = "https://americas.api.riotgames.com"
+    assert _endpoint_label(f"{host}/lol/match/v5/matches/by-puuid/p1/ids?count=1") == (
+        "/lol/match/v5/matches/by-puuid",
+        "americas",
+    )
+    assert _endpoint_label(f"{host}/lol/match/v5/matches/NA1_42") == (
+        "/lol/match/v5/matches",
+        "americas",
+    )
+
+
+@pytest.mark.asyncio
+async def test_storage_methods_are_timed(tmp_path):
+    service = SQLiteDatabaseService(str(tmp_path / "livelol.db"))
+    labels = ("SQLiteDatabaseService", "get_all_tracked_users")
+    before = STORAGE_OP_SECONDS.value(*labels)
+    try:
+        await service.get_all_tracked_users()
+    finally:
+        service.close()
+    assert STORAGE_OP_SECONDS.value(*labels) == before + 1
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint_serves_the_registry():
+    cog = Metrics(bot=None)
+    async with TestClient(TestServer(cog.build_app())) as client:
+        response = await client.get("/metrics")
+        assert response.status == 200
+        assert response.headers["Content-Type"].startswith("text/plain")
+        assert "# TYPE livelol_riot_request_seconds histogram" in await response.text()
+
+
+def test_riot_rate_limit_headroom_is_recorded_per_window():
+    riot_api._record_rate_limit(
+        "na1",
+        {"X-App-Rate-Limit": "20:1,100:120", "X-App-Rate-Limit-Count": "3:1,40:120"},
+    )
+    assert riot_api.rate_limit_headroom["na1"] == {1: 17, 120: 60}
+    assert RIOT_RATE_LIMIT_REMAINING.value("na1", "120") == 60
+    # Malformed headers are ignored rather than failing the request.
+    riot_api._record_rate_limit(
+        "na1", {"X-App-Rate-Limit": "lots", "X-App-Rate-Limit-Count": "1:1"}
+    )
+    assert riot_api.rate_limit_headroom["na1"] == {1: 17, 120: 60}
+
+
+class _HealthBot:
+    def __init__(self):
+        self.cogs = {}
+        self.loop_watchdog = LoopWatchdog()
+        self.update_engine = SimpleNamespace(queued=4)
+
+    def get_cog(self, name):
+        return self.cogs.get(name)
+
+    def is_ready(self):
+        return True
+
+    def is_closed(self):
+        return False
+
+
+@pytest.mark.asyncio
+async def test_healthz_classifies_the_last_beat_and_reports_live_state():
+    bot = _HealthBot()
+    background = Background(bot)
+    background.cog_unload()
+    bot.cogs["Background"] = background
+    background.cycle_id = 3
+    background.cycle_started = time.monotonic() - 5
+    background.cycle_job = SimpleNamespace(processed=2, skipped=1, total=10)
+    cog = Metrics(bot)
+
+    async with TestClient(TestServer(cog.build_app())) as client:
+        response = await client.get("/healthz")
+        health = await response.json()
+    assert health["liveness"] == "green"
+    assert health["cycle"]["running"] is True
+    assert (health["cycle"]["processed"], health["cycle"]["total"]) == (2, 10)
+    assert health["queues"]["updates"] == 4
+    assert set(health["loop_lag"]) >= {"max_ms", "stalls"}
+
+    background.last_beat = time.monotonic() - (GREEN_MAX + 1)
+    assert cog.health()["liveness"] == "degraded"
+    background.last_beat = time.monotonic() - (DOWN_MAX + 1)
+    assert cog.health()["liveness"] == "down"
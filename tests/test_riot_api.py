@@ -1,3 +1,4 @@
+import json
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
@@ -17,7 +18,7 @@ def mock_session():
     context_manager = MagicMock()
     response = AsyncMock()
     response.status = 200
-    response.json.return_value = {}
+    response.read.return_value = b"{}"
     context_manager.__aenter__.return_value = response
     context_manager.__aexit__.return_value = None
     session.get.return_value = context_manager
@@ -27,7 +28,7 @@ def mock_session():
 @pytest.mark.asyncio
 async def test_get_puuid_success(mock_session):
     mock_response = mock_session.get.return_value.__aenter__.return_value
-    mock_response.json.return_value = {"puuid": "12345"}
+    mock_response.read.return_value = b'{"puuid": "12345"}'
     result = await get_puuid(mock_session, "Name", "Tag", "KEY")
     assert result == "12345"
 
@@ -49,7 +50,7 @@ async def test_get_ranked_info_success(mock_session):
         },
     ]
     mock_response = mock_session.get.return_value.__aenter__.return_value
-    mock_response.json.return_value = test_data
+    mock_response.read.return_value = json.dumps(test_data).encode()
     result = await get_ranked_info(mock_session, "puuid", "region", "KEY")
     assert result["tier"] == "GOLD"
     assert result["rank"] == "IV"
@@ -59,8 +60,8 @@ async def test_get_ranked_info_success(mock_session):
 @pytest.mark.asyncio
 async def test_get_ranked_info_unranked(mock_session):
     mock_response = mock_session.get.return_value.__aenter__.return_value
-    mock_response.json.return_value = (
-        ""  # not None, as that is what is returned for an invalid puuid
+    mock_response.read.return_value = (
+        b'""'  # not None, as that is what is returned for an invalid puuid
     )
     result = await get_ranked_info(mock_session, "puuid", "region", "KEY")
     assert result["tier"] == "UNRANKED"
@@ -72,7 +73,6 @@ async def test_get_ranked_info_unranked(mock_session):
 async def test_get_ranked_info_invalid_puuid(mock_session):
     mock_response = mock_session.get.return_value.__aenter__.return_value
     mock_response.status = 404
-    mock_response.json.return_value = None
     with pytest.raises(UserNotFoundError):
         await get_ranked_info(mock_session, "puuid", "region", "KEY")
 
@@ -87,7 +87,7 @@ async def test_api_rate_limit_retry(mock_session):
     }
     response_200 = AsyncMock()
     response_200.status = 200
-    response_200.json.return_value = {"key": "value"}
+    response_200.read.return_value = b'{"key": "value"}'
     mock_context = mock_session.get.return_value
     mock_context.__aenter__.side_effect = [response_429, response_200]
     with patch("asyncio.sleep", new_callable=AsyncMock) as mock_sleep:
@@ -115,3 +115,17 @@ async def test_api_rate_limit_max_retries_exceeded(mock_session):
     with patch("asyncio.sleep", new_callable=AsyncMock), pytest.raises(RateLimitError):
         await call_riot_api(mock_session, "htpps://fakeurl.com", {})
     assert mock_session.get.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_call_riot_api_custom_decoder_reads_raw_bytes(mock_session):
+    mock_response = mock_session.get.return_value.__aenter__.return_value
+    mock_response.read.return_value = b'{"a": 1}'
+    result = await call_riot_api(
+        mock_session,
+        "htpps://fakeurl.com",
+        {},
+        decode=lambda raw: {"decoded": raw},
+    )
+    assert result == {"decoded": b'{"a": 1}'}
+    mock_response.json.assert_not_called()
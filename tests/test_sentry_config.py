@@ -0,0 +1,56 @@
+"""Tests for trace sampling (utils/sentry_config.py)."""
+
+from utils.sentry_config import (
+    SLOW_TRACE_SECONDS,
+    TRACE_SAMPLE_RATES,
+    make_before_send_transaction,
+    make_profiles_sampler,
+    parse_trace_rates,
+    traces_sampler,
+)
+
+
+def _transaction(op, seconds, status="ok", spans=()):
+    return {
+        "type": "transaction",
+        "start_timestamp": "2026-01-01T00:00:00Z",
+        "timestamp": 1767225600.0 + seconds,
+        "contexts": {"trace": {"op": op, "status": status}},
+        "spans": list(spans),
+    }
+
+
+def test_trace_rates_can_be_overridden_per_op():
+    rates = parse_trace_rates("cycle=0.5, command=2,bogus,other=x")
+    assert rates["cycle"] == 0.5
+    assert rates["command"] == 1.0  # clamped
+    assert "other" not in rates
+    assert parse_trace_rates(None) == TRACE_SAMPLE_RATES
+
+
+def test_sampler_records_tail_sampled_ops_and_follows_the_parent():
+    assert traces_sampler({"transaction_context": {"op": "cycle"}}) == 1.0
+    assert traces_sampler({"transaction_context": {"op": "http.server"}}) == 0.0
+    assert traces_sampler({"parent_sampled": False}) == 0.0
+
+
+def test_slow_and_errored_traces_are_always_kept():
+    keep = make_before_send_transaction({"cycle": 0.0, "command": 0.0})
+    fast = _transaction("command", 0.1)
+    assert keep(fast, None) is None
+    slow = _transaction("command", SLOW_TRACE_SECONDS["command"] + 1)
+    assert keep(slow, None) is slow
+    failed = _transaction("cycle", 1, status="internal_error")
+    assert keep(failed, None) is failed
+    failed_span = _transaction("cycle", 1, spans=[{"status": "internal_error"}])
+    assert keep(failed_span, None) is failed_span
+
+    keep_all = make_before_send_transaction({"command": 1.0})
+    assert keep_all(fast, None) is fast
+
+
+def test_tail_sampled_ops_are_not_profiled_by_default():
+    sampler = make_profiles_sampler(0.1, 0.0)
+    assert sampler({"transaction_context": {"op": "cycle"}}) == 0.0
+    assert sampler({"transaction_context": {"op": "command"}}) == 0.0
+    assert sampler({"transaction_context": {"op": "http.server"}}) == 0.1
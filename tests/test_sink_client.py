@@ -1,6 +1,9 @@
 """Tests for the owned error-sink client (utils/sink_client.py)."""
 
+import gzip
 import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
 
 from utils.sink_client import SinkClient
 
@@ -14,10 +17,16 @@ def _client(tmp_path):
         base_url="http://127.0.0.1:9",
         token="t",
         project="livelol",
-        buffer_path=str(tmp_path / "buffer.jsonl"),
+        journal_dir=str(tmp_path / "journal"),
     )
 
 
+def _journal_lines(tmp_path):
+    """Return every line still in the journal's segments, oldest first."""
+    segments = sorted((tmp_path / "journal").glob("0*.jsonl"))
+    return [ln for seg in segments for ln in seg.read_text().splitlines()]
+
+
 def test_build_event_schema(tmp_path):
     c = _client(tmp_path)
     ev = c.build_event(
@@ -46,8 +55,9 @@ def test_capture_never_raises_and_buffers_when_sink_down(tmp_path):
     c = _client(tmp_path)
     c._post = _raise_down
     c.capture(c.build_event("ValueError", "x"))  # must not raise
-    lines = (tmp_path / "buffer.jsonl").read_text().splitlines()
+    lines = _journal_lines(tmp_path)
     assert len(lines) == 1
+    assert len(c.journal) == 1
     assert json.loads(lines[0])["type"] == "ValueError"
 
 
@@ -56,7 +66,7 @@ def test_flush_replays_and_clears(tmp_path):
     c._post = _raise_down
     c.capture(c.build_event("A", "1"))
     c.capture(c.build_event("B", "2"))
-    assert len((tmp_path / "buffer.jsonl").read_text().splitlines()) == 2
+    assert len(_journal_lines(tmp_path)) == 2
 
     sent = []
 
@@ -67,16 +77,15 @@ def test_flush_replays_and_clears(tmp_path):
     replayed = c.flush()
     assert replayed == 2
     assert [e["type"] for e in sent] == ["A", "B"]
-    assert (tmp_path / "buffer.jsonl").read_text().strip() == ""
+    assert _journal_lines(tmp_path) == []
+    assert len(c.journal) == 0
 
 
 def test_flush_quarantines_corrupt_line_and_replays_rest(tmp_path):
     c = _client(tmp_path)
     c._post = _raise_down
     c.capture(c.build_event("A", "1"))
-    buf = tmp_path / "buffer.jsonl"
-    with buf.open("a") as fh:
-        fh.write("{not json\n")
+    c.journal.append(b"{not json")
     c.capture(c.build_event("B", "2"))
 
     sent = []
@@ -84,70 +93,200 @@ def test_flush_quarantines_corrupt_line_and_replays_rest(tmp_path):
     replayed = c.flush()
     assert replayed == 2
     assert [e["type"] for e in sent] == ["A", "B"]
-    assert buf.read_text().strip() == ""
-    quarantined = (tmp_path / "buffer.quarantine.jsonl").read_text().splitlines()
-    assert quarantined == ["{not json"]
+    assert _journal_lines(tmp_path) == []
+    assert c.quarantine_path.read_text().splitlines() == ["{not json"]
 
 
 def test_flush_quarantines_non_dict_json_line(tmp_path):
     c = _client(tmp_path)
     c._post = _raise_down
     c.capture(c.build_event("A", "1"))
-    buf = tmp_path / "buffer.jsonl"
-    with buf.open("a") as fh:
-        fh.write("42\n")  # valid JSON, not an event object
-        fh.write('["list"]\n')
+    c.journal.append(b"42")  # valid JSON, not an event object
+    c.journal.append(b'["list"]')
 
     sent = []
     c._post = lambda events: sent.extend(events)
     assert c.flush() == 1
     assert [e["type"] for e in sent] == ["A"]
-    assert buf.read_text().strip() == ""
-    quarantined = (tmp_path / "buffer.quarantine.jsonl").read_text().splitlines()
-    assert quarantined == ["42", '["list"]']
+    assert _journal_lines(tmp_path) == []
+    assert c.quarantine_path.read_text().splitlines() == ["42", '["list"]']
 
 
-def test_flush_clears_buffer_of_only_corrupt_lines(tmp_path):
+def test_flush_clears_journal_of_only_corrupt_lines(tmp_path):
     c = _client(tmp_path)
-    buf = tmp_path / "buffer.jsonl"
-    buf.write_text("garbage one\ngarbage two\n")
+    c.journal.append(b"garbage one")
+    c.journal.append(b"garbage two")
 
     def _fail(_):
         raise AssertionError("nothing valid to post")
 
     c._post = _fail
     assert c.flush() == 0
-    assert buf.read_text().strip() == ""
-    quarantined = (tmp_path / "buffer.quarantine.jsonl").read_text().splitlines()
+    assert _journal_lines(tmp_path) == []
+    quarantined = c.quarantine_path.read_text().splitlines()
     assert quarantined == ["garbage one", "garbage two"]
 
 
-def test_flush_keeps_buffer_and_quarantine_untouched_while_sink_down(tmp_path):
+def test_flush_keeps_journal_and_quarantine_untouched_while_sink_down(tmp_path):
     c = _client(tmp_path)
     c._post = _raise_down
     c.capture(c.build_event("A", "1"))
-    buf = tmp_path / "buffer.jsonl"
-    with buf.open("a") as fh:
-        fh.write("{not json\n")
-    before = buf.read_text()
+    c.journal.append(b"{not json")
+    before = _journal_lines(tmp_path)
 
     c.capture(c.build_event("B", "2"))  # flush inside fails; must not lose lines
-    after = buf.read_text().splitlines()
-    assert before.splitlines() == after[:2]  # original lines intact, in order
+    after = _journal_lines(tmp_path)
+    assert before == after[:2]  # original lines intact, in order
     assert len(after) == 3  # plus the newly buffered event
     # quarantine only happens on a successful drain - no file while the sink is down
-    assert not (tmp_path / "buffer.quarantine.jsonl").exists()
+    assert not c.quarantine_path.exists()
 
 
-def test_buffer_bound_drops_oldest(tmp_path, monkeypatch):
-    monkeypatch.setattr("utils.sink_client.BUFFER_MAX_LINES", 5)
+def test_journal_bound_drops_oldest_segment(tmp_path, monkeypatch):
+    monkeypatch.setattr("utils.sink_client.BUFFER_MAX_LINES", 20)
     c = _client(tmp_path)
     c._post = _raise_down
-    for i in range(8):
+    for i in range(25):
         c.capture(c.build_event("E", str(i)))
-    lines = (tmp_path / "buffer.jsonl").read_text().splitlines()
-    assert len(lines) <= 5
+    lines = _journal_lines(tmp_path)
+    assert len(lines) == len(c.journal) <= 20
     # oldest dropped: the last event survives, the first does not
     messages = [json.loads(ln)["message"] for ln in lines]
-    assert "7" in messages
+    assert messages[-1] == "24"
     assert "0" not in messages
+
+
+def test_drain_survives_the_bound_dropping_its_segment_mid_post(tmp_path, monkeypatch):
+    monkeypatch.setattr("utils.sink_client.BUFFER_MAX_LINES", 20)
+    monkeypatch.setattr("utils.sink_client.BATCH_MAX", 2)
+    c = _client(tmp_path)
+    c._post = _raise_down
+    for i in range(20):
+        c.capture(c.build_event("E", str(i)))
+
+    sent = []
+
+    def _post_while_spilling(events):
+        if not sent:
+            # A logging thread spills while the first batch is in flight; the
+            # bound drops the segment that batch came from, and the next one.
+            c.buffer([c.build_event("E", f"s{i}") for i in range(3)])
+        sent.extend(events)
+
+    c._post = _post_while_spilling
+    assert c.flush() == 21
+    messages = [e["message"] for e in sent]
+    assert messages[:4] == ["0", "1", "4", "5"]
+    assert messages[-3:] == ["s0", "s1", "s2"]
+    assert len(c.journal) == 0
+    assert c.journal.dropped == 4
+    assert c.sent == 21
+
+
+def test_drain_resumes_mid_journal_after_partial_success(tmp_path, monkeypatch):
+    monkeypatch.setattr("utils.sink_client.BATCH_MAX", 2)
+    c = _client(tmp_path)
+    c._post = _raise_down
+    for i in range(5):
+        c.capture(c.build_event("E", str(i)))
+
+    sent = []
+    posts = []
+
+    def _flaky(events):
+        posts.append(events)
+        if len(posts) > 2:
+            raise OSError("sink down again")
+        sent.extend(events)
+
+    c._post = _flaky
+    # The new event goes out, the drain sends one batch, then the sink drops.
+    c.capture(c.build_event("E", "5"))
+    assert [e["message"] for e in sent] == ["5", "0", "1"]
+    assert len(c.journal) == 3
+
+    # A restarted client picks up from the persisted checkpoint.
+    c = _client(tmp_path)
+    assert len(c.journal) == 3
+    sent.clear()
+    c._post = lambda events: sent.extend(events)
+    assert c.flush() == 3
+    assert [e["message"] for e in sent] == ["2", "3", "4"]
+
+
+def test_partial_last_line_is_terminated_and_quarantined(tmp_path):
+    c = _client(tmp_path)
+    c.journal.append(b'{"id": "a"}')
+    [segment] = (tmp_path / "journal").glob("0*.jsonl")
+    with segment.open("ab") as fh:
+        fh.write(b'{"id": "torn')  # crash mid-append
+
+    c = _client(tmp_path)
+    c.journal.append(b'{"id": "b"}')
+    sent = []
+    c._post = lambda events: sent.extend(events)
+    assert c.flush() == 2
+    assert [e["id"] for e in sent] == ["a", "b"]
+    assert c.quarantine_path.read_text().splitlines() == ['{"id": "torn']
+
+
+def test_legacy_single_file_buffer_is_imported(tmp_path):
+    (tmp_path / "buffer.jsonl").write_text('{"id": "old"}\n')
+    c = _client(tmp_path)
+    assert not (tmp_path / "buffer.jsonl").exists()
+    sent = []
+    c._post = lambda events: sent.extend(events)
+    assert c.flush() == 1
+    assert sent == [{"id": "old"}]
+
+
+class _SinkHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def do_POST(self):  # noqa: N802
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        assert self.headers["Content-Encoding"] == "gzip"
+        self.server.batches.append(json.loads(gzip.decompress(body)))
+        self.server.peers.add(self.client_address)
+        self.send_response(202)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *_args):
+        pass
+
+
+def test_batches_are_gzipped_over_one_kept_alive_connection(tmp_path):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _SinkHandler)
+    server.batches, server.peers = [], set()
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        c = SinkClient(
+            base_url=f"http://127.0.0.1:{server.server_port}",
+            token="t",
+            project="livelol",
+            journal_dir=str(tmp_path / "journal"),
+        )
+        c.capture_batch([c.build_event("A", "1"), c.build_event("B", "2")])
+        c.capture(c.build_event("C", "3"))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert [[e["type"] for e in batch] for batch in server.batches] == [
+        ["A", "B"],
+        ["C"],
+    ]
+    assert len(server.peers) == 1  # one TCP connection for both requests
+    assert len(c.journal) == 0
+
+
+def test_capture_skips_the_drain_when_the_journal_is_empty(tmp_path):
+    c = _client(tmp_path)
+    c._post = lambda _events: None
+
+    def _no_flush():
+        raise AssertionError("nothing buffered to drain")
+
+    c.flush = _no_flush
+    c.capture(c.build_event("A", "1"))
@@ -8,16 +8,18 @@ with the record's exc_info intact. That is the path bot.py actually uses.
 import logging
 import queue
 
+from utils.sink_aggregator import FingerprintAggregator
 from utils.sink_client import SinkClient
-from utils.sink_config import SinkLoggingHandler, setup_sink
+from utils.sink_config import SinkLoggingHandler, _next_batch, setup_sink, sink_stats
+from utils.sink_queue import SinkQueue
 
 
-def _wired_logger(tmp_path):
+def _wired_logger(tmp_path, aggregator=None):
     q = queue.SimpleQueue()
-    client = SinkClient("http://x", "t", "livelol", buffer_path=str(tmp_path / "b"))
+    client = SinkClient("http://x", "t", "livelol", journal_dir=str(tmp_path / "j"))
     log = logging.getLogger(f"sink_test_{id(q)}")
     log.handlers.clear()
-    log.addHandler(SinkLoggingHandler(q, client))
+    log.addHandler(SinkLoggingHandler(q, client, aggregator))
     log.setLevel(logging.ERROR)
     log.propagate = False
     return log, q
@@ -49,3 +51,126 @@ def test_setup_sink_is_noop_without_env(monkeypatch):
     monkeypatch.delenv("SINK_URL", raising=False)
     monkeypatch.delenv("SINK_TOKEN", raising=False)
     assert setup_sink() is None
+
+
+def test_error_storm_goes_out_in_full_batches():
+    q = queue.SimpleQueue()
+    for i in range(1_200):
+        q.put({"id": str(i)})
+    sizes = [len(_next_batch(q, linger=0.05)) for _ in range(3)]
+    assert sizes == [500, 500, 200]
+
+
+def test_lone_event_is_sent_after_the_linger_window():
+    q = queue.SimpleQueue()
+    q.put({"id": "a"})
+    assert _next_batch(q, linger=0.01) == [{"id": "a"}]
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _drain(q):
+    events = []
+    while not q.empty():
+        events.append(q.get_nowait())
+    return events
+
+
+def test_error_storm_folds_into_one_counted_event(tmp_path):
+    clock = _Clock()
+    aggregator = FingerprintAggregator(window=60, rate_cap=3, clock=clock)
+    log, q = _wired_logger(tmp_path, aggregator)
+    for i in range(1_000):
+        log.error("shard down %d", i)
+    sent = _drain(q)
+    assert [ev["message"] for ev in sent] == [f"shard down {i}" for i in range(3)]
+    assert aggregator.expired() == []  # window still open
+    clock.now = 60
+    [summary] = aggregator.expired()
+    assert summary["count"] == 997
+    assert summary["message"] == "shard down 3"
+    assert summary["first_ts"] == summary["ts"]
+    assert summary["last_ts"] >= summary["first_ts"]
+    assert aggregator.expired() == []
+
+
+def test_fingerprints_are_capped_independently(tmp_path):
+    clock = _Clock()
+    aggregator = FingerprintAggregator(window=60, rate_cap=2, clock=clock)
+    log, q = _wired_logger(tmp_path, aggregator)
+    for _ in range(5):
+        log.error("plain")
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            log.error("caught", exc_info=True)
+    assert [ev["type"] for ev in _drain(q)] == ["ERROR", "ValueError"] * 2
+    clock.now = 61
+    summaries = aggregator.expired()
+    assert sorted((ev["type"], ev["count"]) for ev in summaries) == [
+        ("ERROR", 3),
+        ("ValueError", 3),
+    ]
+
+
+def test_next_window_reopens_the_cap_and_flushes_the_last_summary():
+    clock = _Clock()
+    aggregator = FingerprintAggregator(window=10, rate_cap=1, clock=clock)
+
+    def build():
+        return {"ts": "t0"}
+
+    assert aggregator.offer("fp", "t0", build) == {"ts": "t0"}
+    assert aggregator.offer("fp", "t1", build) is None
+    clock.now = 10
+    assert aggregator.offer("fp", "t2", build) == {"ts": "t0"}
+    q = queue.SimpleQueue()
+    q.put({"id": "a"})
+    assert _next_batch(q, linger=0, aggregator=aggregator) == [
+        {"id": "a"},
+        {"ts": "t0", "count": 1, "first_ts": "t0", "last_ts": "t1"},
+    ]
+
+
+def test_full_queue_drops_oldest_by_default():
+    q = SinkQueue(maxsize=3)
+    for i in range(5):
+        q.put({"id": str(i)})
+    assert [q.get_nowait()["id"] for _ in range(len(q))] == ["2", "3", "4"]
+    assert (q.enqueued, q.dropped) == (5, 2)
+
+
+def test_full_queue_can_drop_newest():
+    q = SinkQueue(maxsize=3, policy="drop_newest")
+    for i in range(5):
+        q.put({"id": str(i)})
+    assert [q.get_nowait()["id"] for _ in range(len(q))] == ["0", "1", "2"]
+    assert (q.enqueued, q.dropped) == (3, 2)
+
+
+def test_full_queue_spills_to_the_journal_and_stats_add_up(tmp_path):
+    client = SinkClient("http://x", "t", "livelol", journal_dir=str(tmp_path / "j"))
+    q = SinkQueue(maxsize=2, policy="spill", spill=client.buffer)
+    for i in range(5):
+        q.put(client.build_event("E", str(i)))
+    assert len(q) == 2
+    assert len(client.journal) == 3
+    assert sink_stats(q, client) == {
+        "enqueued": 2,
+        "dropped": 0,
+        "spilled": 3,
+        "buffered": 3,
+        "sent": 0,
+        "depth": 2,
+        "journal_depth": 3,
+    }
+
+
+def test_sink_stats_is_none_without_a_sink():
+    assert sink_stats() is None
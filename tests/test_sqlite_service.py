@@ -0,0 +1,160 @@
+"""Tests for the SQLite storage backend (utils/sqlite_service.py).
+
+The backend must hand the cogs the same tracked-user dicts the Firestore
+service does, so these tests check the returned shapes as well as the
+track/untrack semantics.
+"""
+
+import pytest
+
+from utils.exceptions import UserNotFoundError
+from utils.helpers import apply_match_result
+from utils.sqlite_service import SQLiteDatabaseService
+
+RANKED = {"tier": "GOLD", "rank": "II", "LP": 40}
+
+
+@pytest.fixture
+def service(tmp_path):
+    service = SQLiteDatabaseService(str(tmp_path / "livelol.db"))
+    yield service
+    service.close()
+
+
+@pytest.mark.asyncio
+async def test_track_user_returns_firestore_shaped_dicts(service):
+    await service.track_user(111, 1, "Foo#NA1", "p1", RANKED, "na1")
+    await service.track_user(222, 2, "Foo#NA1", "p1", RANKED, "na1")
+
+    [user] = await service.get_all_tracked_users()
+    assert user == {
+        "puuid": "p1",
+        "riot_id": "Foo#NA1",
+        "region": "na1",
+        "tier": "GOLD",
+        "rank": "II",
+        "LP": 40,
+        "score": 430_040,
+        "guild_ids": ["111", "222"],
+        "server_info": {"111": {"added_by": 1}, "222": {"added_by": 2}},
+    }
+    assert service.conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+
+
+@pytest.mark.asyncio
+async def test_untrack_user_keeps_player_until_last_guild(service):
+    await service.track_user(111, 1, "Foo#NA1", "p1", RANKED, "na1")
+    await service.track_user(222, 2, "Foo#NA1", "p1", RANKED, "na1")
+
+    await service.untrack_user(111, "Foo#NA1", "p1")
+    assert await service.get_guild_tracked_users(111) == []
+    [user] = await service.get_guild_tracked_users(222)
+    assert user["guild_ids"] == ["222"]
+
+    with pytest.raises(UserNotFoundError, match="in this server"):
+        await service.untrack_user(111, "Foo#NA1", "p1")
+    await service.untrack_user(222, "Foo#NA1", "p1")
+    assert await service.get_all_tracked_users() == []
+    with pytest.raises(UserNotFoundError):
+        await service.untrack_user(222, "Foo#NA1", "p1")
+
+
+@pytest.mark.asyncio
+async def test_untrack_all_users_only_deletes_orphans(service):
+    await service.track_user(111, 1, "Foo#NA1", "p1", RANKED, "na1")
+    await service.track_user(111, 1, "Bar#NA1", "p2", RANKED, "na1")
+    await service.track_user(222, 2, "Bar#NA1", "p2", RANKED, "na1")
+
+    await service.untrack_all_users(111)
+
+    [user] = await service.get_all_tracked_users()
+    assert user["puuid"] == "p2"
+    assert user["guild_ids"] == ["222"]
+
+
+@pytest.mark.asyncio
+async def test_delete_guildless_users_removes_only_players_in_no_guild(service):
+    await service.track_user(111, 1, "Foo#NA1", "p1", RANKED, "na1")
+    await service.track_user(111, 1, "Bar#NA1", "p2", RANKED, "na1")
+    with service.conn:
+        service.conn.execute("DELETE FROM guild_members WHERE puuid = 'p2'")
+
+    assert await service.delete_guildless_users() == 1
+    [user] = await service.get_all_tracked_users()
+    assert user["puuid"] == "p1"
+    assert await service.get_lp_history("p2") == []
+
+
+@pytest.mark.asyncio
+async def test_bulk_upsert_and_ranked_updates(service):
+    users = [
+        {
+            "puuid": f"p{i}",
+            "riot_id": f"Player{i}#NA1",
+            "region": "na1",
+            "tier": "SILVER",
+            "rank": "I",
+            "LP": i,
+            "server_info": {"111": {"added_by": 1}},
+        }
+        for i in range(3)
+    ]
+    await service.upsert_tracked_users(users)
+    await service.apply_ranked_update(
+        "p0", lambda _current: {"LP": 99, "streak": 2, "last_match_id": "NA1_1"}
+    )
+
+    by_puuid = {u["puuid"]: u for u in await service.get_guild_tracked_users(111)}
+    assert set(by_puuid) == {"p0", "p1", "p2"}
+    assert by_puuid["p0"]["LP"] == 99
+    assert by_puuid["p0"]["streak"] == 2
+    assert "streak" not in by_puuid["p1"]
+
+
+@pytest.mark.asyncio
+async def test_guild_config_round_trip(service):
+    assert await service.get_guild_config(111) is None
+    await service.set_guild_config(111, 555)
+    assert await service.get_guild_config("111") == 555
+    await service.remove_guild_config(111)
+    assert await service.get_guild_config(111) is None
+
+
+@pytest.mark.asyncio
+async def test_top_players_are_ordered_by_score_and_filtered_by_region(service):
+    await service.track_user(111, 1, "Gold#NA1", "p1", RANKED, "na1")
+    await service.track_user(
+        222, 2, "Master#KR", "p2", {**RANKED, "tier": "MASTER"}, "kr"
+    )
+    await service.track_user(
+        111, 1, "Iron#NA1", "p3", {**RANKED, "tier": "IRON"}, "na1"
+    )
+
+    top = await service.get_top_players(2)
+    assert [user["puuid"] for user in top] == ["p2", "p1"]
+    na = await service.get_top_players(10, region="na1")
+    assert [user["puuid"] for user in na] == ["p1", "p3"]
+    plan = service.conn.execute(
+        "EXPLAIN QUERY PLAN SELECT * FROM tracked_users WHERE region = 'na1' "
+        "AND score IS NOT NULL ORDER BY score DESC LIMIT 5",
+    ).fetchall()
+    assert "tracked_users_region_score" in str([tuple(row) for row in plan])
+
+
+@pytest.mark.asyncio
+async def test_apply_ranked_update_counts_a_game_once(service):
+    await service.track_user(111, 1, "Foo#NA1", "p1", RANKED, "na1")
+
+    def build(current):
+        new_rank = {**RANKED, "LP": 60}
+        return apply_match_result(current, new_rank, {"match_id": "M1", "win": True})
+
+    # Two updaters that saw the same game: the second finds it already applied.
+    assert (await service.apply_ranked_update("p1", build))["streak"] == 1
+    assert await service.apply_ranked_update("p1", build) is None
+    assert await service.apply_ranked_update("gone", build) is None
+
+    [user] = await service.get_all_tracked_users()
+    assert user["streak"] == 1
+    assert user["LP"] == 60
+    assert len(await service.get_lp_history("p1")) == 2
@@ -0,0 +1,207 @@
+"""Tests for the shared player update engine (utils/update_engine.py).
+
+The Riot calls are patched on the module; storage is a fake whose versioned
+write builds from a stored user dict, so the streak logic runs for real.
+"""
+
+from unittest.mock import AsyncMock, MagicMock
+
+import pytest
+import sentry_sdk
+
+from utils.exceptions import UserNotFoundError
+from utils.keyed_lock import KeyedLock
+from utils.update_engine import INTERACTIVE, PlayerUpdateEngine
+
+GOLD = {"tier": "GOLD", "rank": "IV", "LP": 10}
+
+
+def _make_db_service(stored):
+    """Fake storage whose versioned write builds from `stored[puuid]`."""
+    db_service = MagicMock()
+    db_service.player_locks = KeyedLock()
+    db_service.written = {}
+
+    async def apply_ranked_update(puuid, build):
+        update = build(stored[puuid])
+        if update is not None:
+            db_service.written[puuid] = update
+            stored[puuid] = {**stored[puuid], **update}
+        return update
+
+    db_service.apply_ranked_update = AsyncMock(side_effect=apply_ranked_update)
+    return db_service
+
+
+def _make_engine(stored):
+    bot = MagicMock()
+    bot.db_service = _make_db_service(stored)
+    return PlayerUpdateEngine(bot, "key", pacing_seconds=0)
+
+
+@pytest.fixture
+def riot(monkeypatch):
+    """Patch the engine's Riot calls; tests set the return values."""
+    ranked = AsyncMock(return_value=GOLD)
+    monkeypatch.setattr("utils.update_engine.get_ranked_info", ranked)
+    monkeypatch.setattr(
+        "utils.update_engine.get_recent_match_info",
+        AsyncMock(return_value={}),
+    )
+    match = {"match_id": "NEW_MATCH", "win": True, "participants": []}
+    monkeypatch.setattr("utils.update_engine.extract_match_info", lambda *_: match)
+    return ranked, match
+
+
+async def _collect(engine, users, **kwargs):
+    return [result async for result in engine.update_players(users, **kwargs)]
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("riot")
+async def test_new_match_advances_streak_and_last_match_id():
+    user = {"puuid": "p1", "region": "na1", "riot_id": "Player#NA1"}
+    user.update(streak=2, last_match_id="OLD_MATCH")
+    engine = _make_engine({"p1": dict(user)})
+
+    [result] = await _collect(engine, [user])
+
+    data = engine.bot.db_service.written["p1"]
+    # A genuinely new match advances the pointer and the streak.
+    assert data["last_match_id"] == "NEW_MATCH"
+    assert data["streak"] == 3
+    assert result.streak == 3
+
+
+@pytest.mark.asyncio
+async def test_missing_match_id_does_not_clobber_last_match_id(riot):
+    # A match DTO missing metadata.matchId yields match_id=None; the write must
+    # preserve the existing last_match_id rather than overwrite it with None.
+    _ranked, match = riot
+    match["match_id"] = None
+    user = {"puuid": "p1", "region": "na1", "riot_id": "Player#NA1"}
+    user.update(streak=2, last_match_id="OLD_MATCH")
+    engine = _make_engine({"p1": dict(user)})
+
+    await _collect(engine, [user])
+
+    data = engine.bot.db_service.written["p1"]
+    # last_match_id must NOT be present (so Firestore's partial update leaves the
+    # stored value untouched), and the streak stays put on a repeat/no-op match.
+    assert "last_match_id" not in data
+    assert data["streak"] == 2
+
+
+@pytest.mark.asyncio
+async def test_name_change_is_part_of_the_ranked_write(riot):
+    _ranked, match = riot
+    match["participants"] = [
+        {"puuid": "p1", "riotIdGameName": "Renamed", "riotIdTagline": "NA1"},
+    ]
+    user = {"puuid": "p1", "region": "na1", "riot_id": "Player#NA1"}
+    engine = _make_engine({"p1": dict(user)})
+
+    [result] = await _collect(engine, [user])
+
+    assert engine.bot.db_service.written["p1"]["riot_id"] == "Renamed#NA1"
+    assert result.riot_id == "Renamed#NA1"
+
+
+@pytest.mark.asyncio
+async def test_one_players_error_does_not_stop_the_rest(riot):
+    ranked, _match = riot
+    ranked.side_effect = [UserNotFoundError("gone"), GOLD]
+    users = [
+        {"puuid": "p1", "region": "na1", "riot_id": "Gone#NA1"},
+        {"puuid": "p2", "region": "na1", "riot_id": "Here#NA1"},
+    ]
+    engine = _make_engine({user["puuid"]: dict(user) for user in users})
+
+    results = await _collect(engine, users)
+
+    assert [result.puuid for result in results] == ["p2"]
+
+
+@pytest.mark.asyncio
+async def test_each_player_is_one_span_in_the_submitters_trace(riot, monkeypatch):
+    ranked, _match = riot
+    start_child = MagicMock()
+    monkeypatch.setattr(sentry_sdk.tracing.Transaction, "start_child", start_child)
+    current_spans = []
+
+    async def ranked_info(*_args):
+        current_spans.append(sentry_sdk.get_current_span())
+        if len(current_spans) == 1:
+            raise UserNotFoundError("gone")
+        return GOLD
+
+    ranked.side_effect = ranked_info
+    users = [
+        {"puuid": "p1", "region": "na1", "riot_id": "Gone#NA1"},
+        {"puuid": "p2", "region": "na1", "riot_id": "Here#NA1"},
+    ]
+    engine = _make_engine({user["puuid"]: dict(user) for user in users})
+
+    with sentry_sdk.start_transaction(op="command", name="!update"):
+        await _collect(engine, users)
+
+    assert [call.kwargs for call in start_child.call_args_list] == [
+        {"op": "player.update", "name": "Gone#NA1"},
+        {"op": "player.update", "name": "Here#NA1"},
+    ]
+    span = start_child.return_value
+    span.set_status.assert_called_once_with("internal_error")
+    assert span.finish.call_count == 2
+    # The worker's Riot and storage calls open no spans of their own.
+    assert current_spans == [None, None]
+
+
+@pytest.mark.asyncio
+async def test_background_skips_players_update_just_fetched(riot):
+    ranked, _match = riot
+    user = {"puuid": "p1", "region": "na1", "riot_id": "Player#NA1", **GOLD}
+    engine = _make_engine({"p1": dict(user)})
+
+    assert await _collect(engine, [user]) == []  # unchanged, but fetched
+    assert engine.is_fresh("p1", 60)
+    await _collect(engine, [user], fresh_within=60)
+    assert ranked.await_count == 1
+
+    await _collect(engine, [user], fresh_within=0)
+    assert ranked.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_interactive_jobs_overtake_queued_background_players():
+    engine = _make_engine({})
+    order = []
+
+    async def update_player(user):
+        order.append(user["puuid"])
+
+    engine.update_player = update_player
+    background = engine.submit([{"puuid": f"b{i}"} for i in range(3)])
+    interactive = engine.submit([{"puuid": "i0"}], priority=INTERACTIVE)
+
+    async for _results in background.follow():
+        pass
+
+    assert interactive.finished
+    assert order == ["i0", "b0", "b1", "b2"]
+
+
+@pytest.mark.asyncio
+@pytest.mark.usefixtures("riot")
+async def test_fresh_players_are_skipped_not_reannounced():
+    user = {"puuid": "p1", "region": "na1", "riot_id": "Player#NA1"}
+    engine = _make_engine({"p1": dict(user)})
+    [_result] = await _collect(engine, [user])
+
+    job = engine.submit([user], key="guild:1", fresh_within=60)
+    assert engine.jobs == {"guild:1": job}
+    async for _results in job.follow():
+        pass
+
+    assert job.results == []
+    assert job.skipped == 1
+    assert engine.jobs == {}
@@ -14,6 +14,24 @@ TIER_ORDER = {
 RANK_ORDER = {"I": 4, "II": 3, "III": 2, "IV": 1, "": 0}
 # A win/loss streak is only surfaced in an update once it reaches this length.
 STREAK_DISPLAY_THRESHOLD = 3
+# How often the background loop starts a cycle over every tracked player; a cycle
+# that takes longer is falling behind (heartbeat liveness reports it as degraded).
+BACKGROUND_CYCLE_SECONDS = 600
+# Pause after each posted update so a run of updates stays behind the Riot API rate
+# limit curve (benchmarks set it to 0 to measure the cycle itself).
+UPDATE_PACING_SECONDS = 1.5
+# The background loop skips players fetched this recently (e.g. by `!update`);
+# `!update` itself only skips players fetched within the last minute.
+UPDATE_FRESHNESS_SECONDS = 300
+MANUAL_UPDATE_FRESHNESS_SECONDS = 60
+# Minimum gap between edits of `!update`'s progress message.
+PROGRESS_EDIT_SECONDS = 2
+# Leaderboard players per embed page; pages are also cut at Discord's
+# 4096-character embed description limit.
+LEADERBOARD_PAGE_SIZE = 20
+EMBED_DESCRIPTION_LIMIT = 4096
+# Players shown on the cross-guild `!leaderboard global|<region>` boards.
+GLOBAL_LEADERBOARD_SIZE = 100
 REGION_CLUSTERS = {
     "na1": "americas",
     "br1": "americas",
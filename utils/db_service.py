@@ -1,12 +1,90 @@
 from firebase_admin import firestore
+from google.api_core.exceptions import FailedPrecondition, NotFound
 from google.cloud.firestore import FieldFilter
+from google.cloud.firestore_v1.field_path import FieldPath
 
-from database import GUILD_CONFIG_COLLECTION, TRACKED_USERS_COLLECTION
+from database import (
+    BOT_HEALTH_COLLECTION,
+    GUILD_CONFIG_COLLECTION,
+    GUILD_MEMBERS_COLLECTION,
+    HEARTBEAT_DOC,
+    LP_HISTORY_COLLECTION,
+    TRACKED_USERS_COLLECTION,
+)
 from utils.exceptions import DatabaseError, UserNotFoundError
+from utils.helpers import with_rank_score
 from utils.logger_config import logger
+from utils.lp_history import chunk_id, pack_record, unpack_records
+from utils.storage import CLEANUP_CHUNK_SIZE, MAX_WRITE_ATTEMPTS, StorageBackend
 
+# Firestore caps a write batch at 500 operations.
+BATCH_LIMIT = 500
+# Firestore caps the values of an "in" filter at 30.
+IN_FILTER_LIMIT = 30
+# Tracked-user fields copied into each guild's membership doc, so a guild's
+# leaderboard or !update is one document read. At ~200 bytes an entry, the 1 MiB
+# document limit allows roughly 5,000 players per guild.
+MEMBER_FIELDS = (
+    "riot_id",
+    "region",
+    "tier",
+    "rank",
+    "LP",
+    "score",
+    "streak",
+    "last_match_id",
+)
 
-class DatabaseService:
+
+def _member_entry(data):
+    return {key: data[key] for key in MEMBER_FIELDS if key in data}
+
+
+def _leave_guild(guild_id_str):
+    """Field-level update removing one guild from a tracked-user doc."""
+    return {
+        "guild_ids": firestore.ArrayRemove([guild_id_str]),
+        FieldPath("server_info", guild_id_str).to_api_repr(): firestore.DELETE_FIELD,
+    }
+
+
+@firestore.transactional
+def _delete_if_guildless(transaction, doc_refs, history):
+    """Delete the players left with no guild, and their LP history.
+
+    Runs in a transaction so a concurrent !track into another guild is never
+    lost: if it lands first the doc is kept, if it lands after it retries.
+    The player docs are one batched read and their history chunks one "in"
+    query per IN_FILTER_LIMIT players. At most BATCH_LIMIT docs are deleted;
+    returns the puuids deleted and the guildless ones left for another call.
+    """
+    guildless = [
+        doc
+        for doc in transaction.get_all(doc_refs)
+        if doc.exists and not doc.to_dict().get("guild_ids")
+    ]
+    puuids = [doc.id for doc in guildless]
+    chunks = {puuid: [] for puuid in puuids}
+    for start in range(0, len(puuids), IN_FILTER_LIMIT):
+        query = history.where(
+            filter=FieldFilter("puuid", "in", puuids[start : start + IN_FILTER_LIMIT])
+        )
+        for chunk in transaction.get(query):
+            chunks[chunk.get("puuid")].append(chunk)
+    # Firestore transactions must do every read before the first write.
+    deletes, deleted = [], []
+    for doc in guildless:
+        player_deletes = [doc, *chunks[doc.id]]
+        if deletes and len(deletes) + len(player_deletes) > BATCH_LIMIT:
+            break
+        deletes.extend(player_deletes)
+        deleted.append(doc.id)
+    for doc in deletes:
+        transaction.delete(doc.reference)
+    return deleted, puuids[len(deleted) :]
+
+
+class DatabaseService(StorageBackend):
     """Service layer for league specific Firestore operations.
 
     Cogs interact with Firestore exclusively through this class and pass plain
@@ -14,13 +92,78 @@ class DatabaseService:
     """
 
     def __init__(self, db):
+        super().__init__()
         self.db = db
 
-    # Guild operations
+    # Helpers
 
-    async def update_riot_id(self, puuid, new_riot_id):
-        doc_ref = self.db.collection(TRACKED_USERS_COLLECTION).document(puuid)
-        doc_ref.update({"riot_id": new_riot_id})
+    def _members_ref(self, guild_id):
+        return self.db.collection(GUILD_MEMBERS_COLLECTION).document(str(guild_id))
+
+    def _commit(self, writes):
+        """Commit `(op, doc_ref, data)` writes, at most BATCH_LIMIT per batch.
+
+        `op` is "set", "update", "merge" (set with merge=True) or "delete".
+        Writes that fit in one batch are applied atomically.
+        """
+        for start in range(0, len(writes), BATCH_LIMIT):
+            self._batch(writes[start : start + BATCH_LIMIT]).commit()
+
+    def _batch(self, writes):
+        """Return an uncommitted WriteBatch holding `(op, doc_ref, data)` writes."""
+        batch = self.db.batch()
+        for op, doc_ref, data in writes:
+            if op == "delete":
+                batch.delete(doc_ref)
+            elif op == "merge":
+                batch.set(doc_ref, data, merge=True)
+            else:
+                getattr(batch, op)(doc_ref, data)
+        return batch
+
+    def _member_writes(self, puuid, guild_ids, data):
+        """Writes copying `data`'s member fields into each guild's membership doc."""
+        entry = _member_entry(data)
+        if not entry:
+            return []
+        return [
+            ("merge", self._members_ref(guild_id), {"members": {puuid: entry}})
+            for guild_id in guild_ids
+        ]
+
+    def _history_write(self, puuid, data):
+        """Write appending `data`'s score to the player's LP history, or None."""
+        if "score" not in data:
+            return None
+        record = pack_record(data["score"], data.get("last_match_id"))
+        return (
+            "merge",
+            self.db.collection(LP_HISTORY_COLLECTION).document(chunk_id(puuid)),
+            {"puuid": puuid, "records": firestore.ArrayUnion([record])},
+        )
+
+    def _history_chunks(self, puuid):
+        return (
+            self.db.collection(LP_HISTORY_COLLECTION)
+            .where(filter=FieldFilter("puuid", "==", puuid))
+            .stream()
+        )
+
+    def _delete_guildless(self, doc_refs):
+        """Delete the players in `doc_refs` left with no guild; return their puuids.
+
+        One transaction per BATCH_LIMIT deletes (see `_delete_if_guildless`).
+        """
+        collection = self.db.collection(TRACKED_USERS_COLLECTION)
+        history = self.db.collection(LP_HISTORY_COLLECTION)
+        deleted = []
+        while doc_refs:
+            done, rest = _delete_if_guildless(self.db.transaction(), doc_refs, history)
+            deleted.extend(done)
+            doc_refs = [collection.document(puuid) for puuid in rest]
+        return deleted
+
+    # Guild operations
 
     async def get_guild_config(self, guild_id):
         try:
@@ -64,43 +207,182 @@ class DatabaseService:
         return [doc.to_dict() for doc in docs]
 
     async def get_guild_tracked_users(self, guild_id):
-        """Return the tracked-user dicts for a single guild."""
+        """Return the guild's players from its membership doc - one read.
+
+        Each dict holds ``puuid``, ``added_by`` and the MEMBER_FIELDS copied
+        from the tracked-user doc. Guilds tracked before membership docs existed
+        are rebuilt from an `array_contains` query the first time they're read.
+        """
+        snapshot = self._members_ref(guild_id).get()
+        if not snapshot.exists:
+            return self._backfill_guild_members(guild_id)
+        members = snapshot.to_dict().get("members", {})
+        return [{"puuid": puuid, **entry} for puuid, entry in members.items()]
+
+    def _backfill_guild_members(self, guild_id):
+        guild_id_str = str(guild_id)
         docs = (
             self.db.collection(TRACKED_USERS_COLLECTION)
-            .where(filter=FieldFilter("guild_ids", "array_contains", str(guild_id)))
+            .where(filter=FieldFilter("guild_ids", "array_contains", guild_id_str))
+            .stream()
+        )
+        members = {}
+        for doc in docs:
+            data = doc.to_dict()
+            added_by = data.get("server_info", {}).get(guild_id_str, {})
+            members[data["puuid"]] = {
+                **_member_entry(data),
+                "added_by": added_by.get("added_by"),
+            }
+        if members:
+            self._members_ref(guild_id).set({"members": members})
+        return [{"puuid": puuid, **entry} for puuid, entry in members.items()]
+
+    async def get_top_players(self, limit, region=None):
+        """Return the top `limit` players by score, ordered and limited server-side.
+
+        The region form needs the (region, score desc) composite index in
+        firestore.indexes.json. Players with no ``score`` yet are not listed;
+        scripts/backfill_scores.py adds it to older docs.
+        """
+        query = self.db.collection(TRACKED_USERS_COLLECTION)
+        if region is not None:
+            query = query.where(filter=FieldFilter("region", "==", region))
+        docs = (
+            query.order_by("score", direction=firestore.Query.DESCENDING)
+            .limit(limit)
             .stream()
         )
         return [doc.to_dict() for doc in docs]
 
-    async def update_ranked_data(self, puuid, ranked_data):
-        """Persist fresh tracked-user fields (tier/rank/LP, streak, last match)."""
+    async def backfill_scores(self):
+        """Add ``score`` to tracked-user docs written before it existed."""
+        collection = self.db.collection(TRACKED_USERS_COLLECTION)
+        writes = []
+        for doc in collection.stream():
+            data = doc.to_dict()
+            if "score" not in data:
+                scored = with_rank_score(data)
+                if "score" in scored:
+                    writes.append(("update", doc.reference, {"score": scored["score"]}))
+        self._commit(writes)
+        return len(writes)
+
+    async def apply_ranked_update(self, puuid, build):
+        """Read-compute-write one player with an ``update_time`` precondition.
+
+        The tracked-user update carries the snapshot's update time, so the batch
+        - update, membership mirrors and history append - fails as a whole with
+        FailedPrecondition if another process wrote the player after our read.
+        We then re-read and rebuild, up to MAX_WRITE_ATTEMPTS times.
+        """
         doc_ref = self.db.collection(TRACKED_USERS_COLLECTION).document(puuid)
-        doc_ref.update(ranked_data)
+        for _attempt in range(MAX_WRITE_ATTEMPTS):
+            snapshot = doc_ref.get()
+            if not snapshot.exists:
+                return None
+            current = snapshot.to_dict()
+            update = build(current)
+            if update is None:
+                return None
+            update = with_rank_score(update)
+            writes = self._member_writes(puuid, current.get("guild_ids", []), update)
+            history = self._history_write(puuid, update)
+            if history is not None:
+                writes.append(history)
+            batch = self._batch(writes)
+            batch.update(
+                doc_ref,
+                update,
+                option=self.db.write_option(last_update_time=snapshot.update_time),
+            )
+            try:
+                batch.commit()
+            except FailedPrecondition:
+                logger.info(f"🔁 {puuid} changed during update, retrying")
+                continue
+            except NotFound:
+                return None
+            self.leaderboards.update(puuid, update)
+            return update
+        raise DatabaseError(
+            f"Ranked update for {puuid} kept conflicting after "
+            f"{MAX_WRITE_ATTEMPTS} attempts.",
+        )
 
-    async def untrack_all_users(self, guild_id):
+    async def upsert_tracked_users(self, users):
+        """Bulk write full tracked-user dicts, merged into any existing docs."""
+        collection = self.db.collection(TRACKED_USERS_COLLECTION)
+        users = [with_rank_score(user) for user in users]
+        writes = []
+        for user in users:
+            writes.append(("merge", collection.document(user["puuid"]), user))
+            for guild_id, info in user.get("server_info", {}).items():
+                entry = {**_member_entry(user), "added_by": info.get("added_by")}
+                writes.append(
+                    (
+                        "merge",
+                        self._members_ref(guild_id),
+                        {"members": {user["puuid"]: entry}},
+                    ),
+                )
+        self._commit(writes)
+        for user in users:
+            for guild_id, info in user.get("server_info", {}).items():
+                self.leaderboards.track(
+                    guild_id,
+                    user["puuid"],
+                    {**user, "added_by": info.get("added_by")},
+                )
+
+    async def untrack_guild_chunk(self, guild_id, limit=CLEANUP_CHUNK_SIZE):
+        """Remove up to `limit` of a guild's players.
+
+        One read of the guild's membership doc and one batched read of the
+        chunk's player docs, then one batch: each player that still exists gets
+        a field-level ArrayRemove/DELETE_FIELD update - no rewrite - and every
+        listed player, missing or not, leaves the membership doc in the same
+        batch, so the doc is the checkpoint of an interrupted removal and a
+        missing player can't stall it. Transactions of up to
+        BATCH_LIMIT deletes then remove the players left with no guild together
+        with their LP history (see `_delete_if_guildless`); if those fail, the
+        background cycle's `delete_guildless_users` finishes the job.
+        """
         try:
             guild_id_str = str(guild_id)
-            docs = (
-                self.db.collection(TRACKED_USERS_COLLECTION)
-                .where(filter=FieldFilter("guild_ids", "array_contains", guild_id_str))
-                .stream()
-            )
-            doc_list = list(docs)
-            if not doc_list:
-                # No users tracked in server
-                return
-            for doc in doc_list:
-                doc_ref = doc.reference
-                data = doc.to_dict()
-                guild_list = data.get("guild_ids", [])
-                guild_list.remove(guild_id_str)
-                if not guild_list:
-                    # We were the only server left, delete the whole user file
-                    doc_ref.delete()
-                else:
-                    data["guild_ids"] = guild_list
-                    data.get("server_info", {}).pop(guild_id_str, None)
-                    doc_ref.set(data)
+            members_ref = self._members_ref(guild_id)
+            snapshot = members_ref.get()
+            if snapshot.exists:
+                puuids = list(snapshot.to_dict().get("members", {}))
+            else:
+                puuids = [
+                    user["puuid"] for user in self._backfill_guild_members(guild_id)
+                ]
+            chunk, rest = puuids[:limit], puuids[limit:]
+            collection = self.db.collection(TRACKED_USERS_COLLECTION)
+            # An update of a missing doc would fail the whole batch.
+            doc_refs = [
+                doc.reference
+                for doc in self.db.get_all(
+                    [collection.document(puuid) for puuid in chunk]
+                )
+                if doc.exists
+            ]
+            writes = [
+                ("update", doc_ref, _leave_guild(guild_id_str)) for doc_ref in doc_refs
+            ]
+            if rest:
+                leaving = {
+                    FieldPath("members", puuid).to_api_repr(): firestore.DELETE_FIELD
+                    for puuid in chunk
+                }
+                writes.append(("update", members_ref, leaving))
+            else:
+                writes.append(("delete", members_ref, None))
+            self._commit(writes)
+            self.leaderboards.drop(guild_id)
+            self._delete_guildless(doc_refs)
+            return len(rest)
         except Exception as e:
             logger.exception(
                 f"❌ ERROR: failed to untrack all users from guild {guild_id} : {e}",
@@ -109,28 +391,76 @@ class DatabaseService:
                 f"Database operation failed for guild {guild_id}: {e}",
             ) from e
 
+    async def delete_guildless_users(self):
+        orphans = (
+            self.db.collection(TRACKED_USERS_COLLECTION)
+            .where(filter=FieldFilter("guild_ids", "==", []))
+            .stream()
+        )
+        return len(self._delete_guildless([doc.reference for doc in orphans]))
+
+    async def get_known_guild_ids(self):
+        """Return guild ids from guild_config, guild_members and tracked_users.
+
+        Config and membership ids come from document listings; tracked users
+        are streamed with only their ``guild_ids`` field selected.
+        """
+        guild_ids = {
+            doc_ref.id
+            for name in (GUILD_CONFIG_COLLECTION, GUILD_MEMBERS_COLLECTION)
+            for doc_ref in self.db.collection(name).list_documents()
+        }
+        tracked = self.db.collection(TRACKED_USERS_COLLECTION).select(["guild_ids"])
+        for doc in tracked.stream():
+            guild_ids.update(doc.to_dict().get("guild_ids", []))
+        return guild_ids
+
     async def track_user(
         self, guild_id, author_id, riot_id: str, puuid: str, ranked_data, region
     ):
         guild_id_str = str(guild_id)
         doc_ref = self.db.collection(TRACKED_USERS_COLLECTION).document(puuid)
+        scalars = with_rank_score(
+            {
+                "riot_id": riot_id,
+                "puuid": puuid,
+                "region": region,
+                "tier": f"{ranked_data.get('tier')}",
+                "rank": f"{ranked_data.get('rank')}",
+                "LP": ranked_data.get("LP"),
+            },
+        )
         payload = {
-            "riot_id": riot_id,
-            "puuid": puuid,
-            "region": region,
-            "tier": f"{ranked_data.get('tier')}",
-            "rank": f"{ranked_data.get('rank')}",
-            "LP": ranked_data.get("LP"),
+            **scalars,
             "guild_ids": firestore.ArrayUnion([guild_id_str]),
             f"server_info.{guild_id_str}": {"added_by": author_id},
         }
         try:
-            doc_ref.set(payload, merge=True)
+            # Carry an already-tracked player's streak and last match into the
+            # new guild's membership entry.
+            existing = doc_ref.get()
+            current = existing.to_dict() if existing.exists else {}
+            entry = {**_member_entry({**current, **scalars}), "added_by": author_id}
+            writes = [
+                ("merge", doc_ref, payload),
+                ("merge", self._members_ref(guild_id), {"members": {puuid: entry}}),
+            ]
+            if not existing.exists:
+                writes.append(self._history_write(puuid, scalars))
+            self._commit(writes)
+            self.leaderboards.track(guild_id, puuid, entry)
         except Exception as e:
             logger.exception(f"❌ ERROR: tracking: {e}")
             raise DatabaseError(f"Database write failed for player {riot_id}.") from e
 
     async def untrack_user(self, guild_id, riot_id, puuid):
+        """Remove one guild from a player with field-level updates.
+
+        The one read tells "not tracked" apart from "not tracked here". A
+        transaction then deletes the doc if no guild is left - decided on the
+        doc as it is after the commit, not as it was read, so a guild removed
+        concurrently (e.g. by a cleanup chunk) can't leave it orphaned.
+        """
         guild_id_str = str(guild_id)
         doc_ref = self.db.collection(TRACKED_USERS_COLLECTION).document(puuid)
         try:
@@ -139,22 +469,41 @@ class DatabaseService:
                 raise UserNotFoundError(
                     f"{riot_id} is not being tracked.",
                 )
-            data = doc.to_dict()
-            guild_list = data.get("guild_ids", [])
+            guild_list = doc.to_dict().get("guild_ids", [])
             if guild_id_str not in guild_list:
                 raise UserNotFoundError(
                     f"{riot_id} is not being tracked in this server.",
                 )
-            guild_list.remove(guild_id_str)
-            if not guild_list:
-                # We are the only server left, delete the whole file
-                doc_ref.delete()
-            else:
-                data["guild_ids"] = guild_list
-                data.get("server_info", {}).pop(guild_id_str, None)
-                doc_ref.set(data)
+            self._commit(
+                [
+                    ("update", doc_ref, _leave_guild(guild_id_str)),
+                    (
+                        "merge",
+                        self._members_ref(guild_id),
+                        {"members": {puuid: firestore.DELETE_FIELD}},
+                    ),
+                ],
+            )
+            self.leaderboards.untrack(guild_id, puuid)
+            # If no server is left, delete the whole file - unless another
+            # server tracked the player in the meantime.
+            self._delete_guildless([doc_ref])
         except UserNotFoundError:
             raise
         except Exception as e:
             logger.exception(f"❌ ERROR: untracking: {e}")
             raise DatabaseError(f"Database write failed for player {riot_id}.") from e
+
+    async def get_lp_history(self, puuid):
+        """Return the player's LP history from its chunk docs, in one query."""
+        blobs = []
+        for doc in self._history_chunks(puuid):
+            blobs.extend(doc.to_dict().get("records", []))
+        return unpack_records(blobs)
+
+    # Bot health
+
+    async def write_heartbeat(self, data):
+        self.db.collection(BOT_HEALTH_COLLECTION).document(HEARTBEAT_DOC).set(
+            {"last_beat": firestore.SERVER_TIMESTAMP, **data},
+        )
@@ -0,0 +1,47 @@
+"""Liveness classification shared by the bot's /healthz and heartbeat_check.py.
+
+Both derive the everythingdev liveness word (MANAGED-PROJECTS.md) from how long
+ago the bot last wrote its heartbeat and whether it is connected to Discord:
+`cogs/metrics.py` from the bot's own record of its last beat, and
+`scripts/heartbeat_check.py` from the `bot_health/heartbeat` doc when the bot's
+endpoint is unreachable. Keep this module free of heavy imports - the script
+loads it on every dashboard refresh.
+"""
+
+import os
+
+# Thresholds (seconds) - tunable via env. Beat interval is 60s in the bot.
+GREEN_MAX = int(os.getenv("HEARTBEAT_GREEN_MAX", "180"))  # <= 3 missed beats
+DOWN_MAX = int(os.getenv("HEARTBEAT_DOWN_MAX", "900"))  # 15 min -> down
+
+
+def classify_liveness(
+    age_seconds: float,
+    connected: bool,
+    cycle_seconds: float | None = None,
+    interval_seconds: float | None = None,
+) -> tuple[str, str]:
+    """Map heartbeat freshness + connection state to a liveness word + detail.
+
+    Pure and side-effect-free so it can be unit-tested without Firestore.
+    Assumes a heartbeat with a valid `last_beat` exists (missing docs are
+    handled as `down` by the caller). When the last background cycle's duration
+    and the polling interval are known, a cycle that ran longer than the interval
+    is `degraded`: the bot is falling behind its players.
+    """
+    if age_seconds > DOWN_MAX:
+        return "down", f"last beat {round(age_seconds)}s ago (> {DOWN_MAX}s)"
+    if not connected:
+        return "degraded", "beating but not connected to Discord"
+    if age_seconds > GREEN_MAX:
+        return "degraded", f"stale: last beat {round(age_seconds)}s ago"
+    if (
+        cycle_seconds is not None
+        and interval_seconds is not None
+        and cycle_seconds > interval_seconds
+    ):
+        return "degraded", (
+            f"falling behind: last cycle took {round(cycle_seconds)}s"
+            f" (> {round(interval_seconds)}s interval)"
+        )
+    return "green", f"beating, connected ({round(age_seconds)}s ago)"
@@ -2,7 +2,13 @@
 # If you notice a group of these functions having similar functionality,
 # make a separate file for them.
 
-from utils.constants import STREAK_DISPLAY_THRESHOLD
+from utils.constants import RANK_ORDER, STREAK_DISPLAY_THRESHOLD, TIER_ORDER
+
+# Score weights: LP stays under 10,000 (Challenger tops out in the low thousands)
+# and a division step never reaches a tier step, so scores order like
+# (tier, division, LP) tuples.
+TIER_SCORE_STEP = 100_000
+RANK_SCORE_STEP = 10_000
 
 
 def parse_rank_info(old_data, new_data):
@@ -26,6 +32,43 @@ def rank_difference(ranked_info) -> bool:
     return not (old_tier == new_tier and old_rank == new_rank and old_lp == new_lp)
 
 
+def rank_score(tier, rank, lp) -> int:
+    """Return one integer that orders players by tier, then division, then LP.
+
+    Unknown or missing tiers score as UNRANKED (0).
+    """
+    tier_index = TIER_ORDER.get(str(tier).upper(), TIER_ORDER["UNRANKED"])
+    return (
+        (tier_index + 1) * TIER_SCORE_STEP
+        + RANK_ORDER.get(rank, 0) * RANK_SCORE_STEP
+        + (lp or 0)
+    )
+
+
+def describe_score(score) -> str:
+    """Turn a rank score back into ``"GOLD II (40 LP)"``."""
+    tier_index, remainder = divmod(score, TIER_SCORE_STEP)
+    division, lp = divmod(remainder, RANK_SCORE_STEP)
+    tier = next(
+        (name for name, index in TIER_ORDER.items() if index == tier_index - 1),
+        "UNRANKED",
+    )
+    if tier == "UNRANKED":
+        return tier
+    rank = next((name for name, index in RANK_ORDER.items() if index == division), "")
+    return f"{tier} {rank} ({lp} LP)" if rank else f"{tier} ({lp} LP)"
+
+
+def with_rank_score(data):
+    """Return `data` plus its ``score`` if it carries a tier, else `data` as is."""
+    if "tier" not in data:
+        return data
+    return {
+        **data,
+        "score": rank_score(data.get("tier"), data.get("rank"), data.get("LP")),
+    }
+
+
 def parse_region(unclean_region):
     """Parses an unclean_region string.
 
@@ -87,6 +130,33 @@ def next_streak(previous_streak, win) -> int:
     return (previous_streak if previous_streak < 0 else 0) - 1
 
 
+def apply_match_result(current, ranked_data, match_info):
+    """Return the fields to write for a rank change, computed from `current`.
+
+    `current` is the player's stored doc as of the write, not the snapshot the
+    update started from, so two updaters that saw the same game agree. Only a
+    genuinely new game advances the streak; a repeat match id (e.g. an LP change
+    with no new game, like a dodge) leaves it untouched. Returns None when
+    `current` already holds this rank and match - another updater got there
+    first.
+    """
+    match_id = match_info.get("match_id")
+    new_match = bool(match_id) and match_id != current.get("last_match_id")
+    if not new_match and not rank_difference(parse_rank_info(current, ranked_data)):
+        return None
+    if new_match:
+        streak = next_streak(current.get("streak"), match_info.get("win"))
+    else:
+        streak = current.get("streak") or 0
+    update = {**ranked_data, "streak": streak}
+    # Never overwrite a good last_match_id with None: a match DTO missing
+    # metadata.matchId yields match_id=None, and clobbering it would make the
+    # next real game look "new" and double-count the streak.
+    if match_id:
+        update["last_match_id"] = match_id
+    return update
+
+
 def streak_label(streak) -> str | None:
     """Return the display line for a streak, or None if below the threshold."""
     streak = streak or 0
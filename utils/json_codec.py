@@ -0,0 +1,36 @@
+"""JSON codec for the hot paths: Riot response bodies and the error-sink wire format.
+
+Uses orjson (the optional `fast-json` extra) when it is installed and the stdlib
+`json` module otherwise. Both backends work on bytes end to end - `loads` takes
+the raw body as read off the socket or the buffer file, and `dumps` returns the
+UTF-8 bytes that get POSTed or appended - so callers never round-trip through str.
+
+The stdlib `dumps` is compact (no spaces after separators) and does not escape
+non-ASCII, so both backends produce the same bytes for the same event.
+"""
+
+import json
+
+try:
+    import orjson
+except ImportError:  # the fast-json extra is optional
+    orjson = None
+
+
+def _stdlib_loads(data: bytes | str):
+    return json.loads(data)
+
+
+def _stdlib_dumps(obj) -> bytes:
+    return json.dumps(obj, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+# name -> (loads, dumps); the benchmark drives each backend through this table.
+CODECS = {"json": (_stdlib_loads, _stdlib_dumps)}
+if orjson is not None:
+    CODECS["orjson"] = (orjson.loads, orjson.dumps)
+
+BACKEND = "orjson" if orjson is not None else "json"
+NATIVE = BACKEND != "json"
+
+loads, dumps = CODECS[BACKEND]
@@ -0,0 +1,41 @@
+"""Per-key asyncio locks.
+
+`!update` and the background loop both run read-compute-write on the same
+players. Holding `KeyedLock.hold(puuid)` around one player's update serializes
+those two within the process while different players still proceed in
+parallel. Locks are created on first use and dropped once nobody holds or
+waits for them, so the table never grows past the players in flight.
+"""
+
+import asyncio
+from contextlib import asynccontextmanager
+
+
+class KeyedLock:
+    """A lazily created `asyncio.Lock` per key."""
+
+    def __init__(self):
+        # key -> [lock, holders + waiters]
+        self._locks = {}
+
+    def __len__(self):
+        """Return the number of keys currently held or waited on."""
+        return len(self._locks)
+
+    def locked(self, key):
+        """Return whether `key` is held right now."""
+        entry = self._locks.get(key)
+        return entry is not None and entry[0].locked()
+
+    @asynccontextmanager
+    async def hold(self, key):
+        """Hold `key`'s lock for the duration of the `async with` block."""
+        entry = self._locks.setdefault(key, [asyncio.Lock(), 0])
+        entry[1] += 1
+        try:
+            async with entry[0]:
+                yield
+        finally:
+            entry[1] -= 1
+            if not entry[1]:
+                del self._locks[key]
@@ -0,0 +1,221 @@
+"""Materialized per-guild leaderboards, kept sorted as ranks change.
+
+The storage backend owns a `LeaderboardCache`. A guild's board is built once
+from `get_guild_tracked_users` the first time it is read, then patched in place
+by every write that touches one of its players, so `!leaderboard` never sorts
+or queries. Boards live in process memory; a restart rebuilds them lazily.
+"""
+
+from bisect import bisect_left, bisect_right, insort
+
+from utils.constants import EMBED_DESCRIPTION_LIMIT, LEADERBOARD_PAGE_SIZE
+from utils.helpers import rank_score
+
+# Player fields a board keeps per entry.
+BOARD_FIELDS = ("riot_id", "region", "tier", "rank", "LP", "score", "added_by")
+
+
+def _sort_key(puuid, entry):
+    # Highest score first; ties broken by name so the order is stable.
+    return (-entry["score"], (entry.get("riot_id") or "").lower(), puuid)
+
+
+def _board_entry(user):
+    entry = {key: user[key] for key in BOARD_FIELDS if key in user}
+    entry.setdefault("tier", "UNRANKED")
+    entry.setdefault("rank", "")
+    entry.setdefault("LP", 0)
+    if "score" not in entry:
+        entry["score"] = rank_score(entry["tier"], entry["rank"], entry["LP"])
+    return entry
+
+
+class GuildLeaderboard:
+    """One guild's players in rank order, with a cached rendering.
+
+    `version` increments on every change; anything rendered from the board can
+    key its cache on it. Rendered lines and pages are cached until then, so
+    flipping pages costs nothing.
+    """
+
+    def __init__(self, users=()):
+        self.entries = {}
+        self._keys = []
+        self.version = 0
+        self._lines = None
+        self._pages = None
+        self._page_starts = None
+        for user in users:
+            self.upsert(user["puuid"], user)
+
+    def __len__(self):
+        """Return the number of players on the board."""
+        return len(self._keys)
+
+    def __contains__(self, puuid):
+        """Return whether the player is on the board."""
+        return puuid in self.entries
+
+    def _changed(self):
+        self.version += 1
+        self._lines = None
+        self._pages = None
+        self._page_starts = None
+
+    def upsert(self, puuid, fields):
+        """Insert a player, or merge `fields` into their entry and re-sort them."""
+        current = self.entries.get(puuid)
+        if current is None:
+            entry = _board_entry(fields)
+        else:
+            merged = {**current, **fields}
+            if "score" not in fields and any(
+                key in fields for key in ("tier", "rank", "LP")
+            ):
+                del merged["score"]
+            entry = _board_entry(merged)
+            if entry == current:
+                return
+            self._keys.pop(bisect_left(self._keys, _sort_key(puuid, current)))
+        self.entries[puuid] = entry
+        insort(self._keys, _sort_key(puuid, entry))
+        self._changed()
+
+    def remove(self, puuid):
+        entry = self.entries.pop(puuid, None)
+        if entry is None:
+            return
+        self._keys.pop(bisect_left(self._keys, _sort_key(puuid, entry)))
+        self._changed()
+
+    def ranked(self):
+        """Return `(puuid, entry)` pairs from first place to last."""
+        return [(key[2], self.entries[key[2]]) for key in self._keys]
+
+    def position(self, puuid):
+        """Return the player's 0-based place on the board, or None."""
+        entry = self.entries.get(puuid)
+        if entry is None:
+            return None
+        return bisect_left(self._keys, _sort_key(puuid, entry))
+
+    def lines(self):
+        """Return one display line per player, in rank order (cached)."""
+        if self._lines is None:
+            self._lines = [
+                f"{_place_prefix(i)} ({entry.get('region')}) "
+                f"**{entry.get('riot_id')}** - "
+                f"{entry['tier']} {entry['rank']} ({entry['LP']} LP)"
+                for i, (_puuid, entry) in enumerate(self.ranked(), 1)
+            ]
+        return self._lines
+
+    def render(self):
+        return "\n".join(self.lines())
+
+    def pages(self):
+        """Return the board as embed-sized page descriptions (cached).
+
+        A page holds up to LEADERBOARD_PAGE_SIZE lines and never exceeds
+        EMBED_DESCRIPTION_LIMIT characters.
+        """
+        if self._pages is None:
+            pages, starts = [], []
+            page, size = [], 0
+            for i, line in enumerate(self.lines()):
+                too_long = size + len(line) + 1 > EMBED_DESCRIPTION_LIMIT
+                if page and (len(page) == LEADERBOARD_PAGE_SIZE or too_long):
+                    pages.append("\n".join(page))
+                    page, size = [], 0
+                if not page:
+                    starts.append(i)
+                page.append(line)
+                size += len(line) + 1
+            if page:
+                pages.append("\n".join(page))
+            self._pages, self._page_starts = pages, starts
+        return self._pages
+
+    def page_of(self, puuid):
+        """Return the index of the page the player is listed on, or None."""
+        position = self.position(puuid)
+        if position is None:
+            return None
+        self.pages()
+        return bisect_right(self._page_starts, position) - 1
+
+    def first_added_by(self, user_id):
+        """Return the best-placed player `user_id` tracked here, or None."""
+        for puuid, entry in self.ranked():
+            if entry.get("added_by") == user_id:
+                return puuid
+        return None
+
+
+def _place_prefix(place):
+    if place == 1:
+        return "🥇"
+    if place == 2:
+        return "🥈"
+    if place == 3:
+        return "🥉"
+    return f"**{place}.**"
+
+
+class LeaderboardCache:
+    """Loaded guild boards plus a puuid -> guild ids index across them."""
+
+    def __init__(self):
+        self._boards = {}
+        self._guilds_of = {}
+
+    def get(self, guild_id):
+        return self._boards.get(str(guild_id))
+
+    def load(self, guild_id, users):
+        """Build and keep the guild's board from its tracked-user dicts."""
+        guild_id = str(guild_id)
+        self.drop(guild_id)
+        board = GuildLeaderboard(users)
+        self._boards[guild_id] = board
+        for puuid in board.entries:
+            self._guilds_of.setdefault(puuid, set()).add(guild_id)
+        return board
+
+    def drop(self, guild_id):
+        """Forget a guild's board, e.g. when the bot leaves it."""
+        board = self._boards.pop(str(guild_id), None)
+        if board is None:
+            return
+        for puuid in board.entries:
+            guilds = self._guilds_of.get(puuid)
+            if guilds is not None:
+                guilds.discard(str(guild_id))
+                if not guilds:
+                    del self._guilds_of[puuid]
+
+    def track(self, guild_id, puuid, fields):
+        """Add or refresh a player on one guild's board, if it is loaded."""
+        board = self.get(guild_id)
+        if board is None:
+            return
+        board.upsert(puuid, fields)
+        self._guilds_of.setdefault(puuid, set()).add(str(guild_id))
+
+    def untrack(self, guild_id, puuid):
+        board = self.get(guild_id)
+        if board is None:
+            return
+        board.remove(puuid)
+        guilds = self._guilds_of.get(puuid)
+        if guilds is not None:
+            guilds.discard(str(guild_id))
+            if not guilds:
+                del self._guilds_of[puuid]
+
+    def update(self, puuid, fields):
+        """Apply a player's new fields to every loaded board they are on."""
+        if not any(key in fields for key in BOARD_FIELDS):
+            return
+        for guild_id in self._guilds_of.get(puuid, ()):
+            self._boards[guild_id].upsert(puuid, fields)
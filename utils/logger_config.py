@@ -1,21 +1,154 @@
+"""Root logging setup: text or JSON lines on stdout, optionally off the event loop.
+
+By default records are formatted and written to stdout on the thread that logged
+them, which for most of the bot is the Discord event loop. With LOG_ASYNC=1 the
+root logger gets a `QueueHandler` instead, and a `QueueListener` thread does the
+formatting and the write, so a stdout blocked by container log back-pressure
+stalls that thread rather than the bot. LOG_FORMAT=json switches the output to one
+JSON object per line, carrying the structured fields in STRUCTURED_FIELDS that a
+call site passes through `extra=`.
+
+Only the stdout handler sits behind the queue. The error sink's handler is added to
+the root logger beside it by `setup_sink` (utils/sink_config.py), so it still sees
+each record with its `exc_info` intact - `QueueHandler.prepare` strips that from the
+copy it enqueues. Records dropped because the queue is full are counted in
+`log_stats()` (the heartbeat doc) and on /metrics.
+"""
+
+import atexit
+import copy
 import logging
+import logging.handlers
+import os
+import queue
 import sys
+from datetime import UTC, datetime
+
+from utils import json_codec
+from utils.metrics import LOG_RECORDS_DROPPED
+
+# Record attributes the JSON formatter emits when a call site sets them via `extra=`.
+STRUCTURED_FIELDS = ("cycle_id", "puuid", "region", "latency_ms")
+# Records waiting for the listener thread; past this, new records are dropped.
+LOG_QUEUE_MAX = 10_000
+
+_listener = None
+_queue_handler = None
+_TRACEBACKS = logging.Formatter()
+
+
+class JsonFormatter(logging.Formatter):
+    """Format a record as one compact JSON object."""
+
+    def format(self, record):
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, UTC).isoformat(
+                timespec="milliseconds"
+            ),
+            "level": record.levelname,
+            "logger": record.name,
+            "source": f"{record.filename}:{record.lineno}",
+            "message": record.getMessage(),
+        }
+        for field in STRUCTURED_FIELDS:
+            value = getattr(record, field, None)
+            if value is not None:
+                entry[field] = value
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json_codec.dumps(entry).decode("utf-8")
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that keeps tracebacks structured and never blocks the caller."""
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
 
+    def prepare(self, record):
+        # Resolve the message and the traceback here, while exc_info is valid, but
+        # keep them apart (the stock prepare folds the traceback into the message)
+        # so the listener's formatter lays them out as it would have inline.
+        record = copy.copy(record)
+        record.msg, record.args = record.getMessage(), None
+        if record.exc_info:
+            record.exc_text = _TRACEBACKS.formatException(record.exc_info)
+        record.exc_info = None
+        return record
 
-def setup_logging():
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            LOG_RECORDS_DROPPED.inc()
+
+
+def _stdout_handler(json_output):
+    handler = logging.StreamHandler(sys.stdout)
+    if json_output:
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(
+            logging.Formatter(
+                "%(asctime)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s",
+                datefmt="%m-%d-%Y %H:%M:%S",
+            )
+        )
+    return handler
+
+
+def setup_logging(async_output=None, json_output=None):
+    """Attach the stdout handler to the root logger and return the root logger.
+
+    `async_output` and `json_output` default to the LOG_ASYNC=1 and LOG_FORMAT=json
+    environment settings. Calling it again replaces the previous setup.
+    """
+    global _listener, _queue_handler
+    if async_output is None:
+        async_output = os.getenv("LOG_ASYNC") == "1"
+    if json_output is None:
+        json_output = os.getenv("LOG_FORMAT") == "json"
     logger = logging.getLogger()
+    _stop_listener()
     if logger.hasHandlers():
         logger.handlers.clear()
     logger.setLevel(logging.INFO)  # Capture everything INFO and above (WARNING, ERROR)
-    c_handler = logging.StreamHandler(sys.stdout)
-    c_format = logging.Formatter(
-        "%(asctime)s - %(levelname)s - [%(filename)s:%(lineno)d] - %(message)s",
-        datefmt="%m-%d-%Y %H:%M:%S",
-    )
-    c_handler.setFormatter(c_format)
-    if not logger.handlers:
-        logger.addHandler(c_handler)
+    handler = _stdout_handler(json_output)
+    if async_output:
+        log_queue = queue.Queue(LOG_QUEUE_MAX)
+        _listener = logging.handlers.QueueListener(log_queue, handler)
+        _listener.start()
+        handler = _queue_handler = _QueueHandler(log_queue)
+    logger.addHandler(handler)
     return logger
 
 
+def log_stats(handler=None):
+    """Return the async log queue's counters, or None when LOG_ASYNC is off.
+
+    `dropped` counts records lost to a full queue since startup; `depth` is what
+    waits for the listener thread right now.
+    """
+    handler = handler or _queue_handler
+    if handler is None:
+        return None
+    return {"dropped": handler.dropped, "depth": handler.queue.qsize()}
+
+
+def _stop_listener():
+    """Flush and stop the listener thread, if one is running."""
+    global _listener, _queue_handler
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    _queue_handler = None
+
+
+atexit.register(_stop_listener)
+
+
 logger = setup_logging()
@@ -0,0 +1,194 @@
+"""Measure event-loop lag and name whatever is blocking the loop.
+
+`LoopWatchdog` has two halves. On the loop, a tick callback re-arms itself every
+`interval` seconds and records how late it ran: that lateness is the loop lag,
+fed to the metrics histogram and a rolling window of recent samples. On a
+daemon thread, a watcher checks whether the pending tick is overdue by more than
+`threshold`; if so the loop is blocked right now, so it takes the loop thread's
+current stack from `sys._current_frames()` - the only moment the culprit is still
+on it - together with the task that was running.
+
+When the late tick finally runs, the stall is counted against its site (the
+innermost frame in this repo's code, e.g. a synchronous Firestore call inside a
+storage method) and logged as a WARNING with the stack sample, at most once per
+site per REPORT_EVERY_SECONDS. `stats()` gives the percentiles and worst sites
+for the heartbeat doc.
+"""
+
+import asyncio
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from pathlib import Path
+
+from utils.logger_config import logger
+from utils.metrics import (
+    EVENT_LOOP_LAG_QUANTILES,
+    EVENT_LOOP_LAG_SECONDS,
+    EVENT_LOOP_STALLS,
+)
+
+WATCHDOG_INTERVAL_SECONDS = 0.1
+# Lag past this counts as a stall and gets a stack sample (gateway heartbeats
+# are sent every ~41s, but anything this long already delays commands).
+STALL_THRESHOLD_SECONDS = 0.25
+# Recent lag samples the percentiles are computed over (one minute of ticks).
+LAG_WINDOW = 600
+REPORT_EVERY_SECONDS = 60
+STACK_DEPTH = 8
+QUANTILES = (0.5, 0.95, 0.99)
+
+_REPO_ROOT = str(Path(__file__).resolve().parents[1])
+
+
+def _percentile(ordered, q):
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _site(stack):
+    """Return ``file:line function`` of the innermost frame in this repo's code."""
+    for frame in reversed(stack):
+        if frame.filename.startswith(_REPO_ROOT) and "site-packages" not in (
+            frame.filename
+        ):
+            path = Path(frame.filename).relative_to(_REPO_ROOT)
+            return f"{path}:{frame.lineno} {frame.name}"
+    frame = stack[-1]
+    return f"{Path(frame.filename).name}:{frame.lineno} {frame.name}"
+
+
+def _running_task(loop):
+    # asyncio keeps the running task per loop in a module-level dict; reading it
+    # from another thread is safe enough for a diagnostic.
+    current = getattr(asyncio.tasks, "_current_tasks", {})
+    task = current.get(loop)
+    if task is None:
+        return None
+    coro = task.get_coro()
+    return f"{task.get_name()} ({getattr(coro, '__qualname__', coro)})"
+
+
+class LoopWatchdog:
+    """Samples the running loop's lag and attributes stalls; start on the loop."""
+
+    def __init__(
+        self,
+        interval=WATCHDOG_INTERVAL_SECONDS,
+        threshold=STALL_THRESHOLD_SECONDS,
+    ):
+        self.interval = interval
+        self.threshold = threshold
+        self.samples = deque(maxlen=LAG_WINDOW)
+        # site -> [stalls, worst lag in seconds]
+        self.offenders = {}
+        self._reported_at = {}
+        self._loop = None
+        self._loop_thread = None
+        self._handle = None
+        self._due = 0.0
+        # (due, site, task, stack) taken by the watcher for the pending tick.
+        self._stall = None
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """Arm the tick on the running loop and start the watcher thread."""
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._stopped.clear()
+        self._due = time.monotonic() + self.interval
+        self._handle = self._loop.call_later(self.interval, self._tick)
+        self._thread = threading.Thread(
+            target=self._watch, name="loop-watchdog", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+
+    # Loop side
+
+    def _tick(self):
+        now = time.monotonic()
+        lag = max(0.0, now - self._due)
+        self.samples.append(lag)
+        EVENT_LOOP_LAG_SECONDS.observe(lag)
+        stall, self._stall = self._stall, None
+        if lag >= self.threshold:
+            self._record_stall(lag, stall if stall and stall[0] == self._due else None)
+        self._due = now + self.interval
+        self._handle = self._loop.call_later(self.interval, self._tick)
+
+    def _record_stall(self, lag, stall):
+        _due, site, task, stack = stall or (None, "unknown", None, "")
+        EVENT_LOOP_STALLS.inc(site)
+        entry = self.offenders.setdefault(site, [0, 0.0])
+        entry[0] += 1
+        entry[1] = max(entry[1], lag)
+        now = time.monotonic()
+        if now - self._reported_at.get(site, -REPORT_EVERY_SECONDS) < (
+            REPORT_EVERY_SECONDS
+        ):
+            return
+        self._reported_at[site] = now
+        lag_ms = round(lag * 1000)
+        logger.warning(
+            f"🐢 Event loop blocked for {lag_ms}ms at {site}"
+            f" (task: {task or 'none'}, {entry[0]} stall(s) here so far)\n{stack}",
+            extra={"latency_ms": lag_ms},
+        )
+
+    # Watcher thread
+
+    def _watch(self):
+        published = time.monotonic()
+        while not self._stopped.wait(self.interval):
+            due = self._due
+            if self._stall is None and time.monotonic() - due >= self.threshold:
+                self._stall = self._sample(due)
+            if time.monotonic() - published >= 1:
+                self._publish()
+                published = time.monotonic()
+
+    def _sample(self, due):
+        frame = sys._current_frames().get(self._loop_thread)
+        if frame is None:
+            return None
+        stack = traceback.extract_stack(frame)
+        site = _site(stack)
+        sample = "".join(traceback.format_list(stack[-STACK_DEPTH:]))
+        return due, site, _running_task(self._loop), sample
+
+    def _publish(self):
+        for q, value in self.percentiles().items():
+            EVENT_LOOP_LAG_QUANTILES.set(value, q)
+
+    # Reporting
+
+    def percentiles(self):
+        """Return ``{"0.5": seconds, ...}`` over the recent lag samples."""
+        ordered = sorted(self.samples)
+        if not ordered:
+            return {}
+        return {str(q): _percentile(ordered, q) for q in QUANTILES}
+
+    def stats(self, top=3):
+        """Return lag percentiles and the worst stall sites, in milliseconds."""
+        worst = sorted(self.offenders.items(), key=lambda item: -item[1][1])[:top]
+        return {
+            **{
+                f"p{round(float(q) * 100)}_ms": round(value * 1000, 1)
+                for q, value in self.percentiles().items()
+            },
+            "max_ms": round(max(self.samples, default=0.0) * 1000, 1),
+            "stalls": sum(count for count, _worst in self.offenders.values()),
+            "worst": [
+                {"site": site, "stalls": count, "max_ms": round(lag * 1000)}
+                for site, (count, lag) in worst
+            ],
+        }
@@ -0,0 +1,57 @@
+"""Packed LP history records.
+
+Every rank change is kept as one 16-byte record - (unix time, rank score, match
+number) - instead of a document per game. Records are big-endian so sorting
+the raw bytes sorts them by time. Firestore appends them with ArrayUnion to a
+per-player, per-year chunk doc (`lp_history/{puuid}-{year}`); SQLite keeps
+them in a clustered table. `!history` reads a player's whole series at once.
+"""
+
+import struct
+import time
+from datetime import UTC, datetime
+
+from utils.helpers import describe_score
+
+RECORD = struct.Struct(">IiQ")
+
+
+def match_number(match_id):
+    """Return the numeric part of a match id like ``NA1_5123456789`` (0 if none)."""
+    if not match_id:
+        return 0
+    _, _, number = str(match_id).rpartition("_")
+    return int(number) if number.isdigit() else 0
+
+
+def pack_record(score, match_id=None, timestamp=None):
+    if timestamp is None:
+        timestamp = time.time()
+    return RECORD.pack(int(timestamp), score, match_number(match_id))
+
+
+def unpack_records(blobs):
+    """Return `(timestamp, score, match_number)` tuples, oldest first."""
+    return [RECORD.unpack(blob) for blob in sorted(blobs)]
+
+
+def chunk_id(puuid, timestamp=None):
+    """Return the Firestore chunk doc id a record written at `timestamp` goes in."""
+    if timestamp is None:
+        timestamp = time.time()
+    return f"{puuid}-{datetime.fromtimestamp(timestamp, UTC).year}"
+
+
+def summarize(records):
+    """Return the summary lines `!history` shows for a series, oldest first."""
+    if not records:
+        return []
+    scores = [score for _ts, score, _match in records]
+    first_ts, last_ts = records[0][0], records[-1][0]
+    return [
+        f"**Now:** {describe_score(scores[-1])}",
+        f"**Peak:** {describe_score(max(scores))}",
+        f"**Lowest:** {describe_score(min(scores))}",
+        f"**Since <t:{first_ts}:D>:** {describe_score(scores[0])}",
+        f"**Rank changes:** {len(records)} (last <t:{last_ts}:R>)",
+    ]
@@ -0,0 +1,94 @@
+"""Projection decoding for match-v5 responses.
+
+A match DTO is ~70-100KB of JSON, almost all of it per-participant stats
+(`challenges`, `perks`, `missions`, ...) that nothing in the bot reads. The
+match pipeline only needs `metadata.matchId` and a handful of display fields on
+each participant (see `extract_match_info`, `check_new_riot_id` and
+`MatchDetailsView.create_maximized_embed`).
+
+`decode_match` works in two passes over the raw bytes:
+  1. A byte scan blanks each participant's `challenges` map (over half the body)
+     to `{}` so the decoder never parses it. The map is flat - numbers and
+     arrays only - so its first closing brace ends it.
+  2. The decoder prunes every remaining JSON object down to `MATCH_FIELDS` as it
+     builds it, bottom-up, so unused subtrees are freed as soon as their parent is
+     projected instead of living for as long as a `MatchDetailsView` holds them.
+     A native codec (see `utils/json_codec.py`) has no object hook, so there the
+     body is decoded in one fast pass and pruned top-down instead.
+"""
+
+import json
+
+from utils import json_codec
+
+# Union of every key on the path to a field we read. Pruning is by key name at
+# every depth, which is safe because dropped containers (`teams`, `challenges`,
+# `perks`) are discarded whole by their parent before their contents matter.
+MATCH_FIELDS = frozenset(
+    {
+        # path keys
+        "metadata",
+        "info",
+        "participants",
+        # metadata
+        "matchId",
+        # participant display fields
+        "puuid",
+        "championName",
+        "kills",
+        "deaths",
+        "assists",
+        "win",
+        "riotIdGameName",
+        "riotIdTagline",
+        "teamId",
+        "teamPosition",
+    },
+)
+
+
+_CHALLENGES = b'"challenges":{'
+
+
+def _project(obj: dict) -> dict:
+    return {key: obj[key] for key in MATCH_FIELDS.intersection(obj)}
+
+
+def _prune(value):
+    if isinstance(value, dict):
+        return {key: _prune(value[key]) for key in MATCH_FIELDS.intersection(value)}
+    if isinstance(value, list):
+        return [_prune(item) for item in value]
+    return value
+
+
+def _skip_challenges(raw: bytes) -> bytes:
+    """Return `raw` with every `challenges` map emptied, without decoding it."""
+    parts = []
+    pos = 0
+    while (start := raw.find(_CHALLENGES, pos)) >= 0:
+        end = raw.find(b"}", start)
+        if end < 0:
+            return raw
+        parts.append(raw[pos : start + len(_CHALLENGES)])
+        pos = end
+    if not parts:
+        return raw
+    parts.append(raw[pos:])
+    return b"".join(parts)
+
+
+def decode_match(raw: bytes) -> dict:
+    """Decode a raw match-v5 body, keeping only the fields the bot reads."""
+    try:
+        return _decode_projected(_skip_challenges(raw))
+    except ValueError:
+        # Riot changed the shape of `challenges` (e.g. a nested map) and the
+        # byte scan cut it in the wrong place; decode the untouched body instead.
+        return _decode_projected(raw)
+
+
+def _decode_projected(raw: bytes) -> dict:
+    if json_codec.NATIVE:
+        return _prune(json_codec.loads(raw))
+    return json.loads(raw, object_hook=_project)
@@ -0,0 +1,237 @@
+"""In-process metrics registry rendered in the Prometheus text format.
+
+A deliberately small stand-in for `prometheus_client`: counters, gauges and
+histograms with positional label values, kept in plain dicts behind one lock per
+metric. Recording is a `perf_counter` read, a bisect and a dict update, cheap
+enough to leave on in the Riot, storage and Discord hot paths. `cogs/metrics.py`
+serves `REGISTRY.render()` on a local HTTP port.
+
+Label values must have bounded cardinality (endpoint templates, method names,
+status codes) - never puuids or match ids.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+# Seconds; spans a fast local SQLite read up to a rate-limited Riot call.
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names, values, extra=""):
+    pairs = [
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=True)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _copy(value):
+    return value[:] if isinstance(value, list) else value
+
+
+def _number(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name, help_text, labelnames=()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        self._values = {}
+
+    def _header(self):
+        return [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+
+    def value(self, *labels):
+        """Return the current value for `labels` (for tests and the heartbeat)."""
+        return self._values.get(labels, 0)
+
+    def totals_by(self, labelname):
+        """Return ``{label value: total}`` summed over the other labels.
+
+        For a histogram the total is its observation count.
+        """
+        index = self.labelnames.index(labelname)
+        totals = {}
+        for labels, value in self._snapshot():
+            count = sum(value[:-1]) if isinstance(value, list) else value
+            totals[labels[index]] = totals.get(labels[index], 0) + count
+        return totals
+
+    def _snapshot(self):
+        with self._lock:
+            return sorted((labels, _copy(v)) for labels, v in self._values.items())
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = self._header()
+        for labels, value in self._snapshot():
+            lines.append(
+                f"{self.name}{_labels(self.labelnames, labels)} {_number(value)}"
+            )
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    """Bucketed observations; `value()` returns the observation count."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._values.get(labels)
+            if series is None:
+                # One slot per bucket plus +Inf, then the sum.
+                series = self._values[labels] = [0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        """Observe the duration of the `with` body, whether or not it raises."""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def value(self, *labels):
+        series = self._values.get(labels)
+        return sum(series[:-1]) if series else 0
+
+    def render(self):
+        lines = self._header()
+        bounds = (*self.buckets, float("inf"))
+        for labels, series in self._snapshot():
+            cumulative = 0
+            for bound, count in zip(bounds, series, strict=False):
+                cumulative += count
+                le = f'le="{_number(bound)}"'
+                lines.append(
+                    f"{self.name}_bucket{_labels(self.labelnames, labels, le)} "
+                    f"{cumulative}"
+                )
+            names = _labels(self.labelnames, labels)
+            lines.append(f"{self.name}_sum{names} {_number(series[-1])}")
+            lines.append(f"{self.name}_count{names} {cumulative}")
+        return lines
+
+
+class Registry:
+    """Named metrics, rendered together."""
+
+    def __init__(self):
+        self._metrics = {}
+
+    def _register(self, metric):
+        if metric.name in self._metrics:
+            raise ValueError(f"metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name, help_text, labelnames=()):
+        return self._register(Counter(name, help_text, labelnames))
+
+    def gauge(self, name, help_text, labelnames=()):
+        return self._register(Gauge(name, help_text, labelnames))
+
+    def histogram(self, name, help_text, labelnames=(), buckets=DEFAULT_BUCKETS):
+        return self._register(Histogram(name, help_text, labelnames, buckets))
+
+    def render(self):
+        """Return every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+RIOT_REQUEST_SECONDS = REGISTRY.histogram(
+    "livelol_riot_request_seconds",
+    "Riot API request latency by endpoint, routing host and status.",
+    ("endpoint", "region", "status"),
+)
+RIOT_RATE_LIMIT_REMAINING = REGISTRY.gauge(
+    "livelol_riot_rate_limit_remaining",
+    "Requests left in each app rate-limit window, as of the latest Riot response.",
+    ("region", "window_seconds"),
+)
+STORAGE_OP_SECONDS = REGISTRY.histogram(
+    "livelol_storage_op_seconds",
+    "Storage backend call latency by backend and method.",
+    ("backend", "method"),
+)
+STORAGE_OP_ERRORS = REGISTRY.counter(
+    "livelol_storage_op_errors_total",
+    "Storage backend calls that raised, by backend and method.",
+    ("backend", "method"),
+)
+CYCLE_SECONDS = REGISTRY.histogram(
+    "livelol_cycle_seconds",
+    "Background update cycle duration.",
+    buckets=(1, 5, 15, 30, 60, 120, 300, 600, 1200),
+)
+CYCLE_PLAYERS = REGISTRY.counter(
+    "livelol_cycle_players_total",
+    "Players handled by background cycles, by outcome (processed or skipped).",
+    ("outcome",),
+)
+DISCORD_SEND_SECONDS = REGISTRY.histogram(
+    "livelol_discord_send_seconds",
+    "Discord message send and edit latency by kind.",
+    ("kind",),
+)
+EVENT_LOOP_LAG_SECONDS = REGISTRY.histogram(
+    "livelol_event_loop_lag_seconds",
+    "How late the event loop ran the loop watchdog's tick.",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+EVENT_LOOP_LAG_QUANTILES = REGISTRY.gauge(
+    "livelol_event_loop_lag_quantile_seconds",
+    "Event loop lag percentiles over the last minute of watchdog ticks.",
+    ("quantile",),
+)
+EVENT_LOOP_STALLS = REGISTRY.counter(
+    "livelol_event_loop_stalls_total",
+    "Event loop stalls past the watchdog threshold, by blocking code site.",
+    ("site",),
+)
+LOG_RECORDS_DROPPED = REGISTRY.counter(
+    "livelol_log_records_dropped_total",
+    "Log records dropped because the LOG_ASYNC stdout queue was full.",
+)
@@ -1,7 +1,12 @@
 import asyncio
+import time
+import urllib.parse
+from collections.abc import Mapping
 
 import aiohttp
+import sentry_sdk
 
+from utils import json_codec
 from utils.exceptions import (
     MatchNotFoundError,
     RateLimitError,
@@ -10,16 +15,89 @@ from utils.exceptions import (
     UserNotFoundError,
 )
 from utils.logger_config import logger
+from utils.match_projection import decode_match
+from utils.metrics import RIOT_RATE_LIMIT_REMAINING, RIOT_REQUEST_SECONDS
+
+# routing host -> {window seconds: requests left}, from the latest response's
+# X-App-Rate-Limit headers. Served by /healthz (cogs/metrics.py).
+rate_limit_headroom = {}
 
 # Core API Function
 
 
-async def call_riot_api(session, url, headers, response_origin="americas", retries=3):
+def _record_rate_limit(host, headers):
+    """Store how many requests the app has left in each Riot rate-limit window."""
+    if not isinstance(headers, Mapping):
+        return
+    limits = headers.get("X-App-Rate-Limit")
+    counts = headers.get("X-App-Rate-Limit-Count")
+    if not isinstance(limits, str) or not isinstance(counts, str):
+        return
+    try:
+        used = {
+            int(window): int(count)
+            for count, _, window in (pair.partition(":") for pair in counts.split(","))
+        }
+        headroom = {
+            int(window): int(limit) - used.get(int(window), 0)
+            for limit, _, window in (pair.partition(":") for pair in limits.split(","))
+        }
+    except ValueError:
+        return  # malformed headers are not worth failing the request over
+    for window, remaining in headroom.items():
+        RIOT_RATE_LIMIT_REMAINING.set(remaining, host, str(window))
+    rate_limit_headroom[host] = headroom
+
+
+def _endpoint_label(url):
+    """Return `(endpoint, routing host)` metric labels for a Riot url.
+
+    The endpoint keeps the path up to its resource plus a ``by-*`` lookup segment,
+    so ids, names and query strings never become label values.
+    """
+    parts = urllib.parse.urlsplit(url)
+    segments = parts.path.split("/")[:6]
+    if len(segments) == 6 and not segments[5].startswith("by-"):
+        segments = segments[:5]
+    return "/".join(segments), parts.hostname.split(".", 1)[0]
+
+
+async def call_riot_api(
+    session,
+    url,
+    headers,
+    response_origin="americas",
+    retries=3,
+    decode=None,
+):
+    """GET a Riot endpoint and return the decoded body (None on 404).
+
+    The body is read as bytes and decoded by `json_codec.loads` unless `decode`
+    is given, in which case it receives the raw bytes instead.
+    """
+    endpoint, host = _endpoint_label(url)
+    # One span per call, retries included, so a sampled trace shows Riot time.
+    with sentry_sdk.start_span(op="http.riot", name=f"GET {endpoint}") as span:
+        span.set_data("region", host)
+        return await _get_with_retries(
+            session, url, headers, response_origin, retries, decode, endpoint, host
+        )
+
+
+async def _get_with_retries(
+    session, url, headers, response_origin, retries, decode, endpoint, host
+):
+    decode = decode or json_codec.loads
     for _attempt in range(retries):
+        started = time.perf_counter()
         try:
             async with session.get(url, headers=headers) as response:
+                RIOT_REQUEST_SECONDS.observe(
+                    time.perf_counter() - started, endpoint, host, str(response.status)
+                )
+                _record_rate_limit(host, response.headers)
                 if response.status == 200:
-                    return await response.json()
+                    return decode(await response.read())
                 elif response.status == 429:
                     limit_type = response.headers.get("X-Rate-Limit-Type")
                     retry_after = int(response.headers.get("Retry-After", 1))
@@ -74,6 +152,9 @@ async def call_riot_api(session, url, headers, response_origin="americas", retri
                 else:
                     raise RiotAPIError(f"Riot API Error {response.status}: {url}")
         except aiohttp.ClientError as e:
+            RIOT_REQUEST_SECONDS.observe(
+                time.perf_counter() - started, endpoint, host, "error"
+            )
             raise RiotAPIError("Network Connection Failed") from e
     raise RateLimitError(f"Max retries exceeded for Riot API: {response}")
 
@@ -99,7 +180,12 @@ async def get_summoner_info(session, puuid, region, riot_api_key):
     return summoner_info
 
 
-async def get_recent_match_info(session, puuid, cluster, riot_api_key):
+async def get_recent_match_info(session, puuid, cluster, riot_api_key, projected=False):
+    """Return the player's most recent solo queue match DTO.
+
+    With `projected=True` the match body is decoded by `decode_match`, which keeps
+    only the fields the match pipeline reads instead of the full object tree.
+    """
     api_url = f"https://{cluster}.api.riotgames.com/lol/match/v5/matches/by-puuid/{puuid}/ids?queue=420&count=1"
     headers = {
         "X-Riot-Token": riot_api_key,
@@ -110,7 +196,8 @@ async def get_recent_match_info(session, puuid, cluster, riot_api_key):
     if match_id is None:
         raise MatchNotFoundError()
     api_url = f"https://{cluster}.api.riotgames.com/lol/match/v5/matches/{match_id[0]}"
-    match_info = await call_riot_api(session, api_url, headers, cluster)
+    decode = decode_match if projected else None
+    match_info = await call_riot_api(session, api_url, headers, cluster, decode=decode)
     if match_info is None:
         raise MatchNotFoundError()
     return match_info
@@ -0,0 +1,188 @@
+"""Transports that sit under `call_riot_api`.
+
+`call_riot_api` only needs `session.get(url, headers=...)` as an async context
+manager yielding a response with `status`, `headers` and `read()`. Anything with
+that shape can stand in for the aiohttp session, which is what these are:
+
+  * live   - the aiohttp session, optionally rebased onto another host
+             (e.g. the local stand-in server in `benchmarks/riot_server.py`)
+  * record - live, but every response (status, headers, body, latency) is also
+             appended to a fixture archive
+  * replay - answers from a fixture archive without touching the network
+
+The mode comes from `RIOT_TRANSPORT` (default `live`), the archive path from
+`RIOT_FIXTURE_ARCHIVE`, the rebase target from `RIOT_API_BASE`, and setting
+`RIOT_REPLAY_LATENCY=1` makes replay sleep for each recorded response time.
+
+Archive format: JSON lines, one recorded response per line, with the body stored
+as text (Riot bodies are UTF-8 JSON) so fixtures stay readable and diffable.
+Request headers are never recorded, so the archive holds no API key.
+"""
+
+import asyncio
+import contextlib
+import os
+import time
+from collections import defaultdict, deque
+from pathlib import Path
+from urllib.parse import urlsplit
+
+import aiohttp
+from multidict import CIMultiDict
+
+from utils import json_codec
+from utils.logger_config import logger
+
+RIOT_HOST_SUFFIX = ".api.riotgames.com"
+DEFAULT_ARCHIVE = "./benchmarks/fixtures/riot_archive.jsonl"
+TRANSPORT_MODES = ("live", "record", "replay")
+
+
+class RecordedResponse:
+    """A fully-read response, shaped like the parts of aiohttp's we use."""
+
+    def __init__(self, status: int, headers: dict, body: bytes) -> None:
+        self.status = status
+        self.headers = CIMultiDict(headers)
+        self._body = body
+
+    async def read(self) -> bytes:
+        return self._body
+
+    async def json(self):
+        return json_codec.loads(self._body)
+
+
+def rebase_url(url: str, base_url: str | None) -> str:
+    """Map `https://<routing>.api.riotgames.com/<path>` to `<base>/<routing>/<path>`.
+
+    Non-Riot URLs and an empty base are returned unchanged.
+    """
+    if not base_url:
+        return url
+    parts = urlsplit(url)
+    if not parts.hostname or not parts.hostname.endswith(RIOT_HOST_SUFFIX):
+        return url
+    routing = parts.hostname.removesuffix(RIOT_HOST_SUFFIX)
+    query = f"?{parts.query}" if parts.query else ""
+    return f"{base_url.rstrip('/')}/{routing}{parts.path}{query}"
+
+
+class FixtureArchive:
+    """Append-only JSON-lines store of recorded responses, keyed by URL."""
+
+    def __init__(self, path: str) -> None:
+        self.path = Path(path)
+
+    def append(
+        self,
+        url: str,
+        status: int,
+        headers: dict,
+        body: bytes,
+        elapsed_ms: float,
+    ) -> None:
+        entry = {
+            "url": url,
+            "status": status,
+            "headers": headers,
+            "body": body.decode("utf-8", errors="replace"),
+            "elapsed_ms": round(elapsed_ms, 1),
+        }
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self.path.open("ab") as fh:
+            fh.write(json_codec.dumps(entry) + b"\n")
+
+    def load(self) -> dict[str, list[dict]]:
+        """Return url -> recorded entries, in recording order."""
+        entries = defaultdict(list)
+        for line in self.path.read_bytes().splitlines():
+            if not line.strip():
+                continue
+            entry = json_codec.loads(line)
+            entry["body"] = entry["body"].encode("utf-8")
+            entries[entry["url"]].append(entry)
+        return dict(entries)
+
+
+class LiveTransport:
+    """Pass requests through to an aiohttp session, optionally rebased."""
+
+    def __init__(self, session, base_url: str | None = None) -> None:
+        self.session = session
+        self.base_url = base_url
+
+    def get(self, url, **kwargs):
+        return self.session.get(rebase_url(url, self.base_url), **kwargs)
+
+    async def close(self) -> None:
+        await self.session.close()
+
+
+class RecordingTransport(LiveTransport):
+    """A live transport that also appends every response to a fixture archive."""
+
+    def __init__(self, session, archive: FixtureArchive, base_url=None) -> None:
+        super().__init__(session, base_url)
+        self.archive = archive
+
+    @contextlib.asynccontextmanager
+    async def get(self, url, **kwargs):
+        started = time.perf_counter()
+        async with super().get(url, **kwargs) as response:
+            body = await response.read()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            headers = {str(name): value for name, value in response.headers.items()}
+            self.archive.append(url, response.status, headers, body, elapsed_ms)
+            yield RecordedResponse(response.status, headers, body)
+
+
+class ReplayTransport:
+    """Serve responses from a fixture archive; never touches the network.
+
+    Each URL replays its recorded responses in order and then keeps repeating
+    the last one, so a recorded 429 -> 200 retry sequence replays faithfully.
+    With `replay_latency`, each response is delayed by its recorded latency.
+    """
+
+    def __init__(self, archive: FixtureArchive, replay_latency: bool = False) -> None:
+        self.replay_latency = replay_latency
+        self._entries = {url: deque(entries) for url, entries in archive.load().items()}
+
+    @contextlib.asynccontextmanager
+    async def get(self, url, **_kwargs):
+        queued = self._entries.get(url)
+        if not queued:
+            raise LookupError(f"No recorded Riot response for {url}")
+        entry = queued.popleft() if len(queued) > 1 else queued[0]
+        if self.replay_latency:
+            await asyncio.sleep(entry["elapsed_ms"] / 1000)
+        yield RecordedResponse(entry["status"], entry["headers"], entry["body"])
+
+    async def close(self) -> None:
+        return None
+
+
+def build_riot_transport():
+    """Return the transport selected by `RIOT_TRANSPORT`.
+
+    Must be called with an event loop running: live and record modes open the
+    persistent aiohttp session here. Replay needs no session at all.
+    """
+    mode = os.getenv("RIOT_TRANSPORT", "live").lower()
+    base_url = os.getenv("RIOT_API_BASE")
+    archive = FixtureArchive(os.getenv("RIOT_FIXTURE_ARCHIVE", DEFAULT_ARCHIVE))
+    if mode not in TRANSPORT_MODES:
+        logger.warning(f"⚠️ Unknown RIOT_TRANSPORT '{mode}', using live.")
+        mode = "live"
+    if mode == "replay":
+        logger.info(f"📼 Replaying Riot responses from {archive.path}")
+        replay_latency = os.getenv("RIOT_REPLAY_LATENCY") == "1"
+        return ReplayTransport(archive, replay_latency=replay_latency)
+    session = aiohttp.ClientSession()
+    if base_url:
+        logger.info(f"🔀 Riot API rebased onto {base_url}")
+    if mode == "record":
+        logger.info(f"🎙️ Recording Riot responses to {archive.path}")
+        return RecordingTransport(session, archive, base_url)
+    return LiveTransport(session, base_url)
@@ -1,11 +1,112 @@
+"""Sentry setup: error capture plus sampled performance traces.
+
+Traces are sampled per operation. The bot opens two kinds of transaction - one
+per background cycle (op ``cycle``, cogs/background.py) and one per command (op
+``command``, bot.py) - with spans inside for each Riot call, storage method and
+Discord send, except that players run by the update engine get one span each
+(utils/update_engine.py). Both are recorded in full (a cycle runs every ten
+minutes and commands are rare), and `before_send_transaction` decides which ones
+to ship: every slow or errored trace, plus TRACE_SAMPLE_RATES of the rest. Any
+other transaction is head-sampled at DEFAULT_TRACE_RATE.
+
+Rates can be overridden with SENTRY_TRACE_RATES, e.g. ``cycle=0.5,command=1``.
+Profiling is decided when a transaction starts, so most profiles of tail-sampled
+ops would be thrown away with their trace: those are not profiled unless
+SENTRY_TAIL_PROFILES_SAMPLE_RATE says so, and SENTRY_PROFILES_SAMPLE_RATE covers
+the rest.
+
+A cycle's trace holds about two spans per tracked player (the player and its
+post), so the SDK's span cap is raised to MAX_TRACE_SPANS; spans past it are
+dropped.
+"""
+
 import logging
 import os
+import random
+from datetime import datetime
 
 import sentry_sdk
 from sentry_sdk.integrations.logging import LoggingIntegration
 
+from utils.constants import BACKGROUND_CYCLE_SECONDS
+
 logger = logging.getLogger(__name__)
 
+# op -> share of ordinary (fast, successful) transactions that are sent.
+TRACE_SAMPLE_RATES = {"cycle": 0.1, "command": 0.25}
+# op -> duration in seconds past which a transaction is always sent.
+SLOW_TRACE_SECONDS = {"cycle": BACKGROUND_CYCLE_SECONDS / 2, "command": 2.0}
+DEFAULT_TRACE_RATE = 0.0
+DEFAULT_PROFILES_SAMPLE_RATE = 0.1
+TAIL_PROFILES_SAMPLE_RATE = 0.0
+# Room for a cycle over ~2,500 players; the SDK default is 1,000.
+MAX_TRACE_SPANS = 5000
+
+
+def parse_trace_rates(value):
+    """Return TRACE_SAMPLE_RATES overridden by an ``op=rate,...`` string."""
+    rates = dict(TRACE_SAMPLE_RATES)
+    for pair in (value or "").split(","):
+        op, sep, rate = pair.partition("=")
+        if not sep:
+            continue
+        try:
+            rates[op.strip()] = min(1.0, max(0.0, float(rate)))
+        except ValueError:
+            logger.warning(f"⚠️ Ignoring bad SENTRY_TRACE_RATES entry {pair!r}")
+    return rates
+
+
+def traces_sampler(sampling_context):
+    """Record tail-sampled ops in full; head-sample everything else."""
+    parent_sampled = sampling_context.get("parent_sampled")
+    if parent_sampled is not None:
+        return float(parent_sampled)
+    op = sampling_context.get("transaction_context", {}).get("op")
+    return 1.0 if op in SLOW_TRACE_SECONDS else DEFAULT_TRACE_RATE
+
+
+def make_profiles_sampler(rate, tail_rate):
+    """Return the profiles sampler: `tail_rate` for tail-sampled ops, else `rate`."""
+
+    def profiles_sampler(sampling_context):
+        op = sampling_context.get("transaction_context", {}).get("op")
+        return tail_rate if op in SLOW_TRACE_SECONDS else rate
+
+    return profiles_sampler
+
+
+def _seconds(value):
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, str):
+        return datetime.fromisoformat(value.replace("Z", "+00:00")).timestamp()
+    return float(value)
+
+
+def _errored(event):
+    statuses = [event.get("contexts", {}).get("trace", {}).get("status")]
+    statuses.extend(span.get("status") for span in event.get("spans", ()))
+    return any(status not in (None, "ok") for status in statuses)
+
+
+def make_before_send_transaction(rates):
+    """Return the hook that keeps slow and errored traces and samples the rest."""
+
+    def before_send_transaction(event, _hint):
+        op = event.get("contexts", {}).get("trace", {}).get("op")
+        slow_after = SLOW_TRACE_SECONDS.get(op)
+        if slow_after is None:
+            return event  # head-sampled by traces_sampler already
+        if _errored(event):
+            return event
+        duration = _seconds(event["timestamp"]) - _seconds(event["start_timestamp"])
+        if duration >= slow_after:
+            return event
+        return event if random.random() < rates.get(op, DEFAULT_TRACE_RATE) else None
+
+    return before_send_transaction
+
 
 def setup_sentry():
     if sentry_sdk.Hub.current.client:
@@ -20,11 +121,21 @@ def setup_sentry():
         event_level=logging.ERROR,
     )
     try:
+        profiles_rate = float(
+            os.getenv("SENTRY_PROFILES_SAMPLE_RATE", DEFAULT_PROFILES_SAMPLE_RATE)
+        )
+        tail_profiles_rate = float(
+            os.getenv("SENTRY_TAIL_PROFILES_SAMPLE_RATE", TAIL_PROFILES_SAMPLE_RATE)
+        )
         sentry_sdk.init(
             dsn=dsn,
             integrations=[sentry_logging],
-            traces_sample_rate=1.0,
-            profiles_sample_rate=1.0,
+            traces_sampler=traces_sampler,
+            before_send_transaction=make_before_send_transaction(
+                parse_trace_rates(os.getenv("SENTRY_TRACE_RATES"))
+            ),
+            profiles_sampler=make_profiles_sampler(profiles_rate, tail_profiles_rate),
+            _experiments={"max_spans": MAX_TRACE_SPANS},
             send_default_pii=True,
             attach_stacktrace=True,
             environment=current_env,
@@ -0,0 +1,100 @@
+"""Fold error storms into counted events before they reach the sink queue.
+
+When a Riot shard goes down the same call site logs the same error hundreds of
+times a minute. `FingerprintAggregator` sits in front of the sender queue: per
+fingerprint and per window, the first `rate_cap` occurrences go out as normal
+events, and every later one only bumps a counter. When the window closes, the
+folded occurrences go out as ONE event built from the first folded record, with
+``count`` (occurrences folded), ``first_ts`` and ``last_ts`` added.
+
+A folded occurrence costs a dict lookup under a lock - no event is built, no
+uuid drawn, nothing queued - so sink traffic, CPU and journal growth stay
+bounded by (fingerprints x rate_cap) per window however loud the incident is.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from collections.abc import Callable
+
+AGGREGATE_WINDOW_SECONDS = 60.0
+FINGERPRINT_RATE_CAP = 5  # events per fingerprint per window sent individually
+
+
+class _Window:
+    __slots__ = ("start", "sent", "folded", "template", "last_ts")
+
+    def __init__(self, start: float) -> None:
+        self.start = start
+        self.sent = 0
+        self.folded = 0
+        self.template: dict | None = None
+        self.last_ts: str | None = None
+
+    def summary(self) -> dict:
+        return {
+            **self.template,
+            "count": self.folded,
+            "first_ts": self.template["ts"],
+            "last_ts": self.last_ts,
+        }
+
+
+class FingerprintAggregator:
+    """Per-fingerprint rate cap that folds the excess of each window into one event.
+
+    Thread-safe: `offer` runs on whichever thread logged, `expired` on the sender.
+    """
+
+    def __init__(
+        self,
+        window: float = AGGREGATE_WINDOW_SECONDS,
+        rate_cap: int = FINGERPRINT_RATE_CAP,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.window = window
+        self.rate_cap = rate_cap
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._windows: dict[str, _Window] = {}
+        self._closed: list[dict] = []
+
+    def offer(
+        self, fingerprint: str, ts: str, build: Callable[[], dict]
+    ) -> dict | None:
+        """Count one occurrence; return the event to send now, or None if folded.
+
+        `build` makes the event and is only called when one is needed: for an
+        occurrence under the cap, and once per window for the folded summary.
+        `ts` is the occurrence's ISO timestamp.
+        """
+        with self._lock:
+            now = self._clock()
+            window = self._windows.get(fingerprint)
+            if window is None or now - window.start >= self.window:
+                if window is not None and window.folded:
+                    self._closed.append(window.summary())
+                window = self._windows[fingerprint] = _Window(now)
+            if window.sent < self.rate_cap:
+                window.sent += 1
+                folded = False
+            else:
+                window.folded += 1
+                window.last_ts = ts
+                folded = True
+                if window.template is None:
+                    window.template = build()
+        return None if folded else build()
+
+    def expired(self) -> list[dict]:
+        """Return the summary events of every window that has closed since last call."""
+        with self._lock:
+            now = self._clock()
+            summaries, self._closed = self._closed, []
+            for fingerprint, window in list(self._windows.items()):
+                if now - window.start >= self.window:
+                    del self._windows[fingerprint]
+                    if window.folded:
+                        summaries.append(window.summary())
+        return summaries
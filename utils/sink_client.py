@@ -1,30 +1,42 @@
 """Owned error-sink client.
 
 A vendored, minimal implementation of the error-sink HTTP contract (`POST /events`
-with bearer auth; one JSON event or a batch). Stdlib only - no new dependency.
+with bearer auth; one JSON event or a batch). Batches are gzip-compressed and sent over
+one kept-alive `http.client` connection, so a burst of errors costs no new TCP/TLS
+handshakes. Stdlib only - no new dependency; JSON
+goes through `utils/json_codec.py`, which picks up orjson if it happens to be installed.
 
 Two invariants this file guarantees:
   1. `capture()` never raises - an observability failure must not become an app failure.
-  2. No event is lost while the sink is down - it is buffered to an append-only file and
-     replayed on the next successful send; the server dedups by `id`, so replay is safe.
+  2. No event is lost while the sink is down - it is buffered to an append-only journal
+     (utils/sink_journal.py) and replayed on the next successful send; the server dedups
+     by `id`, so replay is safe. Past BUFFER_MAX_LINES the oldest segment is dropped.
 """
 
 from __future__ import annotations
 
 import contextlib
-import json
+import gzip
+import http.client
 import urllib.error
-import urllib.request
+import urllib.parse
 import uuid
 from datetime import UTC, datetime
 from pathlib import Path
 
+from utils import json_codec
+from utils.sink_journal import SinkJournal
+
 BATCH_MAX = 500  # server cap per request
 BUFFER_MAX_LINES = 10_000  # bound the offline buffer; drop oldest past this
 
 
-def _now_iso() -> str:
-    return datetime.now(UTC).isoformat(timespec="seconds").replace("+00:00", "Z")
+def iso_timestamp(seconds: float | None = None) -> str:
+    """Return the sink's UTC timestamp for epoch `seconds`, or for now."""
+    moment = (
+        datetime.now(UTC) if seconds is None else datetime.fromtimestamp(seconds, UTC)
+    )
+    return moment.isoformat(timespec="seconds").replace("+00:00", "Z")
 
 
 class SinkClient:
@@ -35,14 +47,19 @@ class SinkClient:
         base_url: str,
         token: str,
         project: str,
-        buffer_path: str = "./.errors/buffer.jsonl",
+        journal_dir: str = "./.errors/journal",
         timeout: float = 3.0,
     ) -> None:
         self.base_url = base_url.rstrip("/")
         self.token = token
         self.project = project
-        self.buffer_path = Path(buffer_path)
+        self.journal = SinkJournal(journal_dir, BUFFER_MAX_LINES)
+        self.quarantine_path = self.journal.root / "quarantine.jsonl"
         self.timeout = timeout
+        self._conn: http.client.HTTPConnection | None = None
+        # Events the sink accepted since startup, live or replayed.
+        self.sent = 0
+        self._import_legacy_buffer(self.journal.root.parent / "buffer.jsonl")
 
     def build_event(
         self,
@@ -56,7 +73,7 @@ class SinkClient:
         return {
             "id": str(uuid.uuid4()),  # idempotency key; dedups on replay
             "project": self.project,
-            "ts": _now_iso(),
+            "ts": iso_timestamp(),
             "release": None,
             "type": type_,
             "message": message,
@@ -67,74 +84,131 @@ class SinkClient:
 
     def capture(self, event: dict) -> None:
         """Send one event; on any failure buffer it. Never raises."""
+        self.capture_batch([event])
+
+    def capture_batch(self, events: list[dict]) -> None:
+        """Send up to BATCH_MAX events in one request; on failure buffer them all.
+
+        Never raises.
+        """
         try:
-            self.flush()  # opportunistic backfill before the next send
-            self._post([event])
+            self._post(events)
         except Exception:
+            self.buffer(events)
+            return
+        self.sent += len(events)
+        # the sink is reachable: backfill anything buffered. The journal knows its
+        # length, so the common empty case costs nothing, and while the sink is down
+        # a capture costs one failed POST and the journal appends.
+        if len(self.journal):
             with contextlib.suppress(Exception):
-                self._buffer(event)
+                self.flush()
 
     def flush(self) -> int:
-        """Drain the buffer to the sink in batches; return the number replayed."""
-        if not self.buffer_path.exists():
-            return 0
-        lines = self.buffer_path.read_text(encoding="utf-8").splitlines()
-        events: list[dict] = []
-        corrupt: list[str] = []
-        for ln in lines:
-            if not ln.strip():
-                continue
-            try:
-                parsed = json.loads(ln)
-            except ValueError:
-                # one bad line must not wedge the whole drain; set it aside
-                corrupt.append(ln)
-                continue
-            if isinstance(parsed, dict):
-                events.append(parsed)
-            else:
-                # valid JSON but not an event object (e.g. "42") - the server would
-                # reject it and wedge the drain, so it goes to quarantine too
-                corrupt.append(ln)
-        if not events and not corrupt:
-            return 0
-        for start in range(0, len(events), BATCH_MAX):
-            self._post(events[start : start + BATCH_MAX])
-        # every batch accepted -> safe to clear (the server dedups replays anyway);
-        # corrupt lines move to a sidecar file so they stay inspectable, not lost
-        if corrupt:
-            quarantine = self.buffer_path.with_suffix(".quarantine.jsonl")
-            with quarantine.open("a", encoding="utf-8") as fh:
-                fh.write("\n".join(corrupt) + "\n")
-        self.buffer_path.write_text("", encoding="utf-8")
-        return len(events)
+        """Drain the journal to the sink in batches; return the number replayed.
+
+        The checkpoint advances after every accepted batch, so a failure part way
+        through keeps what was sent and the next drain resumes from there.
+        """
+        replayed = 0
+        while True:
+            lines, size = self.journal.peek(BATCH_MAX)
+            if not lines:
+                return replayed
+            events: list[dict] = []
+            corrupt: list[bytes] = []
+            for ln in lines:
+                if not ln.strip():
+                    continue
+                try:
+                    parsed = json_codec.loads(ln)
+                except ValueError:
+                    # one bad line must not wedge the whole drain; set it aside
+                    corrupt.append(ln)
+                    continue
+                if isinstance(parsed, dict):
+                    events.append(parsed)
+                else:
+                    # valid JSON but not an event object (e.g. "42") - the server
+                    # would reject it and wedge the drain, so it goes to quarantine
+                    corrupt.append(ln)
+            if events:
+                self._post(events)
+                self.sent += len(events)
+            # batch accepted -> move past it (the server dedups replays anyway);
+            # corrupt lines move to a sidecar file so they stay inspectable, not lost
+            if corrupt:
+                with self.quarantine_path.open("ab") as fh:
+                    fh.write(b"\n".join(corrupt) + b"\n")
+            self.journal.consume(len(lines), size)
+            replayed += len(events)
 
     def _post(self, events: list[dict]) -> None:
-        body = json.dumps(events).encode("utf-8")
-        req = urllib.request.Request(
-            f"{self.base_url}/events",
-            data=body,
-            method="POST",
-            headers={
-                "Content-Type": "application/json",
-                "Authorization": f"Bearer {self.token}",
-            },
-        )
-        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
-            if resp.status // 100 != 2:
-                raise urllib.error.HTTPError(
-                    resp.url, resp.status, "non-2xx", resp.headers, None
+        body = gzip.compress(json_codec.dumps(events), compresslevel=6)
+        headers = {
+            "Content-Type": "application/json",
+            "Content-Encoding": "gzip",
+            "Authorization": f"Bearer {self.token}",
+        }
+        parts = urllib.parse.urlsplit(self.base_url)
+        path = f"{parts.path}/events"
+        # A kept-alive connection the server has since closed fails on first use;
+        # retry that once on a fresh connection, but never a fresh one that failed.
+        reused = self._conn is not None
+        try:
+            resp = self._request(path, body, headers)
+        except (http.client.HTTPException, OSError):
+            self._close()
+            if not reused:
+                raise
+            resp = self._request(path, body, headers)
+        if resp.status // 100 != 2:
+            raise urllib.error.HTTPError(
+                f"{self.base_url}/events", resp.status, "non-2xx", resp.headers, None
+            )
+
+    def _request(
+        self, path: str, body: bytes, headers: dict
+    ) -> http.client.HTTPResponse:
+        if self._conn is None:
+            parts = urllib.parse.urlsplit(self.base_url)
+            if parts.scheme == "https":
+                self._conn = http.client.HTTPSConnection(
+                    parts.netloc, timeout=self.timeout
                 )
-
-    def _buffer(self, event: dict) -> None:
-        self.buffer_path.parent.mkdir(parents=True, exist_ok=True)
-        with self.buffer_path.open("a", encoding="utf-8") as fh:
-            fh.write(json.dumps(event) + "\n")
-        self._enforce_bound()
-
-    def _enforce_bound(self) -> None:
-        lines = self.buffer_path.read_text(encoding="utf-8").splitlines()
-        if len(lines) <= BUFFER_MAX_LINES:
+            else:
+                self._conn = http.client.HTTPConnection(
+                    parts.netloc, timeout=self.timeout
+                )
+        try:
+            self._conn.request("POST", path, body=body, headers=headers)
+            resp = self._conn.getresponse()
+            resp.read()  # drain the body so the connection can carry the next request
+        except BaseException:
+            self._close()
+            raise
+        if resp.will_close:
+            self._close()
+        return resp
+
+    def _close(self) -> None:
+        if self._conn is not None:
+            with contextlib.suppress(Exception):
+                self._conn.close()
+            self._conn = None
+
+    def buffer(self, events: list[dict]) -> None:
+        """Append events to the journal for a later drain. Never raises."""
+        with contextlib.suppress(Exception):
+            for event in events:
+                self.journal.append(json_codec.dumps(event))
+
+    def _import_legacy_buffer(self, path: Path) -> None:
+        """Move events left in the pre-journal single-file buffer into the journal."""
+        if not path.is_file():
             return
-        keep = lines[-BUFFER_MAX_LINES:]
-        self.buffer_path.write_text("\n".join(keep) + "\n", encoding="utf-8")
+        with contextlib.suppress(Exception):
+            for ln in path.read_bytes().splitlines():
+                if ln.strip():
+                    self.journal.append(ln)
+            path.unlink()
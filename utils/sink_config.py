@@ -6,9 +6,20 @@ capture the same events (dual-run; Sentry is cut last).
 Threading: the event is BUILT on the logging thread (inside `emit`), where the
 record's `exc_info` is still intact, and only the finished event is handed to a
 background sender thread that does the blocking POST. The blocking I/O must never run
-on the Discord event loop. (Note: a stdlib QueueHandler cannot be used in front of the
-sink handler - QueueHandler.prepare() clears `record.exc_info`, which would erase the
-exception type and the handled flag before this handler ever sees them.)
+on the Discord event loop. The sender gathers events for SEND_LINGER_SECONDS (or up to
+BATCH_MAX) and posts each gathering as one request. (Note: a stdlib QueueHandler cannot
+be used in front of the sink handler - QueueHandler.prepare() clears `record.exc_info`,
+which would erase the exception type and the handled flag before this handler ever
+sees them.)
+
+Error storms are folded before the queue: a `FingerprintAggregator`
+(utils/sink_aggregator.py) lets the first few events per fingerprint per window through
+and sends the rest as one counted event when the window closes. The cap can be tuned
+with SINK_FINGERPRINT_RATE_CAP.
+
+The queue itself is a bounded `SinkQueue` (utils/sink_queue.py): SINK_QUEUE_MAX events
+at most, and SINK_QUEUE_POLICY (drop_oldest, drop_newest or spill) decides what happens
+past that. `sink_stats()` reports its counters for the heartbeat doc.
 
 Fault semantics for the incident pipeline: a record carrying exception info is emitted
 as UNHANDLED (a real fault the incident poller should surface as a TODO finding); a
@@ -22,26 +33,39 @@ import logging
 import os
 import queue
 import threading
+import time
 
-from utils.sink_client import SinkClient
+from utils.sink_aggregator import FINGERPRINT_RATE_CAP, FingerprintAggregator
+from utils.sink_client import BATCH_MAX, SinkClient, iso_timestamp
+from utils.sink_queue import OVERFLOW_POLICIES, QUEUE_MAX_EVENTS, SinkQueue
 
 # The sink identity MUST match what the incident poller queries: the fleet directory
 # name, which is `livelol` (not the legacy `leaguehelper` that scripts/health.sh still
 # uses). Emit under the wrong name and the poller sees nothing.
 SINK_PROJECT = "livelol"
+# How long the sender waits for more events to share a request with the first.
+SEND_LINGER_SECONDS = 0.5
 
 logger = logging.getLogger(__name__)
 
 _worker: threading.Thread | None = None
+_queue: SinkQueue | None = None
+_client: SinkClient | None = None
 
 
 class SinkLoggingHandler(logging.Handler):
     """Build a sink event from each ERROR record and enqueue it for the sender."""
 
-    def __init__(self, event_queue: queue.SimpleQueue, client: SinkClient) -> None:
+    def __init__(
+        self,
+        event_queue: SinkQueue,
+        client: SinkClient,
+        aggregator: FingerprintAggregator | None = None,
+    ) -> None:
         super().__init__(level=logging.ERROR)
         self._queue = event_queue
         self._client = client
+        self._aggregator = aggregator
 
     def emit(self, record: logging.LogRecord) -> None:
         """Build the event here (exc_info is valid on this thread) and enqueue it.
@@ -56,22 +80,98 @@ class SinkLoggingHandler(logging.Handler):
             # Call-site fingerprint so distinct faults stay distinct even when their
             # messages differ only in ids/paths (which the server would otherwise fold).
             fingerprint = f"{record.module}:{record.funcName}:{type_}"
-            event = self._client.build_event(
-                type_,
-                record.getMessage(),
-                handled=record.exc_info is None,
-                fingerprint=fingerprint,
-            )
-            self._queue.put(event)
+
+            def build() -> dict:
+                return self._client.build_event(
+                    type_,
+                    record.getMessage(),
+                    handled=record.exc_info is None,
+                    fingerprint=fingerprint,
+                )
+
+            if self._aggregator is None:
+                event = build()
+            else:
+                ts = iso_timestamp(record.created)
+                event = self._aggregator.offer(fingerprint, ts, build)
+            if event is not None:
+                self._queue.put(event)
         except Exception:
             self.handleError(record)
 
 
-def _sender_loop(event_queue: queue.SimpleQueue, client: SinkClient) -> None:
-    """Drain built events and POST them off the event loop; capture never raises."""
+def _next_batch(
+    event_queue: SinkQueue,
+    linger: float = SEND_LINGER_SECONDS,
+    max_events: int = BATCH_MAX,
+    aggregator: FingerprintAggregator | None = None,
+) -> list[dict]:
+    """Block for one event, then keep collecting for `linger` seconds or `max_events`.
+
+    A lone error goes out `linger` seconds late; an error storm goes out as a few
+    full batches instead of one request per event. With an `aggregator` the wait
+    gives up after one window, and the summaries of closed windows are appended, so
+    the result can be empty or slightly over `max_events`.
+    """
+    try:
+        batch = [event_queue.get(timeout=aggregator.window if aggregator else None)]
+    except queue.Empty:
+        return aggregator.expired()
+    deadline = time.monotonic() + linger
+    while len(batch) < max_events:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            break
+        try:
+            batch.append(event_queue.get(timeout=remaining))
+        except queue.Empty:
+            break
+    if aggregator is not None:
+        batch.extend(aggregator.expired())
+    return batch
+
+
+def _sender_loop(
+    event_queue: SinkQueue,
+    client: SinkClient,
+    aggregator: FingerprintAggregator | None = None,
+) -> None:
+    """Drain built events in batches and POST them off the event loop.
+
+    capture_batch never raises.
+    """
     while True:
-        event = event_queue.get()
-        client.capture(event)
+        batch = _next_batch(event_queue, aggregator=aggregator)
+        for start in range(0, len(batch), BATCH_MAX):
+            client.capture_batch(batch[start : start + BATCH_MAX])
+
+
+def sink_stats(
+    event_queue: SinkQueue | None = None, client: SinkClient | None = None
+) -> dict | None:
+    """Return the sink's delivery counters, or None when the sink is not set up.
+
+    Defaults to the queue and client `setup_sink` created. Counts run since startup:
+    `enqueued` into the queue, `dropped` by the queue policy or the journal bound,
+    `spilled` past the queue to the journal, `buffered` into the journal (spills
+    included) and `sent` to the sink (replays included). `depth` and `journal_depth`
+    are what waits right now.
+    """
+    if event_queue is None:
+        event_queue = _queue
+    if client is None:
+        client = _client
+    if event_queue is None or client is None:
+        return None
+    return {
+        "enqueued": event_queue.enqueued,
+        "dropped": event_queue.dropped + client.journal.dropped,
+        "spilled": event_queue.spilled,
+        "buffered": client.journal.appended,
+        "sent": client.sent,
+        "depth": len(event_queue),
+        "journal_depth": len(client.journal),
+    }
 
 
 def setup_sink() -> SinkClient | None:
@@ -79,7 +179,7 @@ def setup_sink() -> SinkClient | None:
 
     No-op when SINK_URL / SINK_TOKEN are absent, mirroring the Sentry DSN-absent path.
     """
-    global _worker
+    global _worker, _queue, _client
     url = os.getenv("SINK_URL")
     token = os.getenv("SINK_TOKEN")
     if not url or not token:
@@ -89,16 +189,28 @@ def setup_sink() -> SinkClient | None:
         return None  # already initialized
 
     client = SinkClient(base_url=url, token=token, project=SINK_PROJECT)
-    event_queue: queue.SimpleQueue = queue.SimpleQueue()
+    policy = os.getenv("SINK_QUEUE_POLICY", "drop_oldest")
+    if policy not in OVERFLOW_POLICIES:
+        logger.warning(f"⚠️ Unknown SINK_QUEUE_POLICY {policy!r}; using drop_oldest.")
+        policy = "drop_oldest"
+    event_queue = SinkQueue(
+        maxsize=int(os.getenv("SINK_QUEUE_MAX", QUEUE_MAX_EVENTS)),
+        policy=policy,
+        spill=client.buffer,
+    )
+    aggregator = FingerprintAggregator(
+        rate_cap=int(os.getenv("SINK_FINGERPRINT_RATE_CAP", FINGERPRINT_RATE_CAP))
+    )
 
     _worker = threading.Thread(
         target=_sender_loop,
-        args=(event_queue, client),
+        args=(event_queue, client, aggregator),
         name="sink-sender",
         daemon=True,
     )
     _worker.start()
+    _queue, _client = event_queue, client
 
-    logging.getLogger().addHandler(SinkLoggingHandler(event_queue, client))
+    logging.getLogger().addHandler(SinkLoggingHandler(event_queue, client, aggregator))
     logger.info("✅ Error sink emission initialized.")
     return client
@@ -0,0 +1,213 @@
+"""Segmented append-only journal behind the sink client's offline buffer.
+
+Buffered events are JSON lines spread over numbered segment files in one
+directory (``00000001.jsonl``, ``00000002.jsonl``, ...), next to a small
+``index.json``:
+
+    {"head": [segment, byte_offset, lines_consumed], "counts": {"1": 1000}}
+
+``head`` is the drain checkpoint - the first unsent line - and ``counts`` holds
+the line count of every sealed segment. Nothing here ever reads the whole
+journal: an append opens the tail segment and writes one line, the bound drops
+the oldest segment file, and a drain reads at most one segment from the
+checkpoint and moves it forward after each accepted batch. Only opening an
+existing journal counts the lines of the unsealed tail segment, once.
+
+The sender thread drains; appends come from the sender and, when the sink queue
+spills, from logging threads. One lock serialises them, and a drain whose head
+segment the bound dropped mid-POST advances nothing.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import os
+import threading
+from pathlib import Path
+
+from utils import json_codec
+
+INDEX_NAME = "index.json"
+# The bound drops whole segments, so the journal is cut into about this many.
+SEGMENTS_PER_JOURNAL = 10
+
+
+def _segment_name(seq: int) -> str:
+    return f"{seq:08d}.jsonl"
+
+
+def _count_lines(path: Path) -> int:
+    with path.open("rb") as fh:
+        return sum(1 for _ in fh)
+
+
+class SinkJournal:
+    """Bounded FIFO of raw JSON lines, persisted as segments plus an index."""
+
+    def __init__(self, root: str | Path, max_lines: int) -> None:
+        self.root = Path(root)
+        self.max_lines = max_lines
+        self.segment_lines = max(1, max_lines // SEGMENTS_PER_JOURNAL)
+        # seq -> line count, oldest first; the last entry is the open tail.
+        self._counts: dict[int, int] = {}
+        # (segment, byte offset, lines consumed) of the first unsent line.
+        self._head = (0, 0, 0)
+        self._pending = 0
+        # Head segment of the last peek, to spot a drop while the batch was out.
+        self._peeked = 0
+        self._lock = threading.Lock()
+        # Lines appended and lines dropped by the bound, since startup.
+        self.appended = 0
+        self.dropped = 0
+        self._load()
+
+    def __len__(self) -> int:
+        """Return the number of lines not yet drained."""
+        return self._pending
+
+    # Persistence
+
+    def _path(self, seq: int) -> Path:
+        return self.root / _segment_name(seq)
+
+    def _load(self) -> None:
+        if not self.root.is_dir():
+            return
+        present = sorted(
+            int(path.stem) for path in self.root.glob("*.jsonl") if path.stem.isdigit()
+        )
+        if not present:
+            return
+        index = {}
+        with contextlib.suppress(OSError, ValueError):
+            index = json_codec.loads((self.root / INDEX_NAME).read_bytes())
+        counts = {int(seq): count for seq, count in index.get("counts", {}).items()}
+        for seq in present:
+            if seq == present[-1] or seq not in counts:
+                counts[seq] = _count_lines(self._path(seq))
+        self._counts = {seq: counts[seq] for seq in present}
+        head_seq, offset, consumed = index.get("head") or (present[0], 0, 0)
+        if head_seq not in self._counts:
+            head_seq, offset, consumed = present[0], 0, 0
+        for seq in present:
+            if seq >= head_seq:
+                break
+            # Fully drained before a crash, but not yet unlinked.
+            self._path(seq).unlink(missing_ok=True)
+            del self._counts[seq]
+        self._head = (head_seq, offset, consumed)
+        self._pending = sum(self._counts.values()) - consumed
+        self._terminate_tail()
+
+    def _terminate_tail(self) -> None:
+        # A crash mid-append can leave a partial last line; end it so the next
+        # append starts a line of its own (the fragment is quarantined on drain).
+        tail = self._path(self._tail())
+        with tail.open("rb") as fh:
+            fh.seek(0, os.SEEK_END)
+            if fh.tell() == 0:
+                return
+            fh.seek(-1, os.SEEK_END)
+            if fh.read(1) == b"\n":
+                return
+        with tail.open("ab") as fh:
+            fh.write(b"\n")
+
+    def _save_index(self) -> None:
+        index = {
+            "head": list(self._head),
+            "counts": {str(seq): count for seq, count in self._counts.items()},
+        }
+        tmp = self.root / f"{INDEX_NAME}.tmp"
+        tmp.write_bytes(json_codec.dumps(index))
+        os.replace(tmp, self.root / INDEX_NAME)
+
+    def _tail(self) -> int:
+        return next(reversed(self._counts))
+
+    # Writing
+
+    def append(self, line: bytes) -> None:
+        """Append one line, rolling to a new segment and enforcing the bound."""
+        with self._lock:
+            self._append(line)
+
+    def _append(self, line: bytes) -> None:
+        if not self._counts or self._counts[self._tail()] >= self.segment_lines:
+            self._roll()
+        tail = self._tail()
+        with self._path(tail).open("ab") as fh:
+            fh.write(line + b"\n")
+        self._counts[tail] += 1
+        self._pending += 1
+        self.appended += 1
+        while self._pending > self.max_lines and len(self._counts) > 1:
+            self._drop_oldest()
+
+    def _roll(self) -> None:
+        self.root.mkdir(parents=True, exist_ok=True)
+        seq = self._tail() + 1 if self._counts else 1
+        self._counts[seq] = 0
+        if len(self._counts) == 1:
+            self._head = (seq, 0, 0)
+        self._save_index()
+
+    def _drop_oldest(self) -> None:
+        seq, _offset, consumed = self._head
+        lost = self._counts.pop(seq) - consumed
+        self._pending -= lost
+        self.dropped += lost
+        self._path(seq).unlink(missing_ok=True)
+        self._head = (next(iter(self._counts)), 0, 0)
+        self._save_index()
+
+    # Draining
+
+    def peek(self, limit: int) -> tuple[list[bytes], int]:
+        """Return up to `limit` lines from the checkpoint and their size in bytes.
+
+        Lines come from the head segment only; `consume` then moves past them.
+        """
+        with self._lock:
+            return self._peek(limit)
+
+    def _peek(self, limit: int) -> tuple[list[bytes], int]:
+        if not self._pending:
+            return [], 0
+        seq, offset, consumed = self._head
+        if consumed >= self._counts[seq]:
+            return [], 0
+        self._peeked = seq
+        with self._path(seq).open("rb") as fh:
+            fh.seek(offset)
+            lines = []
+            size = 0
+            for raw in fh:
+                lines.append(raw.rstrip(b"\n"))
+                size += len(raw)
+                if len(lines) == limit:
+                    break
+        return lines, size
+
+    def consume(self, lines: int, size: int) -> None:
+        """Advance the checkpoint past lines returned by `peek` and persist it."""
+        with self._lock:
+            if self._head[0] == self._peeked:
+                self._consume(lines, size)
+
+    def _consume(self, lines: int, size: int) -> None:
+        seq, offset, consumed = self._head
+        consumed += lines
+        self._pending -= lines
+        if consumed < self._counts[seq]:
+            self._head = (seq, offset + size, consumed)
+        elif len(self._counts) > 1:
+            del self._counts[seq]
+            self._path(seq).unlink(missing_ok=True)
+            self._head = (next(iter(self._counts)), 0, 0)
+        else:
+            # Fully drained: start the next outage from a fresh segment.
+            del self._counts[seq]
+            self._path(seq).unlink(missing_ok=True)
+            self._head = (0, 0, 0)
+        self._save_index()
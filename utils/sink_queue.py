@@ -0,0 +1,90 @@
+"""Bounded hand-off between the logging threads and the sink sender thread.
+
+`SinkQueue` replaces the unbounded `queue.SimpleQueue`: when the sink is slow and
+errors keep coming, at most `maxsize` built events wait in memory, and the overflow
+policy decides what gives:
+
+- ``drop_oldest``: discard the longest-waiting event to make room (the default;
+  the newest errors describe the current state of an incident).
+- ``drop_newest``: discard the incoming event.
+- ``spill``: write the incoming event straight to the disk journal. Nothing is
+  lost until the journal's own bound, but the logging thread pays the append.
+
+Counters (`enqueued`, `dropped`, `spilled`) and `len()` feed the heartbeat doc.
+"""
+
+from __future__ import annotations
+
+import queue
+import threading
+from collections import deque
+from collections.abc import Callable
+
+QUEUE_MAX_EVENTS = 2_000  # four full batches
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "spill")
+
+
+class SinkQueue:
+    """Thread-safe bounded FIFO of events with an overflow policy.
+
+    Speaks the subset of the `queue.SimpleQueue` API the sender uses.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = QUEUE_MAX_EVENTS,
+        policy: str = "drop_oldest",
+        spill: Callable[[list[dict]], None] | None = None,
+    ) -> None:
+        if policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"unknown sink queue policy {policy!r}")
+        if policy == "spill" and spill is None:
+            raise ValueError("the spill policy needs a spill callable")
+        self.maxsize = maxsize
+        self.policy = policy
+        self._spill = spill
+        self._events: deque[dict] = deque()
+        self._not_empty = threading.Condition()
+        self.enqueued = 0
+        self.dropped = 0
+        self.spilled = 0
+
+    def __len__(self) -> int:
+        """Return the number of events waiting for the sender."""
+        return len(self._events)
+
+    def empty(self) -> bool:
+        return not self._events
+
+    def put(self, event: dict) -> None:
+        """Add one event without blocking, applying the policy when full."""
+        with self._not_empty:
+            if len(self._events) < self.maxsize:
+                self._append(event)
+                return
+            if self.policy == "drop_newest":
+                self.dropped += 1
+                return
+            if self.policy == "drop_oldest":
+                self._events.popleft()
+                self.dropped += 1
+                self._append(event)
+                return
+            self.spilled += 1
+        # Spill outside the lock so the sender can keep draining meanwhile.
+        self._spill([event])
+
+    def _append(self, event: dict) -> None:
+        self._events.append(event)
+        self.enqueued += 1
+        self._not_empty.notify()
+
+    def get(self, timeout: float | None = None) -> dict:
+        """Remove and return the oldest event; raise `queue.Empty` on timeout."""
+        with self._not_empty:
+            if not self._not_empty.wait_for(lambda: self._events, timeout):
+                raise queue.Empty
+            return self._events.popleft()
+
+    def get_nowait(self) -> dict:
+        return self.get(timeout=0)
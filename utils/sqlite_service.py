@@ -0,0 +1,430 @@
+import sqlite3
+from datetime import UTC, datetime
+from pathlib import Path
+
+from utils import json_codec
+from utils.exceptions import DatabaseError, UserNotFoundError
+from utils.helpers import with_rank_score
+from utils.logger_config import logger
+from utils.lp_history import pack_record, unpack_records
+from utils.storage import CLEANUP_CHUNK_SIZE, StorageBackend
+
+# Tracked-user dict key -> tracked_users column.
+USER_COLUMNS = {
+    "puuid": "puuid",
+    "riot_id": "riot_id",
+    "region": "region",
+    "tier": "tier",
+    "rank": "rank",
+    "LP": "lp",
+    "score": "score",
+    "streak": "streak",
+    "last_match_id": "last_match_id",
+}
+# Columns that are absent from a Firestore doc until first written.
+OPTIONAL_COLUMNS = ("score", "streak", "last_match_id")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tracked_users (
+    puuid TEXT PRIMARY KEY,
+    riot_id TEXT,
+    region TEXT,
+    tier TEXT,
+    rank TEXT,
+    lp INTEGER,
+    score INTEGER,
+    streak INTEGER,
+    last_match_id TEXT
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS tracked_users_region ON tracked_users (region);
+
+CREATE TABLE IF NOT EXISTS guild_members (
+    guild_id TEXT NOT NULL,
+    puuid TEXT NOT NULL REFERENCES tracked_users (puuid) ON DELETE CASCADE,
+    added_by INTEGER,
+    PRIMARY KEY (guild_id, puuid)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS guild_members_puuid ON guild_members (puuid);
+
+CREATE TABLE IF NOT EXISTS lp_history (
+    puuid TEXT NOT NULL REFERENCES tracked_users (puuid) ON DELETE CASCADE,
+    record BLOB NOT NULL,
+    PRIMARY KEY (puuid, record)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS guild_config (
+    guild_id TEXT PRIMARY KEY,
+    channel_id INTEGER
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS bot_health (
+    name TEXT PRIMARY KEY,
+    data BLOB NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+class SQLiteDatabaseService(StorageBackend):
+    """Local SQLite storage backend, for self-hosted deployments and benchmarks.
+
+    Runs in WAL mode so readers never block the writer. Guild membership lives
+    in its own table, indexed both ways, so a guild's players are an index range
+    scan rather than a filter over every tracked user. Like the Firestore client,
+    calls are synchronous; local queries finish in well under a millisecond.
+    """
+
+    def __init__(self, path=":memory:"):
+        super().__init__()
+        if path != ":memory:":
+            Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        self.conn.executescript(SCHEMA)
+        self._migrate()
+
+    def close(self):
+        self.conn.close()
+
+    # Helpers
+
+    def _migrate(self):
+        """Add columns introduced after a database file was first created."""
+        existing = {
+            row["name"] for row in self.conn.execute("PRAGMA table_info(tracked_users)")
+        }
+        with self.conn:
+            if "score" not in existing:
+                self.conn.execute("ALTER TABLE tracked_users ADD COLUMN score INTEGER")
+            # Top-K leaderboards walk these backwards and stop after `limit` rows.
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS tracked_users_score "
+                "ON tracked_users (score)",
+            )
+            self.conn.execute(
+                "CREATE INDEX IF NOT EXISTS tracked_users_region_score "
+                "ON tracked_users (region, score)",
+            )
+
+    def _memberships(self, puuids):
+        """Return puuid -> [(guild_id, added_by), ...] for the given players."""
+        memberships = {puuid: [] for puuid in puuids}
+        if not memberships:
+            return memberships
+        rows = self.conn.execute(
+            "SELECT m.puuid, m.guild_id, m.added_by FROM guild_members m "
+            "JOIN json_each(?) j ON m.puuid = j.value",
+            (json_codec.dumps(list(memberships)).decode("utf-8"),),
+        )
+        for row in rows:
+            memberships[row["puuid"]].append((row["guild_id"], row["added_by"]))
+        return memberships
+
+    def _users(self, rows):
+        rows = list(rows)
+        memberships = self._memberships([row["puuid"] for row in rows])
+        users = []
+        for row in rows:
+            user = {key: row[column] for key, column in USER_COLUMNS.items()}
+            for key in OPTIONAL_COLUMNS:
+                if user[key] is None:
+                    del user[key]
+            guilds = memberships[row["puuid"]]
+            user["guild_ids"] = [guild_id for guild_id, _ in guilds]
+            user["server_info"] = {
+                guild_id: {"added_by": added_by} for guild_id, added_by in guilds
+            }
+            users.append(user)
+        return users
+
+    def _append_history(self, puuid, data):
+        """Append `data`'s score to the player's LP history, if it has one."""
+        if "score" not in data:
+            return
+        self.conn.execute(
+            "INSERT OR IGNORE INTO lp_history (puuid, record) "
+            "SELECT puuid, ? FROM tracked_users WHERE puuid = ?",
+            (pack_record(data["score"], data.get("last_match_id")), puuid),
+        )
+
+    def _delete_orphans(self, puuids):
+        self.conn.executemany(
+            "DELETE FROM tracked_users WHERE puuid = ? AND NOT EXISTS "
+            "(SELECT 1 FROM guild_members m WHERE m.puuid = tracked_users.puuid)",
+            [(puuid,) for puuid in puuids],
+        )
+
+    # Guild operations
+
+    async def get_guild_config(self, guild_id):
+        try:
+            row = self.conn.execute(
+                "SELECT channel_id FROM guild_config WHERE guild_id = ?",
+                (str(guild_id),),
+            ).fetchone()
+            return row["channel_id"] if row else None
+        except Exception as e:
+            logger.exception(
+                f"❌ ERROR: fetching config for guild {guild_id}: {e}",
+            )
+            return None
+
+    async def set_guild_config(self, guild_id, channel_id):
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO guild_config (guild_id, channel_id) VALUES (?, ?) "
+                "ON CONFLICT (guild_id) DO UPDATE SET channel_id = excluded.channel_id",
+                (str(guild_id), channel_id),
+            )
+
+    async def remove_guild_config(self, guild_id):
+        try:
+            with self.conn:
+                self.conn.execute(
+                    "DELETE FROM guild_config WHERE guild_id = ?",
+                    (str(guild_id),),
+                )
+        except Exception as e:
+            logger.exception(f"❌ ERROR: failed to delete guild config {guild_id}")
+            raise DatabaseError(
+                f"Database operation failed for guild {guild_id}: {e}",
+            ) from e
+
+    # Player operations
+
+    async def get_all_tracked_users(self):
+        """Return every tracked-user dict."""
+        return self._users(self.conn.execute("SELECT * FROM tracked_users"))
+
+    async def get_guild_tracked_users(self, guild_id):
+        """Return the tracked-user dicts for a single guild, with ``added_by``."""
+        guild_id = str(guild_id)
+        users = self._users(
+            self.conn.execute(
+                "SELECT u.* FROM guild_members m "
+                "JOIN tracked_users u ON u.puuid = m.puuid WHERE m.guild_id = ?",
+                (guild_id,),
+            ),
+        )
+        for user in users:
+            user["added_by"] = user["server_info"][guild_id]["added_by"]
+        return users
+
+    async def get_top_players(self, limit, region=None):
+        """Return the top `limit` players by score, read off the score index."""
+        if region is None:
+            rows = self.conn.execute(
+                "SELECT * FROM tracked_users WHERE score IS NOT NULL "
+                "ORDER BY score DESC LIMIT ?",
+                (limit,),
+            )
+        else:
+            rows = self.conn.execute(
+                "SELECT * FROM tracked_users WHERE region = ? AND score IS NOT NULL "
+                "ORDER BY score DESC LIMIT ?",
+                (region, limit),
+            )
+        return self._users(rows)
+
+    async def apply_ranked_update(self, puuid, build):
+        """Read-compute-write one player inside a ``BEGIN IMMEDIATE`` transaction.
+
+        IMMEDIATE takes the database write lock before the read, so no other
+        process can change the player between the read and the write and there
+        is never a conflict to retry.
+        """
+        try:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self.conn.execute(
+                    "SELECT * FROM tracked_users WHERE puuid = ?",
+                    (puuid,),
+                )
+                users = self._users(rows)
+                update = build(users[0]) if users else None
+                if update is not None:
+                    update = with_rank_score(update)
+                    columns = [USER_COLUMNS[key] for key in update]
+                    assignments = ", ".join(f"{column} = ?" for column in columns)
+                    self.conn.execute(
+                        f"UPDATE tracked_users SET {assignments} WHERE puuid = ?",
+                        (*update.values(), puuid),
+                    )
+                    self._append_history(puuid, update)
+            except BaseException:
+                self.conn.rollback()
+                raise
+            self.conn.commit()
+        except Exception as e:
+            logger.exception(f"❌ ERROR: updating ranked data for {puuid}: {e}")
+            raise DatabaseError("Database write failed for ranked data.") from e
+        if update is not None:
+            self.leaderboards.update(puuid, update)
+        return update
+
+    async def upsert_tracked_users(self, users):
+        """Bulk insert-or-replace full tracked-user dicts in one transaction."""
+        users = [with_rank_score(user) for user in users]
+        columns = list(USER_COLUMNS.values())
+        placeholders = ", ".join("?" for _ in columns)
+        updates = ", ".join(f"{column} = excluded.{column}" for column in columns[1:])
+        user_rows = [tuple(user.get(key) for key in USER_COLUMNS) for user in users]
+        member_rows = [
+            (str(guild_id), user["puuid"], info.get("added_by"))
+            for user in users
+            for guild_id, info in user.get("server_info", {}).items()
+        ]
+        with self.conn:
+            self.conn.executemany(
+                f"INSERT INTO tracked_users ({', '.join(columns)}) "
+                f"VALUES ({placeholders}) "
+                f"ON CONFLICT (puuid) DO UPDATE SET {updates}",
+                user_rows,
+            )
+            self.conn.executemany(
+                "INSERT INTO guild_members (guild_id, puuid, added_by) "
+                "VALUES (?, ?, ?) ON CONFLICT (guild_id, puuid) "
+                "DO UPDATE SET added_by = excluded.added_by",
+                member_rows,
+            )
+        for user in users:
+            for guild_id, info in user.get("server_info", {}).items():
+                self.leaderboards.track(
+                    guild_id,
+                    user["puuid"],
+                    {**user, "added_by": info.get("added_by")},
+                )
+
+    async def untrack_guild_chunk(self, guild_id, limit=CLEANUP_CHUNK_SIZE):
+        guild_id_str = str(guild_id)
+        try:
+            with self.conn:
+                puuids = [
+                    row["puuid"]
+                    for row in self.conn.execute(
+                        "DELETE FROM guild_members WHERE guild_id = ? AND puuid IN "
+                        "(SELECT puuid FROM guild_members WHERE guild_id = ? LIMIT ?) "
+                        "RETURNING puuid",
+                        (guild_id_str, guild_id_str, limit),
+                    ).fetchall()
+                ]
+                self._delete_orphans(puuids)
+                remaining = self.conn.execute(
+                    "SELECT COUNT(*) FROM guild_members WHERE guild_id = ?",
+                    (guild_id_str,),
+                ).fetchone()[0]
+            self.leaderboards.drop(guild_id)
+            return remaining
+        except Exception as e:
+            logger.exception(
+                f"❌ ERROR: failed to untrack all users from guild {guild_id} : {e}",
+            )
+            raise DatabaseError(
+                f"Database operation failed for guild {guild_id}: {e}",
+            ) from e
+
+    async def delete_guildless_users(self):
+        with self.conn:
+            return self.conn.execute(
+                "DELETE FROM tracked_users WHERE NOT EXISTS "
+                "(SELECT 1 FROM guild_members m WHERE m.puuid = tracked_users.puuid)",
+            ).rowcount
+
+    async def get_known_guild_ids(self):
+        rows = self.conn.execute(
+            "SELECT guild_id FROM guild_members "
+            "UNION SELECT guild_id FROM guild_config",
+        )
+        return {row["guild_id"] for row in rows}
+
+    async def track_user(
+        self, guild_id, author_id, riot_id: str, puuid: str, ranked_data, region
+    ):
+        fields = with_rank_score(
+            {
+                "riot_id": riot_id,
+                "region": region,
+                "tier": f"{ranked_data.get('tier')}",
+                "rank": f"{ranked_data.get('rank')}",
+                "LP": ranked_data.get("LP"),
+            },
+        )
+        try:
+            with self.conn:
+                is_new = (
+                    self.conn.execute(
+                        "SELECT 1 FROM tracked_users WHERE puuid = ?",
+                        (puuid,),
+                    ).fetchone()
+                    is None
+                )
+                self.conn.execute(
+                    "INSERT INTO tracked_users "
+                    "(puuid, riot_id, region, tier, rank, lp, score) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?) ON CONFLICT (puuid) DO UPDATE SET "
+                    "riot_id = excluded.riot_id, region = excluded.region, "
+                    "tier = excluded.tier, rank = excluded.rank, lp = excluded.lp, "
+                    "score = excluded.score",
+                    (puuid, *fields.values()),
+                )
+                if is_new:
+                    self._append_history(puuid, fields)
+                self.conn.execute(
+                    "INSERT INTO guild_members (guild_id, puuid, added_by) "
+                    "VALUES (?, ?, ?) ON CONFLICT (guild_id, puuid) "
+                    "DO UPDATE SET added_by = excluded.added_by",
+                    (str(guild_id), puuid, author_id),
+                )
+            self.leaderboards.track(
+                guild_id,
+                puuid,
+                {**fields, "added_by": author_id},
+            )
+        except Exception as e:
+            logger.exception(f"❌ ERROR: tracking: {e}")
+            raise DatabaseError(f"Database write failed for player {riot_id}.") from e
+
+    async def untrack_user(self, guild_id, riot_id, puuid):
+        try:
+            with self.conn:
+                deleted = self.conn.execute(
+                    "DELETE FROM guild_members WHERE guild_id = ? AND puuid = ?",
+                    (str(guild_id), puuid),
+                ).rowcount
+                if not deleted:
+                    tracked = self.conn.execute(
+                        "SELECT 1 FROM tracked_users WHERE puuid = ?",
+                        (puuid,),
+                    ).fetchone()
+                    if tracked is None:
+                        raise UserNotFoundError(f"{riot_id} is not being tracked.")
+                    raise UserNotFoundError(
+                        f"{riot_id} is not being tracked in this server.",
+                    )
+                self._delete_orphans([puuid])
+            self.leaderboards.untrack(guild_id, puuid)
+        except UserNotFoundError:
+            raise
+        except Exception as e:
+            logger.exception(f"❌ ERROR: untracking: {e}")
+            raise DatabaseError(f"Database write failed for player {riot_id}.") from e
+
+    async def get_lp_history(self, puuid):
+        rows = self.conn.execute(
+            "SELECT record FROM lp_history WHERE puuid = ?",
+            (puuid,),
+        )
+        return unpack_records(row["record"] for row in rows)
+
+    # Bot health
+
+    async def write_heartbeat(self, data):
+        payload = {"last_beat": datetime.now(UTC).isoformat(), **data}
+        with self.conn:
+            self.conn.execute(
+                "INSERT INTO bot_health (name, data) VALUES ('heartbeat', ?) "
+                "ON CONFLICT (name) DO UPDATE SET data = excluded.data",
+                (json_codec.dumps(payload),),
+            )
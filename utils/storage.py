@@ -0,0 +1,179 @@
+import functools
+import inspect
+import time
+from abc import ABC, abstractmethod
+
+import sentry_sdk
+
+from utils.keyed_lock import KeyedLock
+from utils.leaderboard import LeaderboardCache
+from utils.metrics import STORAGE_OP_ERRORS, STORAGE_OP_SECONDS
+
+# Players removed from a departed guild per committed chunk. With the one
+# membership-doc write per chunk this stays inside a single Firestore batch.
+CLEANUP_CHUNK_SIZE = 400
+# Attempts `apply_ranked_update` makes before giving up on a contended player.
+MAX_WRITE_ATTEMPTS = 5
+
+
+def _timed(backend, method, func):
+    """Wrap a storage coroutine in a trace span, timing it and counting failures."""
+    span_name = f"{backend}.{method}"
+
+    @functools.wraps(func)
+    async def timed(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            with sentry_sdk.start_span(op="db", name=span_name):
+                return await func(*args, **kwargs)
+        except Exception:
+            STORAGE_OP_ERRORS.inc(backend, method)
+            raise
+        finally:
+            STORAGE_OP_SECONDS.observe(time.perf_counter() - started, backend, method)
+
+    return timed
+
+
+class StorageBackend(ABC):
+    """The storage operations the bot needs, independent of the database engine.
+
+    Implementations: `DatabaseService` (Firestore, utils/db_service.py) and
+    `SQLiteDatabaseService` (utils/sqlite_service.py). `database.storage_startup`
+    picks one from `STORAGE_BACKEND`.
+
+    Tracked users are exchanged as plain dicts shaped like the Firestore
+    document: ``puuid``, ``riot_id``, ``region``, ``tier``, ``rank``, ``LP``,
+    ``guild_ids``, ``server_info`` (``{guild_id: {"added_by": ...}}``) and, once
+    a game has been processed, ``streak`` and ``last_match_id``. Writes that
+    carry a tier also store ``score`` (see `utils.helpers.rank_score`). Guild ids
+    are passed as ints or strings and always stored as strings.
+
+    Implementations keep `self.leaderboards` in step with every write so
+    `get_guild_leaderboard` is served from memory.
+    """
+
+    def __init_subclass__(cls, **kwargs):
+        """Time and trace each public coroutine method an implementation defines.
+
+        Calls land in the storage metrics (utils/metrics.py), labelled with the
+        class and method name, and in a ``db`` span of the current trace.
+        """
+        super().__init_subclass__(**kwargs)
+        for name, member in list(vars(cls).items()):
+            if not name.startswith("_") and inspect.iscoroutinefunction(member):
+                setattr(cls, name, _timed(cls.__name__, name, member))
+
+    def __init__(self):
+        self.leaderboards = LeaderboardCache()
+        # Hold `player_locks.hold(puuid)` around a player's read-compute-write.
+        self.player_locks = KeyedLock()
+
+    async def get_guild_leaderboard(self, guild_id):
+        """Return the guild's `GuildLeaderboard`, built from storage on first use."""
+        board = self.leaderboards.get(guild_id)
+        if board is None:
+            users = await self.get_guild_tracked_users(guild_id)
+            board = self.leaderboards.load(guild_id, users)
+        return board
+
+    # Guild operations
+
+    @abstractmethod
+    async def get_guild_config(self, guild_id):
+        """Return the guild's update channel id, or None if unset or on error."""
+
+    @abstractmethod
+    async def set_guild_config(self, guild_id, channel_id):
+        """Set the channel the guild's rank updates are posted in."""
+
+    @abstractmethod
+    async def remove_guild_config(self, guild_id):
+        """Forget the guild's configuration."""
+
+    # Player operations
+
+    @abstractmethod
+    async def get_all_tracked_users(self):
+        """Return every tracked-user dict."""
+
+    @abstractmethod
+    async def get_guild_tracked_users(self, guild_id):
+        """Return a guild's players: ``puuid``, ``added_by`` and the scalar fields.
+
+        Backends answer this from a guild membership index, not a scan of every
+        tracked user; ``guild_ids`` and ``server_info`` may be omitted.
+        """
+
+    @abstractmethod
+    async def get_top_players(self, limit, region=None):
+        """Return the `limit` highest-scored tracked users, best first.
+
+        Covers every guild; `region` narrows it to one platform region. Backends
+        answer from a score index rather than reading every player.
+        """
+
+    @abstractmethod
+    async def apply_ranked_update(self, puuid, build):
+        """Write `build(current)` only if the player is unchanged since the read.
+
+        `current` is the player's stored dict, read as part of the write, and
+        `build` returns the fields to persist or None to write nothing. If
+        another process changes the player in between, the read and `build` are
+        retried (`build` must be pure). Returns the fields written, or None if
+        nothing was written or the player is no longer tracked.
+        """
+
+    @abstractmethod
+    async def upsert_tracked_users(self, users):
+        """Bulk insert-or-replace full tracked-user dicts (imports, seeding)."""
+
+    @abstractmethod
+    async def track_user(
+        self, guild_id, author_id, riot_id, puuid, ranked_data, region
+    ):
+        """Track a player in a guild, creating the player if new."""
+
+    @abstractmethod
+    async def untrack_user(self, guild_id, riot_id, puuid):
+        """Stop tracking a player in a guild; UserNotFoundError if not tracked."""
+
+    @abstractmethod
+    async def untrack_guild_chunk(self, guild_id, limit=CLEANUP_CHUNK_SIZE):
+        """Remove up to `limit` of a guild's players; return how many remain.
+
+        Each chunk is committed before returning, and the guild's membership
+        index shrinks with it, so an interrupted removal resumes where it
+        stopped. Players left with no guild are deleted.
+        """
+
+    async def untrack_all_users(self, guild_id):
+        """Stop tracking every player in a guild, one committed chunk at a time."""
+        while await self.untrack_guild_chunk(guild_id):
+            pass
+
+    @abstractmethod
+    async def delete_guildless_users(self):
+        """Delete tracked players that belong to no guild; return how many.
+
+        A removal interrupted between leaving the guild and deleting the player
+        leaves such a player behind, still returned by `get_all_tracked_users`.
+        """
+
+    @abstractmethod
+    async def get_known_guild_ids(self):
+        """Return every guild id with a config, a membership or a tracked player."""
+
+    @abstractmethod
+    async def get_lp_history(self, puuid):
+        """Return the player's `(timestamp, score, match_number)` records, oldest first.
+
+        Backends append one packed record (utils/lp_history.py) with every write
+        that sets a new ``score``, in the same batch or transaction.
+        """
+
+    # Bot health
+
+    @abstractmethod
+    async def write_heartbeat(self, data):
+        """Overwrite the liveness heartbeat; the backend stamps `last_beat`."""
@@ -203,6 +203,79 @@ class MatchDetailsView(discord.ui.View):
         self.stop()
 
 
+class LeaderboardView(discord.ui.View):
+    """Pages through a guild's leaderboard, with a jump to the caller's players.
+
+    Pages come from the board's render cache, so flipping never touches the
+    database; if a rank changes while the view is open, the next flip shows it.
+    """
+
+    def __init__(self, board, title, timeout=600, jump_to_self=True):
+        super().__init__(timeout=timeout)
+        self.board = board
+        self.title = title
+        self.page = 0
+        self.message = None
+        if not jump_to_self:
+            self.remove_item(self.jump_to_self)
+        self._sync_buttons()
+
+    def create_embed(self):
+        pages = self.board.pages()
+        self.page = max(0, min(self.page, len(pages) - 1))
+        embed = discord.Embed(
+            title=self.title,
+            description=pages[self.page] if pages else "",
+            color=discord.Color.gold(),
+        )
+        if len(pages) > 1:
+            embed.set_footer(text=f"Page {self.page + 1}/{len(pages)}")
+        return embed
+
+    def _sync_buttons(self):
+        last_page = len(self.board.pages()) - 1
+        self.previous_page.disabled = self.page <= 0
+        self.next_page.disabled = self.page >= last_page
+
+    async def _show(self, interaction):
+        embed = self.create_embed()
+        self._sync_buttons()
+        await interaction.response.edit_message(embed=embed, view=self)
+
+    @discord.ui.button(label="◀ Previous", style=discord.ButtonStyle.secondary)
+    async def previous_page(self, interaction, _button):
+        self.page -= 1
+        await self._show(interaction)
+
+    @discord.ui.button(label="Next ▶", style=discord.ButtonStyle.secondary)
+    async def next_page(self, interaction, _button):
+        self.page += 1
+        await self._show(interaction)
+
+    @discord.ui.button(label="📍 My players", style=discord.ButtonStyle.primary)
+    async def jump_to_self(self, interaction, _button):
+        puuid = self.board.first_added_by(interaction.user.id)
+        if puuid is None:
+            return await interaction.response.send_message(
+                "You haven't tracked anyone in this server.",
+                ephemeral=True,
+            )
+        self.page = self.board.page_of(puuid)
+        await self._show(interaction)
+
+    async def on_timeout(self):
+        for item in self.children:
+            item.disabled = True
+        if self.message:
+            with contextlib.suppress(
+                discord.HTTPException,
+                discord.NotFound,
+                discord.Forbidden,
+            ):
+                await self.message.edit(view=self)
+        self.stop()
+
+
 def extract_minimized_embed_description(ranked_data, riot_id):
     old_tier = ranked_data.get("old_tier")
     old_rank = ranked_data.get("old_rank")
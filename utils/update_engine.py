@@ -0,0 +1,308 @@
+"""The rank -> match -> streak -> persist sequence shared by every updater.
+
+`!update` and the background loop both submit tracked-user dicts to the bot's
+one `PlayerUpdateEngine` and post whatever `PlayerUpdate`s come back. The
+engine is a small scheduler: players wait in one priority queue, so an
+`!update` (INTERACTIVE) overtakes the background cycle (BACKGROUND), and a
+single worker processes them, pacing the Riot API after every changed player
+whoever asked. Each submission is an `UpdateJob` that any number of callers can
+follow as it progresses.
+
+Each player processed gets one span in the trace the job was submitted from
+(the cycle's or the command's), rather than one per Riot and storage call, so a
+cycle's trace grows by one span per player.
+
+For each player the worker holds the player's lock while it fetches and writes
+(see utils/keyed_lock.py), writes through `apply_ranked_update` so the streak is
+computed from the stored player, and folds a detected name change into that
+same write. It remembers when it last fetched each player, so a job can skip
+players refreshed moments ago.
+"""
+
+import asyncio
+import itertools
+import time
+from dataclasses import dataclass
+
+import sentry_sdk
+
+from utils.constants import (
+    REGION_CLUSTERS,
+    UPDATE_FRESHNESS_SECONDS,
+    UPDATE_PACING_SECONDS,
+)
+from utils.exceptions import LiveLOLError
+from utils.helpers import (
+    apply_match_result,
+    check_new_riot_id,
+    extract_match_info,
+    parse_rank_info,
+    rank_difference,
+)
+from utils.logger_config import logger
+from utils.riot_api import get_ranked_info, get_recent_match_info
+from utils.ui_components import MatchDetailsView
+
+# Queue priorities; lower runs first.
+INTERACTIVE = 0
+BACKGROUND = 1
+
+
+@dataclass
+class PlayerUpdate:
+    """One player's recorded rank change, ready to post."""
+
+    puuid: str
+    riot_id: str
+    region: str
+    guild_ids: list
+    ranked_data: dict
+    match_info: dict
+    streak: int
+
+    def create_view(self):
+        """Return a fresh `MatchDetailsView` for one post of this update."""
+        return MatchDetailsView(
+            self.match_info,
+            self.ranked_data,
+            self.riot_id,
+            self.puuid,
+            self.region,
+            self.streak,
+        )
+
+
+class UpdateJob:
+    """Players submitted together, processed by the engine's worker.
+
+    `processed` counts players done (updated, unchanged, failed or skipped),
+    `skipped` those left alone because they were fresh, `failed` those whose
+    update raised, and `results` collects the `PlayerUpdate`s in the order they
+    arrived.
+    """
+
+    def __init__(self, key, total, fresh_within=None):
+        self.key = key
+        self.total = total
+        self.fresh_within = fresh_within
+        self.processed = 0
+        self.skipped = 0
+        self.failed = 0
+        self.results = []
+        self.version = 0
+        self._changed = asyncio.Event()
+        # The submitter's trace; each of the job's players gets a span in it.
+        self.span = sentry_sdk.get_current_span()
+
+    @property
+    def finished(self):
+        return self.processed >= self.total
+
+    def _record(self, result, skipped=False, failed=False):
+        self.processed += 1
+        self.skipped += skipped
+        self.failed += failed
+        if result is not None:
+            self.results.append(result)
+        self.version += 1
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+
+    async def follow(self):
+        """Yield the results that arrived since the last yield, until finished.
+
+        Yields once straight away and then after every processed player, so a
+        follower can refresh its progress display; the list may be empty.
+        """
+        seen_version, seen = -1, 0
+        while True:
+            if self.version != seen_version:
+                seen_version = self.version
+                new, seen = self.results[seen:], len(self.results)
+                yield new
+                continue
+            if self.finished:
+                return
+            await self._changed.wait()
+
+
+class PlayerUpdateEngine:
+    """Schedules, fetches, records and paces rank updates.
+
+    Reads `bot.session` and `bot.db_service` on every call, so it can be built
+    before the HTTP session exists. The worker task starts with the first job.
+    """
+
+    def __init__(self, bot, riot_api_key, pacing_seconds=UPDATE_PACING_SECONDS):
+        self.bot = bot
+        self.riot_api_key = riot_api_key
+        self.pacing_seconds = pacing_seconds
+        # puuid -> time.monotonic() of the last successful rank fetch.
+        self.checked_at = {}
+        # Unfinished jobs submitted under a key, e.g. one per guild's !update.
+        self.jobs = {}
+        self._queue = asyncio.PriorityQueue()
+        self._order = itertools.count()
+        self._worker = None
+
+    @property
+    def queued(self):
+        """Players waiting for the worker, across all jobs."""
+        return self._queue.qsize()
+
+    def is_fresh(self, puuid, within):
+        """Return whether the player was fetched within the last `within` seconds."""
+        checked_at = self.checked_at.get(puuid)
+        return checked_at is not None and time.monotonic() - checked_at < within
+
+    def _forget_stale(self):
+        cutoff = time.monotonic() - UPDATE_FRESHNESS_SECONDS
+        for puuid, checked_at in list(self.checked_at.items()):
+            if checked_at < cutoff:
+                del self.checked_at[puuid]
+
+    def submit(
+        self,
+        users,
+        key=None,
+        priority=BACKGROUND,
+        fresh_within=None,
+    ):
+        """Queue `users` as a new `UpdateJob` and return it.
+
+        Players fetched within `fresh_within` seconds are skipped when their
+        turn comes, so a change another job already posted is not posted again.
+        A job with a `key` is listed in `jobs` until it
+        finishes, so later callers can follow it instead of submitting again.
+        """
+        self._forget_stale()
+        job = UpdateJob(key, len(users), fresh_within)
+        if key is not None and not job.finished:
+            self.jobs[key] = job
+        for user in users:
+            self._queue.put_nowait((priority, next(self._order), user, job))
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._work())
+        return job
+
+    async def update_players(self, users, priority=BACKGROUND, fresh_within=None):
+        """Submit `users` and yield a `PlayerUpdate` for every changed player."""
+        job = self.submit(users, priority=priority, fresh_within=fresh_within)
+        async for results in job.follow():
+            for result in results:
+                yield result
+
+    def close(self):
+        """Stop the worker; queued players are dropped."""
+        if self._worker is not None:
+            self._worker.cancel()
+
+    async def _work(self):
+        # The worker outlives the caller that started it, so it runs with no
+        # current span: its Riot and storage calls are traced only through the
+        # per-player span in each job's own trace.
+        with sentry_sdk.new_scope() as scope:
+            scope.span = None
+            while True:
+                await self._work_one()
+
+    async def _work_one(self):
+        _priority, _order, user, job = await self._queue.get()
+        span = None
+        if job.span is not None:
+            span = job.span.start_child(op="player.update", name=user.get("riot_id"))
+        result, skipped, failed = await self._process(user, job)
+        if span is not None:
+            span.set_data("region", user.get("region"))
+            span.set_data("changed", result is not None)
+            span.set_data("skipped", skipped)
+            if failed:
+                span.set_status("internal_error")
+            span.finish()
+        job._record(result, skipped, failed)
+        if job.finished and self.jobs.get(job.key) is job:
+            del self.jobs[job.key]
+        if result is not None and not skipped:
+            # Stay behind the Riot API rate limit curve.
+            await asyncio.sleep(self.pacing_seconds)
+
+    async def _process(self, user, job):
+        """Return `(result, skipped, failed)` for one queued player.
+
+        Each player is guarded, so one player's Riot or database error
+        (rate-limited shard, missing match, renamed account) is logged and never
+        stops the rest.
+        """
+        puuid = user.get("puuid")
+        if job.fresh_within is not None and self.is_fresh(puuid, job.fresh_within):
+            return None, True, False
+        riot_id = user.get("riot_id")
+        log_fields = {"puuid": puuid, "region": user.get("region")}
+        try:
+            return await self.update_player(user), False, False
+        except LiveLOLError as e:
+            logger.warning(f"⚠️ Skipping {riot_id} this cycle: {e}", extra=log_fields)
+        except Exception as e:
+            logger.exception(f"❌ ERROR processing {riot_id}: {e}", extra=log_fields)
+        return None, False, True
+
+    async def update_player(self, user):
+        """Fetch and record one player's rank; return a `PlayerUpdate` or None.
+
+        None means nothing changed, no match could be read, or another updater
+        already recorded this game.
+        """
+        puuid = user.get("puuid")
+        region = user.get("region")
+        riot_id = user.get("riot_id")
+        db_service = self.bot.db_service
+        async with db_service.player_locks.hold(puuid):
+            data = await get_ranked_info(
+                self.bot.session,
+                puuid,
+                region,
+                self.riot_api_key,
+            )
+            self.checked_at[puuid] = time.monotonic()
+            ranked_data = parse_rank_info(user, data)
+            if not rank_difference(ranked_data):
+                return None
+            match_info = await get_recent_match_info(
+                self.bot.session,
+                puuid,
+                REGION_CLUSTERS.get(region),
+                self.riot_api_key,
+                projected=True,
+            )
+            processed_match_info = extract_match_info(match_info, puuid)
+            if processed_match_info is None:
+                logger.warning(
+                    f"⚠️ Skipping {riot_id} this cycle: no match info",
+                    extra={"puuid": puuid, "region": region},
+                )
+                return None
+            new_riot_id = check_new_riot_id(processed_match_info, puuid, riot_id)
+
+            def build(current):
+                # Streak and last match come from the stored player as of the
+                # write, not from `user`, which may be stale by now.
+                update = apply_match_result(current, data, processed_match_info)
+                if update is not None and new_riot_id:
+                    update["riot_id"] = new_riot_id
+                return update
+
+            written = await db_service.apply_ranked_update(puuid, build)
+        if written is None:
+            return None
+        if new_riot_id:
+            logger.info(f"📝 Name Change Detected: {riot_id} -> {new_riot_id}")
+            riot_id = new_riot_id
+        return PlayerUpdate(
+            puuid=puuid,
+            riot_id=riot_id,
+            region=region,
+            guild_ids=user.get("guild_ids") or [],
+            ranked_data=ranked_data,
+            match_info=processed_match_info,
+            streak=written["streak"],
+        )